@@ -130,6 +130,16 @@ def veritabani_kur():
     )''')
 
     # K. BOŞ TABLOLAR (Süreç içinde dolacaklar)
+    # Şehir çifti mesafe önbelleği; anahtar normalize edilmiş ve alfabetik sıralı (simetrik) isimlerdir
+    cursor.execute('''CREATE TABLE IF NOT EXISTS mesafe_onbellek (
+        yer_a TEXT,
+        yer_b TEXT,
+        mesafe_km REAL,
+        kaynak TEXT,
+        guncelleme_tarihi TEXT,
+        PRIMARY KEY (yer_a, yer_b)
+    )''')
+
     cursor.execute('''CREATE TABLE IF NOT EXISTS sikayetler (
         sikayet_id INTEGER PRIMARY KEY AUTOINCREMENT,
         siparis_no TEXT,
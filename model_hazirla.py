@@ -0,0 +1,135 @@
+import os
+import time
+import argparse
+import numpy as np
+from modules import ml_modulu, niyet_yonlendirici
+
+# Dağıtımdan önce model dosyalarını (model_artifacts/) üretir. İşçiler açılışta bu dosyaları
+# yükler; eğitim verisi veya hiperparametreler değişmediyse mevcut dosya yeniden kullanılır.
+
+
+def duygu_modeli_hazirla(yeniden, temizle):
+    ad, hiperparametreler, _ = ml_modulu.duygu_ayarlari()
+    csv_path = os.path.join(ml_modulu.BASE_DIR, ml_modulu.DUYGU_CSV)
+    parmak = ml_modulu.parmak_izi(csv_path, hiperparametreler)
+    mevcut = os.path.exists(ml_modulu.artifact_yolu(ad, parmak))
+
+    baslangic = time.perf_counter()
+    if ml_modulu.modeli_egit(yeniden=yeniden) is None:
+        raise SystemExit("Duygu modeli hazırlanamadı.")
+    sure = time.perf_counter() - baslangic
+
+    kayit = ml_modulu.DUYGU_KAYDI
+    durum = "mevcut dosya kullanıldı" if mevcut and not yeniden else "eğitildi"
+    print(f"{ad}  {parmak}  {durum} ({sure:.2f} sn)  F1: {kayit['f1']:.4f}  "
+          f"eğitim: {kayit['egitim_suresi_sn']} sn  sonradan katılan: {kayit.get('ek_ornek', 0)}")
+    print(f"       {ml_modulu.artifact_yolu(ad, parmak)}")
+
+    if isinstance(ml_modulu.EGITILMIS_MODEL, ml_modulu.NumpyDuyguModeli):
+        print(f"       {ml_modulu.EGITILMIS_MODEL.klasor}  (NumPy çıkarımı)")
+
+    if temizle:
+        for dosya in ml_modulu.eski_artifactlari_sil(ad, parmak):
+            print(f"       silindi: {dosya}")
+        if isinstance(ml_modulu.EGITILMIS_MODEL, ml_modulu.NumpyDuyguModeli):
+            numpy_parmak = os.path.basename(ml_modulu.EGITILMIS_MODEL.klasor).rsplit("_", 1)[1]
+            for dosya in ml_modulu.eski_artifactlari_sil("duygu_numpy", numpy_parmak):
+                print(f"       silindi: {dosya}")
+
+
+def numpy_paritesi():
+    """NumPy çıkarımının sklearn pipeline ile aynı sonucu verdiğini eğitim verisinin tamamında doğrular."""
+    import pandas as pd
+
+    if not isinstance(ml_modulu.EGITILMIS_MODEL, ml_modulu.NumpyDuyguModeli):
+        raise SystemExit("NumPy çıkarımı etkin değil (DUYGU_MODU=tfidf, DUYGU_MOTORU=numpy olmalı).")
+    numpy_modeli = ml_modulu.EGITILMIS_MODEL
+    csv_path = os.path.join(ml_modulu.BASE_DIR, ml_modulu.DUYGU_CSV)
+    kayit = ml_modulu.artifact_yukle("duygu", ml_modulu.parmak_izi(csv_path, ml_modulu.DUYGU_HIPERPARAMETRELERI))
+    if kayit is None:
+        raise SystemExit("sklearn pipeline dosyası bulunamadı; --yeniden ile yeniden üretin.")
+    pipeline = kayit["model"]
+
+    mesajlar = pd.read_csv(csv_path)["text"].dropna().tolist()
+    temiz = ml_modulu.metinleri_temizle(mesajlar).tolist()
+    fark = np.abs(pipeline.predict_proba(temiz) - numpy_modeli.predict_proba(temiz)).max()
+
+    sonuclar, sureler = {}, {}
+    for ad, model in (("sklearn", pipeline), ("numpy", numpy_modeli)):
+        ml_modulu.EGITILMIS_MODEL = model
+        baslangic = time.perf_counter()
+        sonuclar[ad] = [ml_modulu.duygu_analizi_yap(m) for m in mesajlar]
+        sureler[ad] = (time.perf_counter() - baslangic) / len(mesajlar) * 1e6
+    ml_modulu.EGITILMIS_MODEL = numpy_modeli
+
+    farkli = sum(a != b for a, b in zip(sonuclar["sklearn"], sonuclar["numpy"]))
+    print(f"parite  {len(mesajlar)} mesaj, farklı sonuç: {farkli}, en büyük olasılık farkı: {fark:.2e}")
+    print(f"        tekil çağrı: sklearn {sureler['sklearn']:.0f} µs, numpy {sureler['numpy']:.0f} µs")
+    if farkli: raise SystemExit("NumPy çıkarımı sklearn ile aynı sonucu vermiyor.")
+
+
+def sikayetleri_kat():
+    baslangic = time.perf_counter()
+    adet = ml_modulu.sikayetleri_ogren()
+    print(f"sikayetler  {adet} yeni kayıt modele katıldı ({time.perf_counter() - baslangic:.2f} sn), "
+          f"son şikayet id: {ml_modulu.DUYGU_KAYDI.get('son_sikayet_id', 0)}")
+
+
+def niyet_modeli_hazirla(yeniden, temizle):
+    klasor = niyet_yonlendirici.numpy_klasoru()
+    if klasor is None:
+        raise SystemExit("Niyet modeli hazırlanamadı.")
+    mevcut = os.path.isdir(klasor)
+
+    baslangic = time.perf_counter()
+    if niyet_yonlendirici.niyet_modelini_egit(yeniden=yeniden) is None:
+        raise SystemExit("Niyet modeli hazırlanamadı.")
+    sure = time.perf_counter() - baslangic
+
+    parmak = os.path.basename(klasor).rsplit("_", 1)[1]
+    durum = "mevcut dosya kullanıldı" if mevcut and not yeniden else "eğitildi"
+    print(f"niyet  {parmak}  {durum} ({sure:.2f} sn)")
+    print(f"       {klasor}  (NumPy çıkarımı)")
+
+    if temizle:
+        for dosya in ml_modulu.eski_artifactlari_sil("niyet_numpy", parmak):
+            print(f"       silindi: {dosya}")
+
+
+def teslimat_modeli_hazirla(yeniden, temizle):
+    csv_path = os.path.join(ml_modulu.BASE_DIR, ml_modulu.TESLIMAT_CSV)
+    parmak = ml_modulu.parmak_izi(csv_path, ml_modulu.TESLIMAT_HIPERPARAMETRELERI)
+    mevcut = os.path.exists(ml_modulu.artifact_yolu("teslimat", parmak))
+
+    baslangic = time.perf_counter()
+    kayit = ml_modulu.teslimat_modelini_yukle(yeniden=yeniden)
+    if kayit is None:
+        raise SystemExit("Teslimat modeli hazırlanamadı.")
+    sure = time.perf_counter() - baslangic
+
+    durum = "mevcut dosya kullanıldı" if mevcut and not yeniden else "eğitildi"
+    print(f"teslimat  {parmak}  {durum} ({sure:.2f} sn)  MAE: {kayit['mae']:.2f} gün  R2: {kayit['r2']:.2f}")
+    print(f"          {ml_modulu.artifact_yolu('teslimat', parmak)}")
+
+    if temizle:
+        for dosya in ml_modulu.eski_artifactlari_sil("teslimat", parmak):
+            print(f"          silindi: {dosya}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model dosyalarını dağıtım öncesi üretir")
+    parser.add_argument("--yeniden", action="store_true", help="Parmak izi aynı olsa bile yeniden eğit")
+    parser.add_argument("--temizle", action="store_true", help="Eski parmak izli model dosyalarını sil")
+    parser.add_argument("--duygu-modu", choices=["tfidf", "akisli"], help="DUYGU_MODU ortam değişkenini geçersiz kılar")
+    parser.add_argument("--parite", action="store_true", help="NumPy duygu çıkarımını sklearn pipeline ile karşılaştır")
+    parser.add_argument("--sikayetler", action="store_true",
+                        help="Yeni şikayet metinlerini akışlı duygu modeline kat (DUYGU_MODU=akisli)")
+    args = parser.parse_args()
+
+    if args.duygu_modu: ml_modulu.DUYGU_MODU = args.duygu_modu
+    print(f"Model klasörü: {ml_modulu.MODEL_KLASORU}  Duygu modu: {ml_modulu.DUYGU_MODU}")
+    duygu_modeli_hazirla(args.yeniden, args.temizle)
+    if args.parite: numpy_paritesi()
+    if args.sikayetler: sikayetleri_kat()
+    niyet_modeli_hazirla(args.yeniden, args.temizle)
+    teslimat_modeli_hazirla(args.yeniden, args.temizle)
@@ -0,0 +1,128 @@
+import os
+import re
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from modules.metrikler import Sayac, Gosterge, hata_kaydet
+
+# Girdisi küçük ve tekrar eden Gemini cevapları için TTL önbelleği. Anahtar, prompt metninin
+# kendisi değil, çağrı yerinin cevabı belirleyen girdilerinin normalize parmak izidir
+# (kampanya listesi + soru kategorisi, ad + rol vb.). Bellekte LRU, isteğe bağlı SQLite disk katmanı.
+
+# --- AYARLAR ---
+CEVAP_ONBELLEGI_ACIK = os.getenv("CEVAP_ONBELLEGI", "1") == "1"
+CEVAP_ONBELLEK_BOYUT = int(os.getenv("CEVAP_ONBELLEK_BOYUT", "1024"))
+# Boş bırakılırsa sadece bellek katmanı kullanılır; dosya verilirse işçiler ve yeniden başlatmalar arası paylaşılır
+CEVAP_ONBELLEK_DB = os.getenv("CEVAP_ONBELLEK_DB", "")
+
+# Çağrı yeri başına yaşam süresi (sn). Listede olmayan çağrılar önbelleğe alınmaz.
+CAGRI_TTL_SN = {
+    "kampanya": 30 * 60,        # kampanya tablosu değişince anahtar da değişir, TTL sadece ifade tazeliği için
+    "kimlik_basari": 24 * 3600,
+    "kimlik_hata": 24 * 3600,
+}
+
+_bellek = OrderedDict()   # anahtar -> (bitis_zamani, metin)
+_bellek_kilit = threading.Lock()
+_yerel = threading.local()
+
+ONBELLEK_SAYACI = Sayac("llm_cevap_onbellegi_toplam", "Cevap önbelleği sonuçları (bellek, disk, miss).",
+                        ("cagri", "sonuc"))
+Gosterge("llm_cevap_onbellegi_kayit", "Bellekteki cevap önbelleği kayıt sayısı.", fonksiyon=lambda: len(_bellek))
+
+
+def _normallestir(deger):
+    metin = unicodedata.normalize('NFC', str(deger if deger is not None else ""))
+    return re.sub(r'\s+', ' ', metin).strip().lower()
+
+
+def parmak_izi(cagri, *girdiler):
+    """Çağrı yeri + normalize girdilerden kararlı anahtar üretir."""
+    govde = json.dumps([cagri] + [_normallestir(g) for g in girdiler], ensure_ascii=False)
+    return hashlib.sha256(govde.encode('utf-8')).hexdigest()
+
+
+def _disk():
+    if not CEVAP_ONBELLEK_DB: return None
+    conn = getattr(_yerel, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(CEVAP_ONBELLEK_DB, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS llm_cevaplari (
+            anahtar TEXT PRIMARY KEY,
+            cagri TEXT,
+            metin TEXT,
+            bitis REAL
+        )''')
+        conn.execute("DELETE FROM llm_cevaplari WHERE bitis <= ?", (time.time(),))
+        conn.commit()
+        _yerel.conn = conn
+    return conn
+
+
+def _bellege_yaz(anahtar, bitis, metin):
+    with _bellek_kilit:
+        _bellek[anahtar] = (bitis, metin)
+        _bellek.move_to_end(anahtar)
+        while len(_bellek) > CEVAP_ONBELLEK_BOYUT:
+            _bellek.popitem(last=False)
+
+
+def getir(cagri, anahtar):
+    """Geçerli kayıt varsa metni, yoksa None döner."""
+    if not CEVAP_ONBELLEGI_ACIK or cagri not in CAGRI_TTL_SN: return None
+    simdi = time.time()
+
+    with _bellek_kilit:
+        kayit = _bellek.get(anahtar)
+        if kayit and kayit[0] > simdi:
+            _bellek.move_to_end(anahtar)
+            ONBELLEK_SAYACI.artir(cagri=cagri, sonuc="bellek")
+            return kayit[1]
+        if kayit: del _bellek[anahtar]
+
+    try:
+        conn = _disk()
+        row = conn.execute("SELECT metin, bitis FROM llm_cevaplari WHERE anahtar = ? AND bitis > ?",
+                           (anahtar, simdi)).fetchone() if conn else None
+    except sqlite3.Error as e:
+        print(f"Cevap Önbelleği Disk Hatası: {e}")
+        hata_kaydet("cevap_onbellegi")
+        row = None
+
+    if row:
+        _bellege_yaz(anahtar, row[1], row[0])
+        ONBELLEK_SAYACI.artir(cagri=cagri, sonuc="disk")
+        return row[0]
+
+    ONBELLEK_SAYACI.artir(cagri=cagri, sonuc="miss")
+    return None
+
+
+def kaydet(cagri, anahtar, metin):
+    if not CEVAP_ONBELLEGI_ACIK or cagri not in CAGRI_TTL_SN or not metin: return
+    bitis = time.time() + CAGRI_TTL_SN[cagri]
+    _bellege_yaz(anahtar, bitis, metin)
+
+    try:
+        conn = _disk()
+        if conn:
+            conn.execute("INSERT OR REPLACE INTO llm_cevaplari (anahtar, cagri, metin, bitis) VALUES (?, ?, ?, ?)",
+                         (anahtar, cagri, metin, bitis))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"Cevap Önbelleği Disk Hatası: {e}")
+        hata_kaydet("cevap_onbellegi")
+
+
+def temizle():
+    with _bellek_kilit:
+        _bellek.clear()
+    conn = _disk()
+    if conn:
+        conn.execute("DELETE FROM llm_cevaplari")
+        conn.commit()
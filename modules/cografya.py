@@ -0,0 +1,204 @@
+import os
+import re
+import csv
+import difflib
+import threading
+from functools import lru_cache
+import numpy as np
+from modules.database import metin_temizle
+
+# Gemini'ye sormadan, il/ilçe koordinat tablosundan karayolu mesafesi tahmini.
+# Mesafe = büyük daire (haversine) mesafesi x kalibre edilmiş yol katsayısı.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KOORDINAT_DOSYASI = os.path.join(BASE_DIR, 'il_ilce_koordinatlari.csv')
+
+DUNYA_YARICAPI_KM = 6371.0
+SEHIR_ICI_MIN_KM = 5.0
+BULANIK_ESIK = 0.8
+
+# Kalibrasyon için bilinen il merkezleri arası karayolu mesafeleri (KGM tablosundan yaklaşık değerler)
+KALIBRASYON_CIFTLERI = [
+    ("İstanbul", "Ankara", 453),
+    ("İstanbul", "Bursa", 155),
+    ("İstanbul", "Edirne", 235),
+    ("Ankara", "İzmir", 579),
+    ("Ankara", "Antalya", 482),
+    ("Ankara", "Konya", 258),
+    ("Ankara", "Kayseri", 318),
+    ("Ankara", "Samsun", 413),
+    ("Ankara", "Erzurum", 876),
+    ("Ankara", "Trabzon", 731),
+    ("Ankara", "Diyarbakır", 904),
+    ("Adana", "Gaziantep", 212),
+    ("İzmir", "Antalya", 444),
+]
+
+# Halk arasında kullanılan kısa adlar
+TAKMA_ADLAR = {
+    "afyon": "afyonkarahisar",
+    "maras": "kahramanmaras",
+    "urfa": "sanliurfa",
+    "antep": "gaziantep",
+    "icel": "mersin",
+}
+
+_yukleme_kilit = threading.Lock()
+_iller = None      # normalize il adı -> kayıt
+_ilceler = None    # normalize ilçe adı -> [kayıt, ...]
+_il_matrisi = None
+YOL_KATSAYISI = None
+
+
+def yer_adi_normallestir(metin):
+    # "İ".lower() birleşik nokta bırakır, "'dan/'ya" gibi ekler ve noktalama atılır
+    metin = metin_temizle(metin or "").replace('\u0307', '')
+    metin = re.sub(r"['’]\w*", "", metin)
+    metin = re.sub(r"[^a-z\s]", " ", metin)
+    return re.sub(r"\s+", " ", metin).strip()
+
+
+def _tabloyu_yukle():
+    global _iller, _ilceler, YOL_KATSAYISI
+    with _yukleme_kilit:
+        if _iller is not None: return
+
+        # ~200 satırlık tablo; pandas'a gerek yok, sohbet sürecine yüklenmesin
+        iller, ilceler = {}, {}
+        with open(KOORDINAT_DOSYASI, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                kayit = {"il": row['il'], "ilce": row['ilce'] or None,
+                         "enlem": float(row['enlem']), "boylam": float(row['boylam'])}
+                if row['ilce']:
+                    ilceler.setdefault(yer_adi_normallestir(row['ilce']), []).append(kayit)
+                else:
+                    iller[yer_adi_normallestir(row['il'])] = kayit
+
+        _ilceler = ilceler
+        _iller = iller
+
+        env_katsayi = os.getenv("YOL_KATSAYISI")
+        YOL_KATSAYISI = float(env_katsayi) if env_katsayi else yol_katsayisini_kalibre_et()
+
+
+def haversine_km(enlem1, boylam1, enlem2, boylam2):
+    """Büyük daire mesafesi. Skaler veya NumPy dizileriyle (broadcast) çalışır."""
+    enlem1, boylam1, enlem2, boylam2 = map(np.radians, (enlem1, boylam1, enlem2, boylam2))
+    a = (np.sin((enlem2 - enlem1) / 2) ** 2 +
+         np.cos(enlem1) * np.cos(enlem2) * np.sin((boylam2 - boylam1) / 2) ** 2)
+    return 2 * DUNYA_YARICAPI_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def yol_katsayisini_kalibre_et():
+    """Karayolu / kuş uçuşu oranını kalibrasyon çiftlerinden en küçük kareler ile bulur."""
+    kus_ucusu, karayolu = [], []
+    for a, b, km in KALIBRASYON_CIFTLERI:
+        ya, yb = _iller[yer_adi_normallestir(a)], _iller[yer_adi_normallestir(b)]
+        kus_ucusu.append(haversine_km(ya['enlem'], ya['boylam'], yb['enlem'], yb['boylam']))
+        karayolu.append(km)
+    kus_ucusu, karayolu = np.array(kus_ucusu), np.array(karayolu)
+    return float((kus_ucusu * karayolu).sum() / (kus_ucusu ** 2).sum())
+
+
+def _en_yakin_ad(aday, adlar):
+    if aday in adlar: return aday
+    # Ek almış halleri ("ankaraya", "istanbuldan") en uzun ön ek eşleşmesiyle yakala
+    onekler = [ad for ad in adlar if len(ad) >= 4 and aday.startswith(ad)]
+    if onekler: return max(onekler, key=len)
+    eslesme = difflib.get_close_matches(aday, adlar, n=1, cutoff=BULANIK_ESIK)
+    return eslesme[0] if eslesme else None
+
+
+def yer_coz(metin):
+    """Serbest metindeki il/ilçe adını koordinata çevirir. Bulunamazsa None döner."""
+    _tabloyu_yukle()
+    return _normal_yer_coz(yer_adi_normallestir(metin))
+
+
+@lru_cache(maxsize=4096)
+def _normal_yer_coz(normal_metin):
+    kelimeler = normal_metin.split()
+    if not kelimeler: return None
+
+    adaylar = [" ".join(kelimeler[i:i + 2]) for i in range(len(kelimeler) - 1)]
+    adaylar += ["".join(kelimeler[i:i + 2]) for i in range(len(kelimeler) - 1)]
+    adaylar += kelimeler
+
+    il = None
+    ilce_adaylari = []
+    for aday in adaylar:
+        aday = TAKMA_ADLAR.get(aday, aday)
+        if il is None:
+            il_adi = _en_yakin_ad(aday, _iller)
+            if il_adi:
+                il = _iller[il_adi]
+                continue
+        ilce_adi = _en_yakin_ad(aday, _ilceler)
+        if ilce_adi: ilce_adaylari.extend(_ilceler[ilce_adi])
+
+    if ilce_adaylari:
+        # Aynı adlı ilçelerde (Ereğli) belirtilen ile ait olanı seç
+        if il:
+            uygun = [k for k in ilce_adaylari if k['il'] == il['il']]
+            if uygun: return uygun[0]
+            return il
+        return ilce_adaylari[0]
+    return il
+
+
+def mesafe_hesapla(cikis, varis):
+    """Tahmini karayolu mesafesi (km). Yerlerden biri çözülemezse 0 döner."""
+    a, b = yer_coz(cikis), yer_coz(varis)
+    if not a or not b: return 0
+
+    kus_ucusu = float(haversine_km(a['enlem'], a['boylam'], b['enlem'], b['boylam']))
+    return round(max(kus_ucusu * YOL_KATSAYISI, SEHIR_ICI_MIN_KM), 1)
+
+
+def mesafe_matrisi(enlemler, boylamlar):
+    """Verilen noktaların tüm ikili karayolu mesafeleri (NxN), tek broadcast işlemiyle."""
+    _tabloyu_yukle()
+    enlemler, boylamlar = np.asarray(enlemler, dtype=float), np.asarray(boylamlar, dtype=float)
+    matris = haversine_km(enlemler[:, None], boylamlar[:, None], enlemler[None, :], boylamlar[None, :])
+    return matris * YOL_KATSAYISI
+
+
+def il_mesafe_matrisi():
+    """81 il merkezi için (il adları, 81x81 mesafe matrisi). İlk çağrıda hesaplanıp saklanır."""
+    global _il_matrisi
+    _tabloyu_yukle()
+    if _il_matrisi is None:
+        kayitlar = list(_iller.values())
+        matris = mesafe_matrisi([k['enlem'] for k in kayitlar], [k['boylam'] for k in kayitlar])
+        _il_matrisi = ([k['il'] for k in kayitlar], matris)
+    return _il_matrisi
+
+
+if __name__ == "__main__":
+    import time
+
+    _tabloyu_yukle()
+    print(f"\n--- COĞRAFYA MOTORU ---")
+    print(f"İl: {len(_iller)}, İlçe kaydı: {sum(len(v) for v in _ilceler.values())}")
+    print(f"Yol katsayısı: {YOL_KATSAYISI:.3f}")
+
+    print("\nKalibrasyon çiftleri (tahmin / gerçek):")
+    hatalar = []
+    for a, b, km in KALIBRASYON_CIFTLERI:
+        tahmin = mesafe_hesapla(a, b)
+        hatalar.append(abs(tahmin - km) / km)
+        print(f"  {a:<10} - {b:<11} {tahmin:>7.0f} / {km:<5} (%{100 * (tahmin - km) / km:+.0f})")
+    print(f"Ortalama mutlak yüzde hata: %{100 * np.mean(hatalar):.1f}")
+
+    print("\nÇözümleme örnekleri:")
+    for ornek in ["İstanbul'dan", "ankaraya", "Kadıköy", "Ankara Çankaya", "Zonguldak Ereğli", "Afyon", "Izmır", "Mars"]:
+        print(f"  {ornek:<18} -> {yer_coz(ornek)}")
+
+    baslangic = time.perf_counter()
+    adlar, matris = il_mesafe_matrisi()
+    print(f"\n81x81 il matrisi: {1000 * (time.perf_counter() - baslangic):.2f} ms")
+
+    baslangic = time.perf_counter()
+    for _ in range(1000): mesafe_hesapla("İstanbul Kadıköy", "Ankara Çankaya")
+    print(f"Tekil mesafe hesabı: {(time.perf_counter() - baslangic):.3f} ms/çağrı")
+    print("-----------------------\n")
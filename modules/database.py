@@ -1,17 +1,66 @@
 import sqlite3
 import os
 import re
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from modules.metrikler import Sayac
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_FILE = os.path.join(BASE_DIR, 'sirket_veritabani.db')
 
+# Tarife, kampanya ve şube listesi nadiren değişir; kısa süreli bellekte tutulur
+REFERANS_TTL_SN = 300
+TARIFE_ZAMAN_ASIMI_SN = float(os.getenv("TARIFE_ZAMAN_ASIMI_SN", "5"))
+REFERANS_SORGULARI = {
+    'tarife': "SELECT * FROM ucretlendirme_tarife WHERE id=1",
+    'kampanyalar': "SELECT baslik, detay FROM kampanyalar WHERE aktif_mi = 1",
+    'subeler': "SELECT * FROM subeler",
+}
+_referans_onbellek = {}
+_referans_kilit = threading.Lock()
+
+# Şehir çifti mesafeleri: bellekte LRU, arkasında kalıcı mesafe_onbellek tablosu
+MESAFE_LRU_BOYUT = int(os.getenv("MESAFE_LRU_BOYUT", "2048"))
+_mesafe_lru = OrderedDict()
+_mesafe_kilit = threading.Lock()
+_mesafe_tablosu_hazir = False
+MESAFE_ONBELLEK_SAYACI = Sayac("mesafe_onbellek_toplam", "Mesafe önbelleği sonuçları (bellek, tablo, miss).",
+                               ("sonuc",))
+
 
 def get_db_connection():
     conn = sqlite3.connect(DB_FILE)
     conn.row_factory = sqlite3.Row
     return conn
 
+
+def referans_verisi(anahtar):
+    """REFERANS_SORGULARI'ndaki sorgunun sonucunu (dict listesi) TTL önbellekten döner."""
+    simdi = time.time()
+    with _referans_kilit:
+        kayit = _referans_onbellek.get(anahtar)
+        if kayit and simdi - kayit[0] < REFERANS_TTL_SN:
+            return kayit[1]
+
+    conn = get_db_connection()
+    try:
+        rows = [dict(r) for r in conn.execute(REFERANS_SORGULARI[anahtar]).fetchall()]
+    finally:
+        conn.close()
+
+    with _referans_kilit:
+        _referans_onbellek[anahtar] = (simdi, rows)
+    return rows
+
+
+def referans_verilerini_yukle():
+    for anahtar in REFERANS_SORGULARI:
+        with _referans_kilit:
+            _referans_onbellek.pop(anahtar, None)
+        referans_verisi(anahtar)
+
 def metin_temizle(text):
     if not text: return ""
     text = text.lower()
@@ -24,14 +73,20 @@ def metin_temizle(text):
     return text.strip()
 
 def kampanya_sorgula():
-    conn = get_db_connection()
-    try:
-        rows = conn.execute("SELECT baslik, detay "
-                            "FROM kampanyalar WHERE aktif_mi = 1").fetchall()
-        if not rows: return "Aktif kampanya yok."
-        return " | ".join([f"{r['baslik']}: {r['detay']}" for r in rows])
-    finally:
-        conn.close()
+    rows = referans_verisi('kampanyalar')
+    if not rows: return "Aktif kampanya yok."
+    return " | ".join([f"{r['baslik']}: {r['detay']}" for r in rows])
+
+
+def kampanya_kategorisi(mesaj):
+    """Sorunun hangi kampanyayı sorduğunu başlığın ilk kelimesiyle bulur ("öğrencilere" -> öğrenci); yoksa 'genel'."""
+    kelimeler = metin_temizle(mesaj or "").replace('\u0307', '').split()
+    for r in referans_verisi('kampanyalar'):
+        baslik = metin_temizle(r['baslik'] or "").replace('\u0307', '').split()
+        if not baslik: continue
+        kok = baslik[0][:5]
+        if any(k.startswith(kok) for k in kelimeler): return kok
+    return "genel"
 
 
 def kimlik_dogrula(siparis_no, ad, telefon):
@@ -115,8 +170,92 @@ def kimlik_dogrula(siparis_no, ad, telefon):
     finally:
         conn.close()
 
+def _yer_adi_normallestir(yer):
+    # "İ".lower() birleşik nokta (U+0307) bırakır; "İstanbul" ile "istanbul" aynı anahtara düşsün
+    return re.sub(r'\s+', ' ', metin_temizle(yer).replace('\u0307', ''))
+
+
+def _mesafe_anahtari(cikis, varis):
+    a = _yer_adi_normallestir(cikis)
+    b = _yer_adi_normallestir(varis)
+    # A->B ve B->A aynı kayda düşer
+    return (a, b) if a <= b else (b, a)
+
+
+def _mesafe_tablosunu_hazirla(conn):
+    global _mesafe_tablosu_hazir
+    if _mesafe_tablosu_hazir: return
+    conn.execute('''CREATE TABLE IF NOT EXISTS mesafe_onbellek (
+        yer_a TEXT,
+        yer_b TEXT,
+        mesafe_km REAL,
+        kaynak TEXT,
+        guncelleme_tarihi TEXT,
+        PRIMARY KEY (yer_a, yer_b)
+    )''')
+    conn.commit()
+    _mesafe_tablosu_hazir = True
+
+
+def _lru_ekle(anahtar, mesafe_km):
+    with _mesafe_kilit:
+        _mesafe_lru[anahtar] = mesafe_km
+        _mesafe_lru.move_to_end(anahtar)
+        while len(_mesafe_lru) > MESAFE_LRU_BOYUT:
+            _mesafe_lru.popitem(last=False)
+
+
+def mesafe_onbellekten_getir(cikis, varis):
+    """Önce bellekten, sonra mesafe_onbellek tablosundan bakar. Kayıt yoksa None döner."""
+    if not cikis or not varis: return None
+    anahtar = _mesafe_anahtari(cikis, varis)
+
+    with _mesafe_kilit:
+        if anahtar in _mesafe_lru:
+            _mesafe_lru.move_to_end(anahtar)
+            MESAFE_ONBELLEK_SAYACI.artir(sonuc="bellek")
+            return _mesafe_lru[anahtar]
+
+    conn = get_db_connection()
+    try:
+        _mesafe_tablosunu_hazirla(conn)
+        row = conn.execute("SELECT mesafe_km FROM mesafe_onbellek WHERE yer_a = ? AND yer_b = ?", anahtar).fetchone()
+    except Exception as e:
+        print(f"Mesafe Önbellek Hatası: {e}")
+        row = None
+    finally:
+        conn.close()
+
+    if not row:
+        MESAFE_ONBELLEK_SAYACI.artir(sonuc="miss")
+        return None
+
+    MESAFE_ONBELLEK_SAYACI.artir(sonuc="tablo")
+    _lru_ekle(anahtar, row['mesafe_km'])
+    return row['mesafe_km']
+
+
+def mesafe_kaydet(cikis, varis, mesafe_km, kaynak="gemini"):
+    if not cikis or not varis or not mesafe_km or mesafe_km <= 0: return
+    anahtar = _mesafe_anahtari(cikis, varis)
+    _lru_ekle(anahtar, float(mesafe_km))
+
+    conn = get_db_connection()
+    try:
+        _mesafe_tablosunu_hazirla(conn)
+        conn.execute("INSERT OR REPLACE INTO mesafe_onbellek (yer_a, yer_b, mesafe_km, kaynak, guncelleme_tarihi) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     (anahtar[0], anahtar[1], float(mesafe_km), kaynak, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        conn.commit()
+    except Exception as e:
+        print(f"Mesafe Kaydetme Hatası: {e}")
+    finally:
+        conn.close()
+
+
 def ucret_hesapla(cikis, varis, desi):
-    from modules.gemini_ai import mesafe_hesapla_ai
+    from modules.gemini_ai import mesafe_hesapla
+    from modules import paralel
     if not cikis or not varis or not desi:
         return "Fiyat hesaplayabilmem için 'Nereden', 'Nereye' ve 'Desi' bilgisini söylemelisiniz."
 
@@ -125,17 +264,19 @@ def ucret_hesapla(cikis, varis, desi):
     except:
         return "Lütfen desi bilgisini sayısal olarak belirtin."
 
-    mesafe_km = mesafe_hesapla_ai(cikis, varis)
+    # Tarife okuması mesafe hesabını (Gemini'ye düşebilir) beklemez
+    tarife_isi = paralel.baslat("tarife", referans_verisi, 'tarife')
+    mesafe_km = mesafe_hesapla(cikis, varis)
 
     if mesafe_km == 0:
         return f"Üzgünüm, {cikis} ile {varis} arasındaki mesafeyi hesaplayamadım."
 
-    conn = get_db_connection()
     try:
-        tarife = conn.execute("SELECT * FROM ucretlendirme_tarife "
-                              "WHERE id=1").fetchone()
+        tarifeler = paralel.sonuc_al(tarife_isi, False, TARIFE_ZAMAN_ASIMI_SN, asama="tarife")
 
-        if not tarife: return "Veritabanında tarife bilgisi bulunamadı."
+        if tarifeler is False: return "Sistem hatası: Tarife bilgisi okunamadı."
+        if not tarifeler: return "Veritabanında tarife bilgisi bulunamadı."
+        tarife = tarifeler[0]
 
         sinir_km = tarife['mesafe_siniri_km']
 
@@ -163,8 +304,6 @@ def ucret_hesapla(cikis, varis, desi):
 
     except Exception as e:
         return f"Hesaplama sırasında bir hata oluştu: {e}"
-    finally:
-        conn.close()
 
 def kargo_ucret_itiraz(siparis_no, fatura_no):
     if not siparis_no or not fatura_no:
@@ -200,6 +339,12 @@ def kargo_ucret_itiraz(siparis_no, fatura_no):
     finally:
         conn.close()
 
+# sikayet_olustur'un kayıtları; diğer fonksiyonlar konuyu sistem şablonuyla yazar ("[KRİTİK] ...") ve kendi tipini verir
+MUSTERI_SIKAYET_TIPI = 'MUSTERI_SIKAYETI'
+ACIK_SIKAYET_DURUMLARI = ('ACIK', 'INCELEMEDE')
+COZULMUS_SIKAYET_DURUMLARI = ('COZULDU', 'KAPANDI')
+
+
 def sikayet_olustur(no, konu, musteri_id):
     if not no or not konu: return "Şikayet konusu eksik."
     safe_id = musteri_id if musteri_id else 0
@@ -209,9 +354,9 @@ def sikayet_olustur(no, konu, musteri_id):
         bugun = datetime.now().strftime('%Y-%m-%d')
         conn.execute(
             "INSERT INTO sikayetler (siparis_no, "
-            "olusturan_musteri_id, konu, tarih, durum) "
-            "VALUES (?, ?, ?, ?, 'ACIK')",
-            (no, safe_id, konu, bugun)
+            "olusturan_musteri_id, konu, tarih, durum, tip) "
+            "VALUES (?, ?, ?, ?, 'ACIK', ?)",
+            (no, safe_id, konu, bugun, MUSTERI_SIKAYET_TIPI)
         )
         conn.commit()
 
@@ -224,6 +369,37 @@ def sikayet_olustur(no, konu, musteri_id):
     finally:
         conn.close()
 
+def sikayet_metinleri_getir(son_id=0, acik_idler=()):
+    """Müşterinin sikayet_olustur ile yazdığı şikayetlerden sikayet_id > son_id olanları ve daha önce açık
+    görülen acik_idler'i tarar. {'cozulmus': [{'sikayet_id', 'konu'}], 'acik': [...], 'son_id': ...} döner.
+
+    Çağıran son_id'yi filigran, 'acik' listesini de bir sonraki taramada tekrar bakılmak üzere saklar;
+    böylece hâlâ açık bir kayıt öğrenmeyi durdurmaz, sonradan çözüldüğünde alınır. Çözülmeden kapanan
+    başka durumlar (ör. reddedildi) bırakılır.
+    """
+    conn = get_db_connection()
+    try:
+        acik_idler = list(acik_idler)
+        kosul = "sikayet_id > ?" + (f" OR sikayet_id IN ({','.join('?' * len(acik_idler))})" if acik_idler else "")
+        # tip'i boş eski kayıtlar da sikayet_olustur'dan gelir (diğer fonksiyonlar tip yazar)
+        satirlar = conn.execute(
+            f"SELECT sikayet_id, konu, durum FROM sikayetler "
+            f"WHERE ({kosul}) AND (tip = ? OR tip IS NULL) "
+            f"AND konu IS NOT NULL AND TRIM(konu) != '' ORDER BY sikayet_id",
+            (son_id, *acik_idler, MUSTERI_SIKAYET_TIPI)
+        ).fetchall()
+
+        sonuc = {'cozulmus': [], 'acik': [], 'son_id': son_id}
+        for s in satirlar:
+            sonuc['son_id'] = max(sonuc['son_id'], s['sikayet_id'])
+            if s['durum'] in ACIK_SIKAYET_DURUMLARI:
+                sonuc['acik'].append(s['sikayet_id'])
+            elif s['durum'] in COZULMUS_SIKAYET_DURUMLARI:
+                sonuc['cozulmus'].append({'sikayet_id': s['sikayet_id'], 'konu': s['konu']})
+        return sonuc
+    finally:
+        conn.close()
+
 def gecikme_sikayeti(no, musteri_id):
     if not no:
         return "Gecikme şikayetinizle ilgilenebilmemiz için lütfen sipariş veya takip numaranızı belirtin."
@@ -696,9 +872,8 @@ def sube_sorgula(lokasyon):
 def en_yakin_sube_bul(kullanici_adresi, bilgi_turu="adres"):
     if not kullanici_adresi: return "Size en yakın şubeyi bulabilmem için lütfen bulunduğunuz İl ve İlçeyi söyler misiniz?"
 
-    conn = get_db_connection()
     try:
-        subeler = conn.execute("SELECT * FROM subeler").fetchall()
+        subeler = referans_verisi('subeler')
         kullanici_adres_temiz = metin_temizle(kullanici_adresi)
         bulunan_sube_adi = None
         eslesme_puani = 0
@@ -717,8 +892,6 @@ def en_yakin_sube_bul(kullanici_adresi, bilgi_turu="adres"):
                     bulunan_sube_adi = sube['sube_adi']
                     eslesme_puani = 1
 
-        conn.close()
-
         if bulunan_sube_adi:
 
             if bilgi_turu == "saat":
@@ -0,0 +1,131 @@
+import os
+import re
+import json
+import shutil
+import numpy as np
+
+# TF-IDF + LogisticRegression modellerinin (duygu ve niyet) scikit-learn'süz çıkarım yolu. Sözlük (sıralı
+# terimler), idf ağırlıkları, katsayılar ve sabitler ayrı .npy dosyalarına yazılır; işçiler bunları mmap ile
+# açar, fork edilen süreçler aynı sayfaları paylaşır. Puanlama TfidfVectorizer.transform + predict_proba
+# adımlarını birebir izler (bkz. tests/test_ml_modulu.py, model_hazirla.py --parite).
+
+DIZILER = ("terimler", "sutunlar", "idf", "katsayilar", "sabitler")
+BILGI_DOSYASI = "bilgi.json"
+ANALIZORLER = ("word", "char_wb")
+
+
+def disa_aktar(pipeline, klasor, ust_bilgi=None):
+    """Eğitilmiş TfidfVectorizer + LogisticRegression pipeline'ını klasöre yazar."""
+    vektorlestirici, clf = pipeline[0], pipeline[-1]
+    # Sadece birebir taklit edilen ayarlar desteklenir
+    if (vektorlestirici.analyzer not in ANALIZORLER or vektorlestirici.tokenizer or vektorlestirici.preprocessor
+            or vektorlestirici.stop_words or vektorlestirici.strip_accents or vektorlestirici.binary
+            or not vektorlestirici.use_idf or vektorlestirici.norm != 'l2'):
+        raise ValueError("Bu TF-IDF ayarları NumPy çıkarımında desteklenmiyor.")
+
+    terimler = sorted(vektorlestirici.vocabulary_)
+    diziler = {
+        "terimler": np.array(terimler),
+        "sutunlar": np.array([vektorlestirici.vocabulary_[t] for t in terimler], dtype=np.int32),
+        "idf": np.asarray(vektorlestirici.idf_, dtype=np.float64),
+        # Satır = özellik; bir mesajın birkaç özelliği tek indekslemeyle toplanır
+        "katsayilar": np.ascontiguousarray(clf.coef_.T, dtype=np.float64),
+        "sabitler": np.asarray(clf.intercept_, dtype=np.float64),
+    }
+    bilgi = dict(ust_bilgi or {})
+    bilgi.update({
+        "siniflar": [str(s) for s in clf.classes_],
+        "analizor": vektorlestirici.analyzer,
+        "token_deseni": vektorlestirici.token_pattern,
+        "ngram_araligi": list(vektorlestirici.ngram_range),
+        "kucuk_harf": bool(vektorlestirici.lowercase),
+        "sublinear_tf": bool(vektorlestirici.sublinear_tf),
+    })
+
+    # Yarım yazılmış klasör okunmasın diye geçici klasöre yazılıp tek adımda yerine taşınır
+    gecici = f"{klasor}.{os.getpid()}.tmp"
+    os.makedirs(gecici, exist_ok=True)
+    for ad, dizi in diziler.items():
+        np.save(os.path.join(gecici, f"{ad}.npy"), dizi)
+    with open(os.path.join(gecici, BILGI_DOSYASI), 'w', encoding='utf-8') as f:
+        json.dump(bilgi, f, ensure_ascii=False)
+    try:
+        os.rename(gecici, klasor)
+    except OSError:
+        # Başka bir işçi aynı anda yazdıysa onunki kullanılır
+        shutil.rmtree(gecici, ignore_errors=True)
+        if not os.path.isdir(klasor): raise
+    return klasor
+
+
+class NumpyDuyguModeli:
+    """Pipeline'ın predict_proba / classes_ arayüzünü taklit eder; duygu_analizi_yap değişmeden kullanır."""
+
+    def __init__(self, klasor):
+        self.klasor = klasor
+        for ad in DIZILER:
+            setattr(self, ad, np.load(os.path.join(klasor, f"{ad}.npy"), mmap_mode='r'))
+        with open(os.path.join(klasor, BILGI_DOSYASI), encoding='utf-8') as f:
+            self.bilgi = json.load(f)
+        self.classes_ = np.array(self.bilgi['siniflar'])
+        self._token_deseni = re.compile(self.bilgi['token_deseni'])
+
+    def _ngramlar(self, metin):
+        # sklearn VectorizerMixin._word_ngrams ile aynı sıra: önce tekil terimler, sonra n-gramlar
+        if self.bilgi['kucuk_harf']: metin = metin.lower()
+        # Önceki dışa aktarımlarda analizör yazılmazdı; hepsi kelime tabanlıydı
+        if self.bilgi.get('analizor', 'word') == 'char_wb': return self._karakter_ngramlari(metin)
+        tokenlar = self._token_deseni.findall(metin)
+        min_n, max_n = self.bilgi['ngram_araligi']
+        if max_n == 1: return tokenlar
+
+        sonuc = list(tokenlar) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n + 1, len(tokenlar) + 1)):
+            sonuc.extend(" ".join(tokenlar[i:i + n]) for i in range(len(tokenlar) - n + 1))
+        return sonuc
+
+    def _karakter_ngramlari(self, metin):
+        # sklearn VectorizerMixin._char_wb_ngrams: her kelime boşlukla çevrilir, kelimeden uzun n'ler tek sayılır
+        min_n, max_n = self.bilgi['ngram_araligi']
+        sonuc = []
+        for kelime in re.sub(r"\s\s+", " ", metin).split():
+            kelime = f" {kelime} "
+            for n in range(min_n, max_n + 1):
+                sonuc.extend(kelime[i:i + n] for i in range(max(1, len(kelime) - n + 1)))
+                if len(kelime) <= n: break
+        return sonuc
+
+    def decision_function(self, metinler):
+        """Tüm mesajların TF-IDF satırlarını tek seferde kurar (sklearn gibi: sayım, idf, l2 normu) ve puanlar."""
+        skorlar = np.tile(self.sabitler, (len(metinler), 1))
+        ngramlar = [self._ngramlar(m) for m in metinler]
+        satirlar = np.repeat(np.arange(len(metinler)), [len(n) for n in ngramlar])
+        aranan = np.array([g for n in ngramlar for g in n])
+        if not len(aranan): return skorlar
+
+        konum = np.minimum(np.searchsorted(self.terimler, aranan), len(self.terimler) - 1)
+        bulunan = self.terimler[konum] == aranan
+        # (satır, sütun) çiftleri satır, sonra sütun sırasıyla tekilleştirilir; sklearn'deki sıralı CSR ile aynı
+        anahtar = satirlar[bulunan].astype(np.int64) * len(self.idf) + self.sutunlar[konum[bulunan]]
+        anahtar, adetler = np.unique(anahtar, return_counts=True)
+        satir, sutun = np.divmod(anahtar, len(self.idf))
+
+        tf = adetler.astype(np.float64)
+        if self.bilgi['sublinear_tf']: tf = np.log(tf) + 1
+        degerler = tf * self.idf[sutun]
+        normlar = np.sqrt(np.bincount(satir, weights=degerler * degerler, minlength=len(metinler)))
+        degerler /= normlar[satir]
+
+        np.add.at(skorlar, satir, degerler[:, None] * self.katsayilar[sutun])
+        return skorlar
+
+    def predict_proba(self, metinler):
+        skorlar = self.decision_function(metinler)
+        if skorlar.shape[1] == 1:
+            # İkili sınıflandırmada LogisticRegression tek skor üretir
+            olasilik = 1.0 / (1.0 + np.exp(-skorlar))
+            return np.hstack([1 - olasilik, olasilik])
+        skorlar -= skorlar.max(axis=1, keepdims=True)
+        np.exp(skorlar, out=skorlar)
+        skorlar /= skorlar.sum(axis=1, keepdims=True)
+        return skorlar
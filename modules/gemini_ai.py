@@ -4,37 +4,39 @@ from modules.database import kimlik_dogrula, ucret_hesapla, kampanya_sorgula, ka
     kargo_iptal_et, adres_degistir, kargo_durum_destek, fatura_bilgisi_gonderici, \
     evde_olmama_bildirimi, supervizor_talebi, bildirim_ayari_degistir,  gecikme_sikayeti, \
     kurye_gelmedi_sikayeti, hizli_teslimat_ovgu, \
-    alici_bilgisi_guncelle, isimle_kargo_bul
+    alici_bilgisi_guncelle, isimle_kargo_bul, mesafe_onbellekten_getir, mesafe_kaydet, kampanya_kategorisi
 from modules.ml_modulu import duygu_analizi_yap, teslimat_suresi_hesapla
-from dotenv import load_dotenv
+from modules.metrikler import ASAMA_SURESI, AKSIYON_SURESI, SECILEN_FONKSIYON, CEVAP_POLITIKASI_SAYACI, \
+    YONLENDIRME_KAYNAGI, hata_kaydet
+from modules.niyet_yonlendirici import yerel_yonlendirme
+from modules import llm_istemci, cografya, konusma_hafizasi, cevap_onbellegi, paralel, vergi_motoru, kisitli_mod
+from modules.on_yukleme import OnYukleme
 from datetime import datetime
+import asyncio
 import math
+import time
 import json
 import os
 import re
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_FOLDER = os.path.join(BASE_DIR, 'static')
-ENV_FILE = os.path.join(BASE_DIR, '.env')
-
-load_dotenv(ENV_FILE)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if genai and GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+# yerel: koordinat tablosu, çözülemeyen yerlerde Gemini | gemini: önce Gemini, olmazsa yerel | sadece_yerel
+MESAFE_MODU = os.getenv("MESAFE_MODU", "yerel").lower()
+# Yönlendirme prompt'u duygu notunu içerdiği için duygu analizi en fazla bu kadar beklenir. Gelmezse duygu
+# bilinmiyor sayılır: yerel yönlendirme atlanır, tonu Gemini mesajdan kendisi değerlendirir.
+DUYGU_BEKLEME_SN = float(os.getenv("DUYGU_BEKLEME_SN", "0.3"))
 
 
 def mesafe_hesapla_ai(cikis, varis):
     if not cikis or not varis: return 0
 
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
+    # Aynı şehir çiftleri tekrar tekrar soruluyor; Gemini sadece önbellekte yoksa çağrılır
+    kayitli = mesafe_onbellekten_getir(cikis, varis)
+    if kayitli: return kayitli
 
+    try:
         prompt = f"""
         GÖREV: Aşağıdaki iki lokasyon arasındaki tahmini karayolu sürüş mesafesini kilometre (km) cinsinden ver.
 
@@ -45,28 +47,39 @@ def mesafe_hesapla_ai(cikis, varis):
         1. Sadece sayıyı ver. (Örn: 350.5)
         2. "km", "kilometre" veya açıklama yazma. SADECE SAYI.
         """
-        response = model.generate_content(prompt)
-        text_mesafe = response.text.strip()
+        text_mesafe = llm_istemci.uret(prompt, cagri="mesafe").strip()
         sayi = re.search(r"\d+(\.\d+)?", text_mesafe)
         if sayi:
-            return float(sayi.group())
+            mesafe = float(sayi.group())
+            mesafe_kaydet(cikis, varis, mesafe)
+            return mesafe
         else:
             return 0
 
     except Exception as e:
         print(f"Mesafe hesaplama hatası: {e}")
+        hata_kaydet("mesafe_ai")
         return 0
 
 
+def mesafe_hesapla(cikis, varis):
+    """MESAFE_MODU'na göre yerel coğrafya motorunu ve Gemini'yi birincil/yedek olarak kullanır."""
+    if MESAFE_MODU == "gemini":
+        return mesafe_hesapla_ai(cikis, varis) or cografya.mesafe_hesapla(cikis, varis)
+
+    mesafe = cografya.mesafe_hesapla(cikis, varis)
+    if mesafe or MESAFE_MODU == "sadece_yerel": return mesafe
+    return mesafe_hesapla_ai(cikis, varis)
+
+
 def vergi_hesapla_ai(urun_kategorisi, fiyat, hedef_ulke):
+    """Tur akışında yield from ile kullanılır; Gemini çağrısı LLMIstegi olarak sürücüye bırakılır."""
     print(f"DEBUG: vergi_hesapla_ai çalıştı -> {urun_kategorisi}, {fiyat}, {hedef_ulke}")
 
-    if 'genai' not in globals():
+    if not llm_istemci.kullanilabilir():
         return "Üzgünüm, şu an yapay zeka servisine erişemiyorum."
 
     try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-
         prompt = f"""
         GÖREV: Bir gümrük danışmanı gibi davran ve müşteriye yanıt ver.
 
@@ -87,74 +100,267 @@ def vergi_hesapla_ai(urun_kategorisi, fiyat, hedef_ulke):
         "{hedef_ulke} gönderiniz için tahmini 25 € gümrük vergisi çıkıyor."
         """
 
-        response = model.generate_content(prompt)
-        text_res = response.text.strip()
+        text_res = (yield LLMIstegi(prompt, "vergi")).strip()
 
         text_res = text_res.replace("**", "").replace("```", "")
 
         return text_res
 
+    except llm_istemci.DevreAcikHatasi:
+        # Kısıtlı modda beklenen yol; hata sayılmaz
+        return "Vergi hesaplama servisinde geçici bir yoğunluk var, lütfen daha sonra tekrar deneyin."
     except Exception as e:
         print(f"AI Hatası: {e}")
+        hata_kaydet("vergi_ai")
         return "Vergi hesaplama servisinde geçici bir yoğunluk var, lütfen daha sonra tekrar deneyin."
 
-def process_with_gemini(session_id, user_message, user_sessions):
-    if not genai: return "AI kapalı."
-
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
-
-    simdi = datetime.now()
-    tarih_str = simdi.strftime("%d.%m.%Y")
-    gun_str = simdi.strftime("%A")
-    saat_str = simdi.strftime("%H:%M")
-
-    zaman_bilgisi = f"BUGÜNÜN TARİHİ: {tarih_str} ({gun_str}) - SAAT: {saat_str}"
-
-
-    default_session = {'history': [], 'verified': False, 'tracking_no': None, 'user_name': None, 'role': None,
-                       'user_id': None, 'pending_intent': None}
-    session_data = user_sessions.get(session_id, default_session)
-    for k, v in default_session.items():
-        if k not in session_data: session_data[k] = v
-
-    # Değişkenleri Çek
-    history = session_data['history'][-10:]
-    is_verified = session_data['verified']
-    saved_no = session_data['tracking_no']
-    user_role = session_data['role']
-    user_id = session_data['user_id']
-    pending_intent = session_data.get('pending_intent')
-
-    status_prompt = ""
-    if is_verified:
-        rol_adi = "Gönderici" if user_role == 'gonderici' else "Alıcı"
-        status_prompt = f"DURUM: KULLANICI DOĞRULANDI. Müşteri: {session_data.get('user_name')} ({rol_adi}). Aktif No: {saved_no}."
-    else:
-        status_prompt = f"DURUM: MİSAFİR. Kimlik doğrulanmadı."
-
-    final_user_message = user_message
-    if not is_verified and pending_intent:
-        formatted_history_for_context = "\n".join(history[-4:])
-        final_user_message = f"{user_message} (NOT: Kullanıcı daha önce '{pending_intent}' yapmak istediğini belirtti ve parça parça bilgi veriyor. Eksikleri tamamladıysa doğrulama yap. Geçmiş: {formatted_history_for_context})"
+def vergi_hesapla(urun_kategorisi, fiyat, hedef_ulke):
+    """Tablodaki ülkeler için kural motoru; sadece bilinmeyen ülkelerde Gemini'ye sorulur (yield from ile)."""
+    try:
+        cevap = vergi_motoru.vergi_teklifi(urun_kategorisi, fiyat, hedef_ulke)
+        if cevap: return cevap
+    except Exception as e:
+        print(f"Vergi Motoru Hatası: {e}")
+        hata_kaydet("vergi_motoru")
+    return (yield from vergi_hesapla_ai(urun_kategorisi, fiyat, hedef_ulke))
+
+CUMLE_SONU = re.compile(r'(?<=[.!?])\s+')
+
+# Aksiyon sonucunun kullanıcıya nasıl iletileceği:
+#   direkt: fonksiyon zaten okunacak metni döner, olduğu gibi kullanılır (listede olmayanlar için varsayılan)
+#   sablon: satır/madde biçimindeki çıktı yerelde tek paragraflık konuşma metnine çevrilir
+#   llm:    ham/teknik görünen çıktı Gemini ile yeniden ifade edilir (turda ikinci LLM çağrısı)
+#   ozel:   cevabı fonksiyonun dalı kendisi üretir
+CEVAP_POLITIKASI = {
+    "kimlik_dogrula": "ozel",
+    "kampanya_sorgula": "ozel",
+    "vergi_hesapla_ai": "ozel",
+    "yanlis_teslimat_bildirimi": "ozel",
+    "sube_saat_sorgula": "sablon",
+    "sube_telefon_sorgula": "sablon",
+    "en_yakin_sube_bul": "sablon",
+    "evde_olmama_bildirimi": "sablon",
+    "kargo_ucret_itiraz": "llm",
+    "fatura_bilgisi_gonderici": "llm",
+    "kargo_durum_destek": "llm",
+}
+
+# Veritabanı fonksiyonlarının istisna mesajları kullanıcıya olduğu gibi okunmaz
+TEKNIK_HATA = re.compile(r"^(Hata:|Sistem hatası:|Veritabanı hatası:|Fatura sorgulama hatası:|"
+                         r"Sistemsel bir hata oluştu:|Hesaplama sırasında bir hata oluştu:)")
+TEKNIK_HATA_CEVABI = "Şu anda bu işlemi tamamlayamadım, lütfen biraz sonra tekrar dener misiniz?"
+
+
+def sablona_dok(metin):
+    """Satır ve madde işaretli metni sesli okunacak tek paragrafa çevirir."""
+    satirlar = [s.strip().lstrip("-").strip() for s in str(metin).splitlines()]
+    satirlar = [s if s[-1] in ".!?:" else s + "." for s in satirlar if s]
+    return re.sub(r"\s+", " ", " ".join(satirlar)).strip()
+
+
+def aksiyon_cevabi(func, system_res, politika=None):
+    """direkt/sablon politikasındaki fonksiyonların sonucunu LLM'e gitmeden cevaba çevirir."""
+    metin = str(system_res or "").strip()
+    if TEKNIK_HATA.match(metin):
+        print(f"[DEBUG] Teknik hata kullanıcıdan gizlendi ({func}): {metin}")
+        return TEKNIK_HATA_CEVABI
+    if (politika or CEVAP_POLITIKASI.get(func)) == "sablon":
+        return sablona_dok(metin)
+    return metin
+
+
+def cumlelere_bol(metin):
+    if not metin: return []
+    return [c.strip() for c in CUMLE_SONU.split(metin.strip()) if c.strip()]
+
+
+class LLMIstegi:
+    """Tur akışının sürücüden istediği Gemini çağrısı.
+
+    Akış çağrıyı kendisi yapmaz, bu nesneyi yield eder: senkron sürücü llm_istemci.uret/akisli_uret ile,
+    asenkron sürücü *_async karşılıklarıyla çalıştırır. Sonuç akışa send ile, hata throw ile döner.
+    akisli=True ise dönen değer ilk metin parçasıdır; sonrakiler SONRAKI_PARCA yield edilerek alınır
+    (parçalar bitince None).
+    """
+
+    def __init__(self, prompt, cagri, onek=None, akisli=False, zaman_asimi=None, deneme_sayisi=None):
+        self.prompt, self.cagri, self.onek, self.akisli = prompt, cagri, onek, akisli
+        self.zaman_asimi, self.deneme_sayisi = zaman_asimi, deneme_sayisi
+
+
+SONRAKI_PARCA = object()
+_AKIS_BITTI = object()
+
+
+def _akisli_uret(prompt, cagri, onbellek=None):
+    """Cevabı stream=True ile üretir, tamamlanan her cümleyi 'sentence' olayı olarak yayar ve tam metni döner.
+
+    onbellek: (önbellek çağrı adı, anahtar) verilirse geçerli kayıt Gemini'ye gitmeden cümle cümle yayılır.
+    """
+    if onbellek:
+        kayitli = cevap_onbellegi.getir(*onbellek)
+        if kayitli:
+            for cumle in cumlelere_bol(kayitli):
+                yield {"event": "sentence", "text": cumle}
+            return kayitli
+
+    tam_metin = ""
+    tampon = ""
+    metin = yield LLMIstegi(prompt, cagri, akisli=True)
+    while metin is not None:
+        tam_metin += metin
+        tampon += metin
+
+        cumleler = CUMLE_SONU.split(tampon)
+        tampon = cumleler.pop()
+        for cumle in cumleler:
+            if cumle.strip(): yield {"event": "sentence", "text": cumle.strip()}
+        metin = yield SONRAKI_PARCA
+
+    if tampon.strip(): yield {"event": "sentence", "text": tampon.strip()}
+    if onbellek: cevap_onbellegi.kaydet(onbellek[0], onbellek[1], tam_metin.strip())
+    return tam_metin.strip()
+
+
+def _zorunlu_katlama(session_id, session_data, oturum_deposu):
+    """Arka plan özeti yetişemediyse eski satırları, depo onları kırpmadan önce bu turda özete katlar."""
+    katlanacak = konusma_hafizasi.zorunlu_katlanacaklar(session_data)
+    if not katlanacak: return
+    yeni_ozet = None
+    try:
+        prompt = konusma_hafizasi.ozet_istemi(session_data.get('summary'), katlanacak)
+        yeni_ozet = (yield LLMIstegi(prompt, "ozet", zaman_asimi=konusma_hafizasi.OZET_ZAMAN_ASIMI_SN,
+                                     deneme_sayisi=1)).strip()
+    except Exception as e:
+        # Özet yoksa satırlar kısaltılarak özete eklenir (katla), yine de kaybolmaz
+        print(f"Özetleme Hatası: {e}")
+        hata_kaydet("hafiza_ozet")
+    yazilan = oturum_deposu.guncelle(session_id, lambda oturum: konusma_hafizasi.katla(oturum, katlanacak, yeni_ozet))
+    konusma_hafizasi.OZETLEME_SAYACI.artir(sonuc="zorunlu" if yazilan is not None else "atlandi")
+    if yazilan is not None:
+        session_data.clear()
+        session_data.update(yazilan)
+
+
+def process_with_gemini(session_id, user_message, oturum_deposu, cevap_hazir=None):
+    """cevap_hazir(metin): cevap belli olur olmaz, oturum kaydından önce bir kez çağrılır (TTS erken başlasın diye)."""
+    final_reply = None
+    bildirildi = False
+    for olay in sohbet_akisi(session_id, user_message, oturum_deposu):
+        if olay['event'] in ("reply", "done") and cevap_hazir and not bildirildi:
+            cevap_hazir(olay['response'])
+            bildirildi = True
+        if olay['event'] == "done":
+            final_reply = olay['response']
+    return final_reply
+
+
+async def process_with_gemini_async(session_id, user_message, oturum_deposu, havuz=None, cevap_hazir=None):
+    final_reply = None
+    bildirildi = False
+    async for olay in sohbet_akisi_async(session_id, user_message, oturum_deposu, havuz):
+        if olay['event'] in ("reply", "done") and cevap_hazir and not bildirildi:
+            cevap_hazir(olay['response'])
+            bildirildi = True
+        if olay['event'] == "done":
+            final_reply = olay['response']
+    return final_reply
+
+
+def _adim_at(akis, deger, hata):
+    # StopIteration Future'dan geçemediği için akışın bitişi işaretle döner
+    try:
+        return akis.throw(hata) if hata is not None else akis.send(deger)
+    except StopIteration:
+        return _AKIS_BITTI
 
-    duygu_durumu, duygu_skoru = duygu_analizi_yap(user_message)
-    print(f"[NLP ANALİZİ] Müşteri Duygusu: {duygu_durumu} (Skor: {duygu_skoru})")
 
-    duygu_notu = ""
-    if "KIZGIN (NEGATİF)" in duygu_durumu:
-        duygu_notu = "DİKKAT: Müşteri şu an ÖFKELİ görünüyor. Cevabında mutlaka alttan al, çok nazik ol, özür dile ve çözüm odaklı konuş. Asla tartışmaya girme."
-    elif "MUTLU (POZİTİF)" in duygu_durumu:
-        duygu_notu = "İPUCU: Müşteri MEMNUN görünüyor. Enerjik ve samimi bir dille teşekkür et."
+def sohbet_akisi(session_id, user_message, oturum_deposu):
+    """Bir sohbet turunu olay akışı olarak işler.
 
-    system_prompt = f"""
-    GÖREV: Hızlı Kargo sesli asistanısın. {status_prompt}
+    Olaylar: route (yönlendirme kararı), action (fonksiyon sonucu), sentence (cevabın
+    hazır olan her cümlesi), oturum kaydından hemen önce tam cevabı taşıyan reply ve
+    kayıttan sonra en sonda done.
+    """
+    akis = _tur_akisi(session_id, user_message, oturum_deposu)
+    parcalar = None
+    deger, hata = None, None
+    try:
+        while True:
+            olay = _adim_at(akis, deger, hata)
+            deger, hata = None, None
+            if olay is _AKIS_BITTI: return
+            try:
+                if isinstance(olay, LLMIstegi) and olay.akisli:
+                    if parcalar is not None: parcalar.close()
+                    parcalar = llm_istemci.akisli_uret(olay.prompt, cagri=olay.cagri)
+                    deger = next(parcalar, None)
+                elif isinstance(olay, LLMIstegi):
+                    deger = llm_istemci.uret(olay.prompt, cagri=olay.cagri, onek=olay.onek,
+                                             zaman_asimi=olay.zaman_asimi, deneme_sayisi=olay.deneme_sayisi)
+                elif olay is SONRAKI_PARCA:
+                    deger = next(parcalar, None)
+                else:
+                    yield olay
+            except Exception as e:
+                hata = e
+    finally:
+        if parcalar is not None: parcalar.close()
+        akis.close()
+
+
+async def sohbet_akisi_async(session_id, user_message, oturum_deposu, havuz=None):
+    """sohbet_akisi'nin asyncio sürümü.
+
+    Gemini çağrıları async istemciyle (generate_content_async) event loop'ta beklenir. Aradaki
+    bloklayan adımlar (SQLite, sklearn, gTTS kuyruğu) verilen thread havuzunda ilerletilir.
+    """
+    loop = asyncio.get_running_loop()
+    akis = _tur_akisi(session_id, user_message, oturum_deposu)
+    parcalar = None
+    deger, hata = None, None
+    try:
+        while True:
+            olay = await loop.run_in_executor(havuz, _adim_at, akis, deger, hata)
+            deger, hata = None, None
+            if olay is _AKIS_BITTI: return
+            try:
+                if isinstance(olay, LLMIstegi) and olay.akisli:
+                    if parcalar is not None: await parcalar.aclose()
+                    parcalar = llm_istemci.akisli_uret_async(olay.prompt, cagri=olay.cagri)
+                    deger = await anext(parcalar, None)
+                elif isinstance(olay, LLMIstegi):
+                    deger = await llm_istemci.uret_async(olay.prompt, cagri=olay.cagri, onek=olay.onek,
+                                                         zaman_asimi=olay.zaman_asimi,
+                                                         deneme_sayisi=olay.deneme_sayisi)
+                elif olay is SONRAKI_PARCA:
+                    deger = await anext(parcalar, None)
+                else:
+                    yield olay
+            except Exception as e:
+                hata = e
+    finally:
+        if parcalar is not None: await parcalar.aclose()
+        try:
+            akis.close()
+        except ValueError:
+            # İstemci koptuğunda adım hâlâ havuzda çalışıyor olabilir; bitince kendiliğinden kapanır
+            pass
+
+
+# Yönlendirme talimatının sabit kısmı: modül yüklenirken bir kez oluşturulur, her turda aynı kalır.
+# Oturuma göre değişen değerler (durum, zaman, duygu notu, takip no) turda BAĞLAM bloğu olarak eklenir;
+# böylece önek sağlayıcı tarafında önbelleğe alınabilir (bkz. llm_istemci.BaglamOnbellegi).
+YONLENDIRME_TALIMATI = """
+    GÖREV: Hızlı Kargo sesli asistanısın. Oturum DURUM'u en sondaki BAĞLAM bölümündedir.
     
-    SİSTEM ZAMANI: {zaman_bilgisi}
-    (Tüm tarih hesaplamalarını, 'bugün', 'yarın', '2 gün sonra' gibi ifadeleri yukarıdaki SİSTEM ZAMANI'na göre yap.)
+    SİSTEM ZAMANI: BAĞLAM bölümündeki ZAMAN satırı.
+    (Tüm tarih hesaplamalarını, 'bugün', 'yarın', '2 gün sonra' gibi ifadeleri BAĞLAM'daki SİSTEM ZAMANI'na göre yap.)
 
     !!! KRİTİK DUYGU DURUMU ANALİZİ !!!
-    {duygu_notu}
+    BAĞLAM bölümünde DUYGU notu varsa cevabının tonunu ona göre ayarla.
+
+    YER TUTUCULAR: Parametrelerde AKTIF_NO (doğrulanmış takip no), MUSTERI_ID ve KAYITLI_AD yazılarını aynen kullanabilirsin; sistem bunları BAĞLAM'daki değerlerle doldurur.
 
     ÖN İŞLEM: Tek tek söylenen sayıları birleştir (bir iki üç -> 123).
     ÇIKTI: SADECE JSON.
@@ -186,9 +392,9 @@ def process_with_gemini(session_id, user_message, user_sessions):
        - ASİSTANIN AMACI: Doğrudan 'isimle_kargo_bul' fonksiyonunu çalıştırmaktır.
        - AKSİYON: Fonksiyon için gerekli parametreler (Ad ve Telefon) eksik olduğu için kullanıcıya bunları sor.
        
-       *Adım 1:* {{ "type": "chat", "reply": "Anladım, numaranızla ilgili sorun varsa isminizle sorgulama yapalım. Adınız ve Soyadınız nedir?" }}
-       *Adım 2 (İsim gelince):* {{ "type": "chat", "reply": "Teşekkürler [İSİM]. Güvenliğiniz için telefon numaranızı da söyler misiniz?" }}
-       *Adım 3 (Telefon gelince):* {{ "type": "action", "function": "isimle_kargo_bul", "parameters": {{ "ad_soyad": "...", "telefon": "..." }} }}
+       *Adım 1:* { "type": "chat", "reply": "Anladım, numaranızla ilgili sorun varsa isminizle sorgulama yapalım. Adınız ve Soyadınız nedir?" }
+       *Adım 2 (İsim gelince):* { "type": "chat", "reply": "Teşekkürler [İSİM]. Güvenliğiniz için telefon numaranızı da söyler misiniz?" }
+       *Adım 3 (Telefon gelince):* { "type": "action", "function": "isimle_kargo_bul", "parameters": { "ad_soyad": "...", "telefon": "..." } }
        
         Kullanıcı bilgileri parça parça verirse hafızanı kullan.
     
@@ -204,16 +410,16 @@ def process_with_gemini(session_id, user_message, user_sessions):
        (Kullanıcının verdiği parçaları hafızanda tut ve eksik olanı bu sıraya göre sor).
 
        A. ADIM 1 (Ad Eksik): Kullanıcı kimlik doğrulama gerektiren bir işlem yapmak istedi ama ismi yok.
-          -> {{ "type": "chat", "reply": "Size yardımcı olabilmem için önce adınızı ve soyadınızı öğrenebilir miyim?" }}
+          -> { "type": "chat", "reply": "Size yardımcı olabilmem için önce adınızı ve soyadınızı öğrenebilir miyim?" }
        
        B. ADIM 2 (Takip No Eksik): Adı biliyorsun ama Takip No yok.
-          -> {{ "type": "chat", "reply": "Teşekkürler [İSİM]. Şimdi kargo takip numaranızı söyler misiniz?" }}
+          -> { "type": "chat", "reply": "Teşekkürler [İSİM]. Şimdi kargo takip numaranızı söyler misiniz?" }
           
        C. ADIM 3 (Telefon Eksik): Ad ve Takip No var, Telefon yok.
-          -> {{ "type": "chat", "reply": "Güvenliğiniz için son olarak telefon numaranızı rica edebilir miyim?" }}
+          -> { "type": "chat", "reply": "Güvenliğiniz için son olarak telefon numaranızı rica edebilir miyim?" }
           
        D. FİNAL (Hepsi Tamam): Ad + Takip No + Telefon var.
-          -> {{ "type": "action", "function": "kimlik_dogrula", "parameters": {{ "ad": "...", "no": "...", "telefon": "..." }} }}
+          -> { "type": "action", "function": "kimlik_dogrula", "parameters": { "ad": "...", "no": "...", "telefon": "..." } }
           
        
     ANALİZ KURALLARI VE ÖNCELİKLERİ:
@@ -224,48 +430,48 @@ def process_with_gemini(session_id, user_message, user_sessions):
 
     # KAMPANYA SORGULAMA (YÜKSEK ÖNCELİK VE GÜÇLÜ KURAL)
     - "Öğrenci indirimi var mı?", "Kampanyalarınız neler?", "Bana özel plan var mı?", "İndirim", "kampanya", "fırsat", "özel teklif", "öğrenci", "plan" kelimelerinden HERHANGİ BİRİ GEÇİYORSA VEYA SORULUYORSA İLK ÖNCE BU KURALI ÇALIŞTIR.
-      -> {{ "type": "action", "function": "kampanya_sorgula", "parameters": {{}} }}
+      -> { "type": "action", "function": "kampanya_sorgula", "parameters": {} }
       
    # İSİMLE KARGO BULMA 
    - Kullanıcı **"takip numarası hatalı", "geçersiz numara", "kod yanlış", "sistem görmüyor"**, **"numaram yok"** veya **"numara bulunamadı"** gibi sorunlardan bahsediyorsa:
-      -> {{ "type": "action", "function": "takip_numarasi_hatasi", "parameters": {{}} }}
+      -> { "type": "action", "function": "takip_numarasi_hatasi", "parameters": {} }
       (KURAL: Eğer kullanıcı sadece adını söylerse (Örn: "Adım Can"), telefon numarasını da iste. Fonksiyonu eksik parametreyle çağırma.)
 
     # FİYAT SORGULAMA 
     - "İstanbul'dan Ankara'ya kargo ne kadar?", "Fiyat hesapla"
-      -> {{ "type": "action", "function": "ucret_hesapla", "parameters": {{ "cikis": "...", "varis": "...", "desi": "..." }} }}
+      -> { "type": "action", "function": "ucret_hesapla", "parameters": { "cikis": "...", "varis": "...", "desi": "..." } }
       (Eğer eksik bilgi varsa sor).
 
     # TESLİMAT SÜRESİ TAHMİNİ
     - "Kargo kaç günde gider?", "İzmir İstanbul arası ne kadar sürer?", "Tahmini varış süresi hesapla", "Teslimat kaç gün sürer?":
-      -> {{ "type": "action", "function": "teslimat_suresi_hesapla_ai", "parameters": {{ "cikis": "...", "varis": "...", "desi": "..." }} }}
+      -> { "type": "action", "function": "teslimat_suresi_hesapla_ai", "parameters": { "cikis": "...", "varis": "...", "desi": "..." } }
       (Not: Eğer kullanıcı desi belirtmediyse varsayılan olarak '5' kabul et).
 
     # "EN YAKIN" İFADESİ GEÇİYORSA (KRİTİK):
     - Kullanıcı "en yakın", "bana yakın" kelimelerini kullanıyorsa:
-      - "En yakın şubenin telefonu?", "En yakın şubeyi aramak istiyorum" -> {{ "type": "action", "function": "en_yakin_sube_bul", "parameters": {{ "kullanici_adresi": "...", "bilgi_turu": "telefon" }} }}
-      - "En yakın şube saatleri?", "Kaça kadar açık?" -> {{ "type": "action", "function": "en_yakin_sube_bul", "parameters": {{ "kullanici_adresi": "...", "bilgi_turu": "saat" }} }}
-      - "En yakın şube nerede?", "Adresi ne?" -> {{ "type": "action", "function": "en_yakin_sube_bul", "parameters": {{ "kullanici_adresi": "...", "bilgi_turu": "adres" }} }}
+      - "En yakın şubenin telefonu?", "En yakın şubeyi aramak istiyorum" -> { "type": "action", "function": "en_yakin_sube_bul", "parameters": { "kullanici_adresi": "...", "bilgi_turu": "telefon" } }
+      - "En yakın şube saatleri?", "Kaça kadar açık?" -> { "type": "action", "function": "en_yakin_sube_bul", "parameters": { "kullanici_adresi": "...", "bilgi_turu": "saat" } }
+      - "En yakın şube nerede?", "Adresi ne?" -> { "type": "action", "function": "en_yakin_sube_bul", "parameters": { "kullanici_adresi": "...", "bilgi_turu": "adres" } }
       (ÖNEMLİ: Eğer kullanıcı mesajında il/ilçe/mahalle belirttiyse 'kullanici_adresi'ne yaz, yoksa boş bırak).
 
     # NORMAL ŞUBE SORGULARI ("EN YAKIN" YOKSA):
-    - "Şubeniz nerede?", "Kadıköy şubesi adresi" -> {{ "type": "action", "function": "sube_sorgula", "parameters": {{ "lokasyon": "..." }} }}
+    - "Şubeniz nerede?", "Kadıköy şubesi adresi" -> { "type": "action", "function": "sube_sorgula", "parameters": { "lokasyon": "..." } }
 
     # SAAT SORGUSU (GÜNCELLENEN KISIM)
     - "Kaça kadar açıksınız?", "Pazar açık mı?", "Orası saat kaçta kapanıyor?", "Bu şube kaça kadar hizmet veriyor?":
-      -> {{ "type": "action", "function": "sube_saat_sorgula", "parameters": {{ "lokasyon": "..." }} }}
+      -> { "type": "action", "function": "sube_saat_sorgula", "parameters": { "lokasyon": "..." } }
       (KRİTİK KURAL: Eğer kullanıcı "orası", "bu şube", "o şube" gibi zamirler kullanırsa veya hiç yer belirtmezse ("Kaça kadar açık?" gibi), GEÇMİŞ SOHBETTE (özellikle asistanın son cevabında) geçen EN SON şube ismini (Örn: Beşiktaş) al ve 'lokasyon' parametresine yaz.)
 
     # TELEFON SORGUSU
     - "Telefon numaranız ne?", "Oranın numarası kaç?", "Peki bu şubenin telefonu ne?":
-      -> {{ "type": "action", "function": "sube_telefon_sorgula", "parameters": {{ "lokasyon": "..." }} }}
+      -> { "type": "action", "function": "sube_telefon_sorgula", "parameters": { "lokasyon": "..." } }
       (KRİTİK KURAL: Eğer kullanıcı "bu şube", "oranın", "orası" gibi zamirler kullanırsa, GEÇMİŞ SOHBETTE geçen EN SON şube ismini al ve 'lokasyon' parametresine yaz.)
 
     # SÜPERVİZÖR / CANLI DESTEK (ÖZEL İSTİSNA - SADECE AD VE TELEFON YETERLİ)
     - "Yetkiliyle görüşmek istiyorum", "Süpervizör", "İnsana bağla", "Müşteri temsilcisi":
       - Bu işlem için TAKİP NUMARASI GEREKMEZ.
       - Sırasıyla SADECE Ad Soyad ve Telefon iste. Önce ad -> sonra telefon.
-      - Bilgiler (Geçmiş sohbet dahil) tamamsa -> {{ "type": "action", "function": "supervizor_talebi", "parameters": {{ "ad": "...", "telefon": "..." }} }}
+      - Bilgiler (Geçmiş sohbet dahil) tamamsa -> { "type": "action", "function": "supervizor_talebi", "parameters": { "ad": "...", "telefon": "..." } }
       - Eksikse sadece Ad veya Telefon iste
 
     2. --- İKİNCİ ÖNCELİK: KİMLİK DOĞRULAMA (KİŞİSEL İŞLEMLER İÇİN) ---
@@ -278,126 +484,245 @@ def process_with_gemini(session_id, user_message, user_sessions):
     
     - HATA DURUMUNDA DAVRANIŞ:
       - Eğer kullanıcı "Numaramı yanlış söyledim, doğrusu 12345" derse:
-        -> {{ "type": "action", "function": "kimlik_dogrula", "parameters": {{ "ad": "{session_data.get('user_name') or '...'}", "no": "12345", "telefon": "{session_data.get('phone') or '...'}" }} }}
+        -> { "type": "action", "function": "kimlik_dogrula", "parameters": { "ad": "KAYITLI_AD", "no": "12345", "telefon": "..." } }
       (Yani sadece değişeni güncelle, diğerlerini koru).
       - Hata varsa eşleşmeyen veriyi belirt, örneğin kargo takip numarası hatalıysa müşteriye söylediği numaranın sistemdeki numarayla eşleşmediğini söyle ve yeniden numara belirtmesini iste.
-      - Ad, Numara ve Telefon elimizdeyse -> {{ "type": "action", "function": "kimlik_dogrula", "parameters": {{ "ad": "...", "no": "...", "telefon": "..." }} }}
+      - Ad, Numara ve Telefon elimizdeyse -> { "type": "action", "function": "kimlik_dogrula", "parameters": { "ad": "...", "no": "...", "telefon": "..." } }
 
     --- SENARYO 2: KULLANICI DOĞRULANMIŞ İSE (GİRİŞ YAPILDI) ---
     Eğer 'DURUM: KULLANICI DOĞRULANDI' ise:
-    1. Hafızadaki '{{saved_no}}' numarasını kullan.
+    1. Hafızadaki 'AKTIF_NO' numarasını kullan.
 
     2. İŞLEMLER:
-    # "Kargom nerede?" -> {{ "type": "action", "function": "kargo_sorgula", "parameters": {{ "no": "{saved_no}" }} }}
+    # "Kargom nerede?" -> { "type": "action", "function": "kargo_sorgula", "parameters": { "no": "AKTIF_NO" } }
 
     # "Yanlış adrese gitti", "Kargom başka yere teslim edildi", "Ben oraya yollamadım" (YANLIŞ TESLİMAT):
-      -> {{ "type": "action", "function": "yanlis_teslimat_bildirimi", "parameters": {{ "no": "{saved_no}", "dogru_adres": "..." }} }}
+      -> { "type": "action", "function": "yanlis_teslimat_bildirimi", "parameters": { "no": "AKTIF_NO", "dogru_adres": "..." } }
       (Eğer doğru adres belirtilmediyse "dogru_adres" boş bırakılsın).
       (KRİTİK KURAL: Kullanıcı sadece "Gelmedi", "Almadım", "Yok" diyorsa bunu seçme. Mutlaka "Adres yanlış", "Yanlış yere gitti", "Eski adresim" gibi YER/ADRES hatası belirten bir ifade olmalı.)
 
     # İADE TALEBİ (DB KAYDI İÇİN SEBEP ZORUNLU)
     - "İade etmek istiyorum", "Geri göndereceğim":
       - EĞER sebep belliyse (Örn: "kırıldı", "beğenmedim") VE KULLANICI DOĞRULANMAMIŞSA VEYA EKSİK BİLGİ VARSA:
-        -> {{ "type": "chat", "reply": "İade işlemini başlatmak için lütfen kimlik doğrulaması yapalım. Lütfen Adınızı Soyadınızı, sipariş numaranızı ve telefon numaranızı sırayla söyleyin." }}
+        -> { "type": "chat", "reply": "İade işlemini başlatmak için lütfen kimlik doğrulaması yapalım. Lütfen Adınızı Soyadınızı, sipariş numaranızı ve telefon numaranızı sırayla söyleyin." }
       - EĞER sebep belliyse VE KULLANICI DOĞRULANMIŞSA:
-        -> {{ "type": "action", "function": "iade_islemi_baslat", "parameters": {{ "no": "{saved_no}", "sebep": "..." }} }}
+        -> { "type": "action", "function": "iade_islemi_baslat", "parameters": { "no": "AKTIF_NO", "sebep": "..." } }
       - EĞER sebep HİÇ BELLİ DEĞİLSE:
-        -> {{ "type": "chat", "reply": "İade işlemini başlatmak için lütfen iade sebebinizi kısaca belirtir misiniz?" }}
+        -> { "type": "chat", "reply": "İade işlemini başlatmak için lütfen iade sebebinizi kısaca belirtir misiniz?" }
 
     # İPTAL TALEBİ 
     - "Kargoyu iptal et", "Vazgeçtim göndermeyeceğim", "İptal etmek istiyorum":
-      -> {{ "type": "action", "function": "kargo_iptal_et", "parameters": {{ "no": "{saved_no}" }} }}
+      -> { "type": "action", "function": "kargo_iptal_et", "parameters": { "no": "AKTIF_NO" } }
 
     # TESLİMAT SAATİ 
     - "Ne zaman gelir?", "Saat kaçta teslim olur?", "Hangi gün gelir?":
-      -> {{ "type": "action", "function": "tahmini_teslimat", "parameters": {{ "no": "{saved_no}" }} }}
+      -> { "type": "action", "function": "tahmini_teslimat", "parameters": { "no": "AKTIF_NO" } }
 
     # KARGONUN GECİKMESİ ŞİKAYETİ 
-    - "Kargom gecikti", "teslimat süresi aşıldı", "çok yordu" -> {{ "type": "action", "function": "gecikme_sikayeti", "parameters": {{ "no": "{saved_no}", "musteri_id": "{{user_id}}" }} }}
+    - "Kargom gecikti", "teslimat süresi aşıldı", "çok yordu" -> { "type": "action", "function": "gecikme_sikayeti", "parameters": { "no": "AKTIF_NO", "musteri_id": "MUSTERI_ID" } }
 
     # KARGO TAKİP NUMARASI HATASI 
     - Kullanıcı **"takip numarası hatalı", "geçersiz numara", "kod yanlış", "sistem görmüyor"** veya **"numara bulunamadı"** gibi sorunlardan bahsediyorsa:
-      -> {{ "type": "action", "function": "takip_numarasi_hatasi", "parameters": {{}} }}
+      -> { "type": "action", "function": "takip_numarasi_hatasi", "parameters": {} }
 
     # KURYE GELMEMESİ ŞİKAYETİ 
-    - "Kurye gelmedi", "alım saati geçti" -> {{ "type": "action", "function": "kurye_gelmedi_sikayeti", "parameters": {{}} }}
+    - "Kurye gelmedi", "alım saati geçti" -> { "type": "action", "function": "kurye_gelmedi_sikayeti", "parameters": {} }
 
     # ÖVGÜ 
-    - "Teşekkürler", "Hızlı geldi", "Memnun kaldım" -> {{ "type": "action", "function": "hizli_teslimat_ovgu", "parameters": {{}} }}
+    - "Teşekkürler", "Hızlı geldi", "Memnun kaldım" -> { "type": "action", "function": "hizli_teslimat_ovgu", "parameters": {} }
 
     # BİLDİRİM AYARI DEĞİŞTİR 
-    - "Bildirim ayarını değiştir", "SMS istemiyorum", "E-posta gelsin" -> {{ "type": "action", "function": "bildirim_ayari_degistir", "parameters": {{ "tip": "...", "musteri_id": "{{user_id}}" }} }}
+    - "Bildirim ayarını değiştir", "SMS istemiyorum", "E-posta gelsin" -> { "type": "action", "function": "bildirim_ayari_degistir", "parameters": { "tip": "...", "musteri_id": "MUSTERI_ID" } }
 
     # KİMLİK DOĞRULAMA SORUNU 
     - Kullanıcı **kimlik doğrulama yapamıyorum, hata alıyorum, bilgilerim yanlış** gibi sorunlardan bahsediyorsa:
-      -> {{ "type": "action", "function": "kimlik_dogrulama_sorunu", "parameters": {{}} }}
+      -> { "type": "action", "function": "kimlik_dogrulama_sorunu", "parameters": {} }
 
     # VERGİ HESAPLAMA 
     - "Laptop Almanya'ya gidiyor fiyat 1000 Euro", "Almanya'ya ne kadar vergi çıkar?"
-      -> {{ "type": "action", "function": "vergi_hesapla_ai", "parameters": {{ "urun_kategorisi": "...", "fiyat": "...", "hedef_ulke": "..." }} }}
+      -> { "type": "action", "function": "vergi_hesapla_ai", "parameters": { "urun_kategorisi": "...", "fiyat": "...", "hedef_ulke": "..." } }
 
     # GENEL MÜŞTERİ ŞİKAYETİ (Kurye Kaba, Yanlış Faturalandırma vb.)
     - "Şikayetim var", "Kurye kaba davrandı", "Yanlış fatura geldi":
-      - Konu belli değilse -> {{ "type": "chat", "reply": "Anlıyorum, yaşadığınız sorun nedir? Lütfen şikayetinizi kısaca belirtin." }}
-      - Konu belliyse -> {{ "type": "action", "function": "sikayet_olustur", "parameters": {{ "no": "{{saved_no}}", "konu": "..." }} }}
+      - Konu belli değilse -> { "type": "chat", "reply": "Anlıyorum, yaşadığınız sorun nedir? Lütfen şikayetinizi kısaca belirtin." }
+      - Konu belliyse -> { "type": "action", "function": "sikayet_olustur", "parameters": { "no": "AKTIF_NO", "konu": "..." } }
 
     # HASAR BİLDİRİMİ (TAZMİNAT)
     - "Kargom kırık geldi", "Paket ezilmiş", "Ürün hasarlı", "Islanmış", "Parçalanmış":
-      - EĞER hasar tipi belliyse -> {{ "type": "action", "function": "hasar_kaydi_olustur", "parameters": {{ "no": "{saved_no}", "hasar_tipi": "..." }} }}
-      - EĞER tip belli değilse -> {{ "type": "chat", "reply": "Çok üzgünüz. Hasarın türü nedir? (Kırık, Ezik, Islak, Kayıp)" }}
+      - EĞER hasar tipi belliyse -> { "type": "action", "function": "hasar_kaydi_olustur", "parameters": { "no": "AKTIF_NO", "hasar_tipi": "..." } }
+      - EĞER tip belli değilse -> { "type": "chat", "reply": "Çok üzgünüz. Hasarın türü nedir? (Kırık, Ezik, Islak, Kayıp)" }
 
     # KENDİ ADRESİNİ DEĞİŞTİRME (Gelen Kargo)
     - "Adresimi değiştirmek istiyorum", "Kapı numarasını yanlış yazmışım":
       - EĞER kullanıcı TAM YENİ ADRESİ (Mahalle, sokak, no, ilçe/il) söylediyse:
-        -> {{ "type": "action", "function": "adres_degistir", "parameters": {{ "no": "{saved_no}", "yeni_adres": "..." }} }}
+        -> { "type": "action", "function": "adres_degistir", "parameters": { "no": "AKTIF_NO", "yeni_adres": "..." } }
       - EĞER kullanıcı SADECE DÜZELTME istediyse ("Kapı nosunu 5 yap"):
-        -> {{ "type": "chat", "reply": "Adresinizin eksiksiz olması için lütfen güncel ve TAM adresinizi (Mahalle, Sokak, No, İlçe) söyler misiniz?" }}
+        -> { "type": "chat", "reply": "Adresinizin eksiksiz olması için lütfen güncel ve TAM adresinizi (Mahalle, Sokak, No, İlçe) söyler misiniz?" }
 
     # ALICI ADRESİNİ DEĞİŞTİRME (Giden Kargo)
     - "Gönderdiğim kargonun adresi yanlış", "Alıcı adresini değiştirmek istiyorum":
       - EĞER kullanıcı TAM YENİ ADRESİ söylediyse:
-        -> {{ "type": "action", "function": "adres_degistir", "parameters": {{ "no": "{saved_no}", "yeni_adres": "..." }} }}
+        -> { "type": "action", "function": "adres_degistir", "parameters": { "no": "AKTIF_NO", "yeni_adres": "..." } }
       - EĞER kullanıcı SADECE DÜZELTME istediyse ("Sadece apartman adını düzelt"):
-        -> {{ "type": "chat", "reply": "Karışıklık olmaması için lütfen alıcının güncel ve TAM adresini (Mahalle, Sokak, No, İlçe) söyler misiniz?" }}
+        -> { "type": "chat", "reply": "Karışıklık olmaması için lütfen alıcının güncel ve TAM adresini (Mahalle, Sokak, No, İlçe) söyler misiniz?" }
 
     # GECİKEN / HAREKETSİZ KARGO
     - "Kargom günlerdir aynı yerde", "Neden ilerlemiyor?", "Transferde takıldı":
-      - "Kargom gecikti", "teslimat süresi aşıldı", "çok yordu" -> {{ "type": "action", "function": "gecikme_sikayeti", "parameters": {{ "no": "{saved_no}", "musteri_id": "{user_id}" }} }}
+      - "Kargom gecikti", "teslimat süresi aşıldı", "çok yordu" -> { "type": "action", "function": "gecikme_sikayeti", "parameters": { "no": "AKTIF_NO", "musteri_id": "MUSTERI_ID" } }
 
     # FATURA İTİRAZI
     - "Faturam çok uçuk", "İtiraz ediyorum", "çok yüksek", "Faturam yanlış" (Agresif ifadeler dahil):
-    - -> {{ "type": "action", "function": "kargo_ucret_itiraz", "parameters": {{ "no": "{saved_no}", "fatura_no": "..." }} }}
+    - -> { "type": "action", "function": "kargo_ucret_itiraz", "parameters": { "no": "AKTIF_NO", "fatura_no": "..." } }
 
     # FATURA BİLGİSİ SORGULAMA (GÖNDERİCİ)
     - "Faturamın durumunu öğrenmek istiyorum. ","Ne kadar ödemiştim?", "Fatura detayı nedir?":
-      -> {{ "type": "action", "function": "fatura_bilgisi_gonderici", "parameters": {{ "no": "{saved_no}" }} }}
+      -> { "type": "action", "function": "fatura_bilgisi_gonderici", "parameters": { "no": "AKTIF_NO" } }
 
     # TESLİMAT ERTELEME (EVDE YOKUM BİLDİRİMİ)
     - "Evde yokum", "Evde olamayacağım", "Bugün teslim almayacağım", "Teslimatı ertele":
-      -> {{ "type": "action", "function": "evde_olmama_bildirimi", "parameters": {{ "no": "{saved_no}" }} }}
+      -> { "type": "action", "function": "evde_olmama_bildirimi", "parameters": { "no": "AKTIF_NO" } }
 
     # ALICI ADI VEYA TELEFONU DEĞİŞTİRME
     - "Alıcının adını yanlış yazmışım Ahmet Yılmaz olacak", "Alıcı telefonunu güncellemek istiyorum 5551234567":
-    - EĞER isim değişecekse -> {{ "type": "action", "function": "alici_bilgisi_guncelle", "parameters": {{ "no": "{saved_no}", "yeni_veri": "Ahmet Yılmaz", "bilgi_turu": "isim" }} }}
-    - EĞER telefon değişecekse -> {{ "type": "action", "function": "alici_bilgisi_guncelle", "parameters": {{ "no": "{saved_no}", "yeni_veri": "5551234567", "bilgi_turu": "telefon" }} }}
+    - EĞER isim değişecekse -> { "type": "action", "function": "alici_bilgisi_guncelle", "parameters": { "no": "AKTIF_NO", "yeni_veri": "Ahmet Yılmaz", "bilgi_turu": "isim" } }
+    - EĞER telefon değişecekse -> { "type": "action", "function": "alici_bilgisi_guncelle", "parameters": { "no": "AKTIF_NO", "yeni_veri": "5551234567", "bilgi_turu": "telefon" } }
  
     3. GENEL SOHBET:
-      - Merhaba, nasılsın vb. -> {{ "type": "chat", "reply": "Hoş geldiniz. Size nasıl yardımcı olabilirim?" }}
+      - Merhaba, nasılsın vb. -> { "type": "chat", "reply": "Hoş geldiniz. Size nasıl yardımcı olabilirim?" }
 """
 
-    formatted_history = "\n".join(history)
-    full_prompt = f"{system_prompt}\n\nGEÇMİŞ SOHBET:\n{formatted_history}\n\nKULLANICI: {final_user_message}\nJSON CEVAP:"
+# Statik talimattaki yer tutucu -> oturum alanı
+YER_TUTUCULAR = {"AKTIF_NO": "tracking_no", "MUSTERI_ID": "user_id", "KAYITLI_AD": "user_name"}
 
-    try:
-        result = model.generate_content(full_prompt)
-        text_response = result.text.replace("```json", "").replace("```", "").strip()
-        # --- DEBUG NOKTASI---
-        print(f"\n[DEBUG] AI HAM CEVAP: {text_response}")
-        # --------------------------------------
 
-        data = json.loads(text_response)
+def baglam_blogu(status_prompt, zaman_bilgisi, duygu_notu, session_data):
+    """Talimatın arkasına eklenen, tura özel kısa bağlam bloğu."""
+    satirlar = ["BAĞLAM:", status_prompt, f"ZAMAN: {zaman_bilgisi}"]
+    if duygu_notu: satirlar.append(f"DUYGU: {duygu_notu}")
+    degerler = [f"{ad}={session_data.get(alan)}" for ad, alan in YER_TUTUCULAR.items() if session_data.get(alan)]
+    if degerler: satirlar.append("YER TUTUCULAR: " + ", ".join(degerler))
+    return "\n".join(satirlar)
+
+
+def yer_tutuculari_doldur(data, session_data):
+    """Gemini'nin parametrelere yazdığı AKTIF_NO vb. yer tutucuları oturumdaki değerlerle değiştirir."""
+    params = data.get("parameters") if isinstance(data, dict) else None
+    if not isinstance(params, dict): return data
+    for anahtar, deger in params.items():
+        if isinstance(deger, str) and deger.strip() in YER_TUTUCULAR:
+            # Misafir oturumda karşılığı yoksa boş bırakılır; fonksiyon eksik parametre olarak ele alır
+            karsilik = session_data.get(YER_TUTUCULAR[deger.strip()])
+            params[anahtar] = str(karsilik) if karsilik else ""
+    return data
+
+
+def _tur_akisi(session_id, user_message, oturum_deposu):
+    """sohbet_akisi olaylarını üretir; Gemini çağrılarını LLMIstegi olarak sürücüye bırakır."""
+    if not llm_istemci.kullanilabilir():
+        yield {"event": "sentence", "text": "AI kapalı."}
+        yield {"event": "done", "response": "AI kapalı."}
+        return
+
+    simdi = datetime.now()
+    tarih_str = simdi.strftime("%d.%m.%Y")
+    gun_str = simdi.strftime("%A")
+    saat_str = simdi.strftime("%H:%M")
+
+    zaman_bilgisi = f"BUGÜNÜN TARİHİ: {tarih_str} ({gun_str}) - SAAT: {saat_str}"
+
+    # Duygu analizi sadece mesaja bağlı; oturum okuma ve prompt hazırlığıyla aynı anda yürür
+    duygu_isi = paralel.oncelikli_baslat("duygu_analizi", duygu_analizi_yap, user_message)
+
+    session_data = oturum_deposu.getir(session_id)
+    # Yönlendirme kararı beklenirken aktif kargonun durum/ETA/son hareket bilgisi önden okunur
+    on_yukleme = OnYukleme(session_data, user_message)
+
+    # Değişkenleri Çek
+    history = session_data['history']
+    is_verified = session_data['verified']
+    saved_no = session_data['tracking_no']
+    user_role = session_data['role']
+    user_id = session_data['user_id']
+    pending_intent = session_data.get('pending_intent')
+
+    status_prompt = ""
+    if is_verified:
+        rol_adi = "Gönderici" if user_role == 'gonderici' else "Alıcı"
+        status_prompt = f"DURUM: KULLANICI DOĞRULANDI. Müşteri: {session_data.get('user_name')} ({rol_adi}). Aktif No: {saved_no}."
+    else:
+        status_prompt = f"DURUM: MİSAFİR. Kimlik doğrulanmadı."
+
+    final_user_message = user_message
+    if not is_verified and pending_intent:
+        formatted_history_for_context = "\n".join(history[-4:])
+        final_user_message = f"{user_message} (NOT: Kullanıcı daha önce '{pending_intent}' yapmak istediğini belirtti ve parça parça bilgi veriyor. Eksikleri tamamladıysa doğrulama yap. Geçmiş: {formatted_history_for_context})"
+
+    # Yerel niyet tahmini duygu sonucundan bağımsız hesaplanır, kullanılıp kullanılmayacağına sonra karar verilir
+    yerel_is = paralel.baslat("yerel_yonlendirme", yerel_yonlendirme, user_message, session_data)
+    formatted_history = konusma_hafizasi.gecmis_metni(session_data)
+
+    duygu = paralel.sonuc_al(duygu_isi, None, DUYGU_BEKLEME_SN, asama="duygu_analizi")
+    duygu_durumu, duygu_skoru = duygu or ("BİLİNMİYOR (Zaman Aşımı)", None)
+    print(f"[NLP ANALİZİ] Müşteri Duygusu: {duygu_durumu} (Skor: {duygu_skoru})")
+
+    duygu_notu = ""
+    if duygu is None:
+        duygu_notu = "NOT: Müşterinin duygu durumu ölçülemedi. Mesajın tonu öfkeliyse alttan al, özür dile ve çözüm odaklı konuş."
+    elif "KIZGIN (NEGATİF)" in duygu_durumu:
+        duygu_notu = "DİKKAT: Müşteri şu an ÖFKELİ görünüyor. Cevabında mutlaka alttan al, çok nazik ol, özür dile ve çözüm odaklı konuş. Asla tartışmaya girme."
+    elif "MUTLU (POZİTİF)" in duygu_durumu:
+        duygu_notu = "İPUCU: Müşteri MEMNUN görünüyor. Enerjik ve samimi bir dille teşekkür et."
+
+    # Yüksek güvenli, salt okunur niyetler Gemini'ye gitmeden yönlendirilir (öfkeli veya duygusu ölçülemeyen
+    # müşteride ton Gemini'de kalır)
+    yerel_karar = None
+    if duygu_skoru is not None and duygu_skoru >= 0:
+        yerel_karar = paralel.sonuc_al(yerel_is, asama="yerel_yonlendirme")
+
+    baglam = baglam_blogu(status_prompt, zaman_bilgisi, duygu_notu, session_data)
+    full_prompt = f"{baglam}\n\nGEÇMİŞ SOHBET:\n{formatted_history}\n\nKULLANICI: {final_user_message}\nJSON CEVAP:"
+
+    try:
+        kaynak = "yerel" if yerel_karar else "llm"
+        data = yerel_karar
+        if yerel_karar:
+            print(f"\n[DEBUG] YEREL YÖNLENDİRME: {data}")
+        elif not llm_istemci.devre_acik():
+            try:
+                with ASAMA_SURESI.olc(asama="yonlendirme_llm"):
+                    result = yield LLMIstegi(full_prompt, "yonlendirme", onek=YONLENDIRME_TALIMATI)
+            except Exception as e:
+                print(f"Yönlendirme LLM Hatası, kısıtlı moda geçiliyor: {e}")
+                hata_kaydet("yonlendirme_llm")
+                result = None
+
+            if result is not None:
+                text_response = result.replace("```json", "").replace("```", "").strip()
+                # --- DEBUG NOKTASI---
+                print(f"\n[DEBUG] AI HAM CEVAP: {text_response}")
+                # --------------------------------------
+
+                data = json.loads(text_response)
+                yer_tutuculari_doldur(data, session_data)
+
+        if data is None:
+            # Gemini'ye ulaşılamıyor (devre açık / hata); tur yerel kurallarla salt okunur fonksiyonlara yönlendirilir
+            kaynak = "kisitli"
+            data = kisitli_mod.yonlendir(user_message, session_data)
+            print(f"\n[DEBUG] KISITLI MOD YÖNLENDİRME: {data}")
+        YONLENDIRME_KAYNAGI.artir(kaynak=kaynak)
         final_reply = ""
         func = None
+        akitildi = False
+
+        yield {"event": "route", "type": data.get("type"), "function": data.get("function"),
+               "source": kaynak}
+
+        SECILEN_FONKSIYON.artir(fonksiyon=data.get("function") if data.get("type") == "action" else data.get("type"))
+        secilen = data.get("function") if data.get("type") == "action" else None
+        on_yukleme.sonuclandir(secilen)
+        # Sonraki turun ön yükleme tahmini için
+        session_data['last_function'] = secilen
 
         if data.get("type") == "action":
             func = data.get("function")
@@ -408,6 +733,7 @@ def process_with_gemini(session_id, user_message, user_sessions):
             print(f"🔍 [DEBUG] PARAMETRELER: {params}")
             # -------------------------------------------------
             system_res = ""
+            aksiyon_baslangic = time.perf_counter()
 
             if func == "kimlik_dogrula":
                 print("[DEBUG] kimlik_dogrula ÇAĞRILIYOR...")
@@ -417,20 +743,21 @@ def process_with_gemini(session_id, user_message, user_sessions):
 
                 if db_sonuc.startswith("BASARILI"):
                     parts = db_sonuc.split("|")
-                    user_sessions[session_id]['verified'] = True
-                    user_sessions[session_id]['tracking_no'] = parts[1]
-                    user_sessions[session_id]['user_name'] = parts[2]
-                    user_sessions[session_id]['role'] = parts[3]
-                    user_sessions[session_id]['user_id'] = parts[4]
-                    user_sessions[session_id]['durum'] = "SERBEST"
-                    user_sessions[session_id] = session_data
+                    session_data['verified'] = True
+                    session_data['tracking_no'] = parts[1]
+                    session_data['user_name'] = parts[2]
+                    session_data['role'] = parts[3]
+                    session_data['user_id'] = parts[4]
+                    session_data['durum'] = "SERBEST"
+                    oturum_deposu.tur_kaydet(session_id, session_data)
 
                     pending_intent = session_data.get('pending_intent')
                     if pending_intent:
                         print(f"\n[DEBUG] BEKLEYEN NİYET OTOMATİK ÇALIŞTIRILIYOR: '{pending_intent}'\n")
                         session_data['pending_intent'] = None
-                        user_sessions[session_id] = session_data
-                        return process_with_gemini(session_id, pending_intent, user_sessions)
+                        oturum_deposu.tur_kaydet(session_id, session_data)
+                        yield from _tur_akisi(session_id, pending_intent, oturum_deposu)
+                        return
 
                     rol = "Gönderici" if parts[3] == "gonderici" else "Alıcı"
 
@@ -439,7 +766,9 @@ def process_with_gemini(session_id, user_message, user_sessions):
                                         DURUM: Kimlik doğrulama başarılı. Kullanıcı: {parts[2]} ({rol}).
                                         TALİMAT: Kullanıcıya ismiyle hitap et, doğrulamanın yapıldığını söyle ve 'Size nasıl yardımcı olabilirim?' diye sor.
                                         """
-                    final_reply = model.generate_content(success_prompt).text.strip()
+                    anahtar = cevap_onbellegi.parmak_izi("kimlik_basari", parts[2], rol)
+                    final_reply = yield from _akisli_uret(success_prompt, "kimlik", ("kimlik_basari", anahtar))
+                    akitildi = True
 
                 else:
                     hata_detayi = db_sonuc.split('|')[-1] if '|' in db_sonuc else "Bilgiler eşleşmedi."
@@ -459,7 +788,9 @@ def process_with_gemini(session_id, user_message, user_sessions):
                                     3. Tekrar denemesini iste.
                                     4. ASLA teknik hata kodlarını (BASARISIZ|...) kullanıcıya okuma. Sadece yukarıdaki cümleyi kur.
                                  """
-                    final_reply = model.generate_content(hata_prompt).text.strip()
+                    anahtar = cevap_onbellegi.parmak_izi("kimlik_hata", hata_detayi)
+                    final_reply = yield from _akisli_uret(hata_prompt, "kimlik", ("kimlik_hata", anahtar))
+                    akitildi = True
                     system_res = f"Doğrulama Hatası: {hata_detayi}"
 
             elif func == "ucret_hesapla":
@@ -487,19 +818,32 @@ def process_with_gemini(session_id, user_message, user_sessions):
                                 4. Cevap MAKSİMUM 1 cümle olsun. Doğrudan bilgi ver.
                                 """
                 try:
-                    final_reply = model.generate_content(ozel_prompt).text.strip()
-                    if not final_reply or "web sitesi" in final_reply.lower() or "duyuru" in final_reply.lower():
-                        if "Öğrenci" in user_message or "öğrenci" in user_message:
-                            final_reply = "Evet, öğrenci kimliğiyle gelenlere %50 indirim uyguluyoruz."
-                        else:
-                            final_reply = f"Aktif kampanyalarımız şunlardır: {res.replace(' | ', ', ')}"
-
+                    # Cevap kampanya listesi ve sorulan kategoriye bağlı; "öğrenci indirimi var mı" tekrar tekrar soruluyor.
+                    # Hiçbir kampanyaya uymayan sorular ("kurumsal firmalara indirim") birbirinin cevabını almasın
+                    # diye 'genel' anahtarına sorunun kendisi de girer.
+                    kategori = kampanya_kategorisi(user_message)
+                    anahtar = cevap_onbellegi.parmak_izi("kampanya", res, kategori,
+                                                         user_message if kategori == "genel" else "")
+                    final_reply = cevap_onbellegi.getir("kampanya", anahtar)
+                    if not final_reply:
+                        final_reply = (yield LLMIstegi(ozel_prompt, "kampanya")).strip()
+                        if not final_reply or "web sitesi" in final_reply.lower() or "duyuru" in final_reply.lower():
+                            if "Öğrenci" in user_message or "öğrenci" in user_message:
+                                final_reply = "Evet, öğrenci kimliğiyle gelenlere %50 indirim uyguluyoruz."
+                            else:
+                                final_reply = f"Aktif kampanyalarımız şunlardır: {res.replace(' | ', ', ')}"
+                        cevap_onbellegi.kaydet("kampanya", anahtar, final_reply)
+
+                except llm_istemci.DevreAcikHatasi:
+                    # Kısıtlı modda beklenen yol: liste Gemini'siz okunur, hata sayılmaz
+                    final_reply = f"Şu anda aktif kampanyalarımız şunlardır: {res}"
                 except Exception as e:
                     print(f"Kampanya AI Hatası: {e}")
+                    hata_kaydet("kampanya_ai")
                     final_reply = f"Şu anda aktif kampanyalarımız şunlardır: {res}"
             elif func == "vergi_hesapla_ai":
                 session_data['pending_intent'] = None
-                system_res = vergi_hesapla_ai(
+                system_res = yield from vergi_hesapla(
                     params.get("urun_kategorisi"),
                     params.get("fiyat"),
                     params.get("hedef_ulke")
@@ -539,10 +883,11 @@ def process_with_gemini(session_id, user_message, user_sessions):
             elif func == "kargo_sorgula":
                 session_data['pending_intent'] = None
                 aktif_rol = session_data.get('role')
-                system_res = kargo_bilgisi_getir(params.get("no"), user_role=aktif_rol)
+                system_res = on_yukleme.al(func, params.get("no"),
+                                           lambda: kargo_bilgisi_getir(params.get("no"), user_role=aktif_rol))
             elif func == "tahmini_teslimat":
                 session_data['pending_intent'] = None
-                system_res = tahmini_teslimat_saati_getir(params.get("no"))
+                system_res = on_yukleme.al(func, params.get("no"), lambda: tahmini_teslimat_saati_getir(params.get("no")))
             elif func == "iade_islemi_baslat":
                 session_data['pending_intent'] = None
                 system_res = iade_islemi_baslat(params.get("no"), params.get("sebep"), user_id, user_role)
@@ -554,7 +899,8 @@ def process_with_gemini(session_id, user_message, user_sessions):
                 system_res = adres_degistir(params.get("no"), params.get("yeni_adres"))
             elif func == "kargo_durum_destek":
                 session_data['pending_intent'] = None
-                system_res = kargo_durum_destek(saved_no, user_id)
+                system_res = on_yukleme.al(func, saved_no or params.get("no"),
+                                           lambda: kargo_durum_destek(saved_no or params.get("no")))
             elif func == "fatura_bilgisi_gonderici":
                 session_data['pending_intent'] = None
                 system_res = fatura_bilgisi_gonderici(params.get("no"), user_id)
@@ -584,25 +930,20 @@ def process_with_gemini(session_id, user_message, user_sessions):
 
                 if db_sonuc.startswith("BASARILI"):
                     parts = db_sonuc.split("|")
-                    user_sessions[session_id]['verified'] = True
-                    user_sessions[session_id]['tracking_no'] = parts[1]
-                    user_sessions[session_id]['user_name'] = parts[2]
-                    user_sessions[session_id]['role'] = parts[3]
-                    user_sessions[session_id]['user_id'] = parts[4]
-                    user_sessions[session_id] = session_data
+                    session_data['verified'] = True
+                    session_data['tracking_no'] = parts[1]
+                    session_data['user_name'] = parts[2]
+                    session_data['role'] = parts[3]
+                    session_data['user_id'] = parts[4]
 
                     system_res = f"Teşekkürler {parts[2]}. Girişiniz yapıldı. {parts[1]} numaralı kargonuz için ne işlem yapmak istersiniz?"
                 else:
                     hata_msg = db_sonuc.split("|")[1] if "|" in db_sonuc else db_sonuc
                     system_res = f"Giriş Yapılamadı: {hata_msg}. Lütfen bilgilerinizi kontrol edin."
-
-                final_prompt = f"GÖREV: Kullanıcıya şu durumu bildir: {system_res}."
-                final_reply = model.generate_content(final_prompt).text.strip()
             elif func == "kurye_gelmedi_sikayeti":
                 session_data['pending_intent'] = None
                 aktif_no = session_data.get('tracking_no') or params.get("takip_no")
                 system_res = kurye_gelmedi_sikayeti(aktif_no, user_id)
-                final_reply = system_res
             elif func == "hizli_teslimat_ovgu":
                 session_data['pending_intent'] = None
                 system_res = hizli_teslimat_ovgu()
@@ -618,7 +959,7 @@ def process_with_gemini(session_id, user_message, user_sessions):
                 if not cikis or not varis:
                     system_res = "Teslimat süresi hesaplayabilmem için lütfen Çıkış ve Varış şehirlerini belirtin."
                 else:
-                    mesafe = mesafe_hesapla_ai(cikis, varis)
+                    mesafe = mesafe_hesapla(cikis, varis)
 
                     if mesafe > 0:
                         ham_sure = teslimat_suresi_hesapla(mesafe, desi)
@@ -631,14 +972,32 @@ def process_with_gemini(session_id, user_message, user_sessions):
                     else:
                         system_res = "Şehirler arası mesafe hesaplanamadı, lütfen tekrar deneyin."
 
-            if func != "kimlik_dogrula" and func != "kampanya_sorgula" and func != "vergi_hesapla_ai" and func != "yanlis_teslimat_bildirimi":
+            AKSIYON_SURESI.gozlemle(time.perf_counter() - aksiyon_baslangic, fonksiyon=func)
+            yield {"event": "action", "function": func, "result": system_res}
+
+            politika = CEVAP_POLITIKASI.get(func, "direkt")
+            if politika == "llm" and (kaynak == "kisitli" or llm_istemci.devre_acik()):
+                # İfade çağrısı da aynı servise gideceği için sonuç yerel şablonla konuşma metnine çevrilir
+                politika = "sablon"
+            CEVAP_POLITIKASI_SAYACI.artir(politika=politika)
+
+            if politika == "llm":
                 final_prompt = f"GÖREV: Kullanıcıya şu sistem bilgisini nazikçe ilet: {system_res}. SADECE yanıt metni. Kural: Eğer mesaj bir onay veya bilgi verme cümlesiyse, olduğu gibi kullan. Eğer bir hata içeriyorsa, nazikçe açıkla."
 
-                final_reply = model.generate_content(final_prompt).text.strip()
+                ifade_baslangic = time.perf_counter()
+                final_reply = yield from _akisli_uret(final_prompt, "ifade")
+                ASAMA_SURESI.gozlemle(time.perf_counter() - ifade_baslangic, asama="ifade_llm")
+                akitildi = True
+            elif politika != "ozel":
+                final_reply = aksiyon_cevabi(func, system_res, politika)
 
         elif data.get("type") == "chat":
             final_reply = data.get("reply")
 
+        if not akitildi:
+            for cumle in cumlelere_bol(final_reply):
+                yield {"event": "sentence", "text": cumle}
+
         if not is_verified:
 
             is_numeric_data = bool(re.search(r'\d{3,}', user_message))
@@ -659,12 +1018,24 @@ def process_with_gemini(session_id, user_message, user_sessions):
             else:
                 print(f"[DEBUG] NİYET KORUNDU (Veri Girişi Algılandı): '{current_pending}'")
 
-        session_data['history'].append(f"KULLANICI: {user_message}")
-        session_data['history'].append(f"ASİSTAN: {final_reply}")
-        user_sessions[session_id] = session_data
+        yield {"event": "reply", "response": final_reply}
 
-        return final_reply
+        yeni_satirlar = [f"KULLANICI: {user_message}", f"ASİSTAN: {final_reply}"]
+        session_data['history'].extend(yeni_satirlar)
+        oturum_deposu.tur_kaydet(session_id, session_data, yeni_satirlar)
+        yield from _zorunlu_katlama(session_id, session_data, oturum_deposu)
+        konusma_hafizasi.ozetlemeyi_planla(session_id, session_data, oturum_deposu)
+
+        yield {"event": "done", "response": final_reply}
+
+    except json.JSONDecodeError as e:
+        print(f"HATA: {e}")
+        hata_kaydet("yonlendirme_json")
+        yield {"event": "sentence", "text": "Bir hata oluştu."}
+        yield {"event": "done", "response": "Bir hata oluştu."}
 
     except Exception as e:
         print(f"HATA: {e}")
-        return "Bir hata oluştu."
\ No newline at end of file
+        hata_kaydet("genel")
+        yield {"event": "sentence", "text": "Bir hata oluştu."}
+        yield {"event": "done", "response": "Bir hata oluştu."}
\ No newline at end of file
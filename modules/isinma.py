@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+
+from modules import database, ml_modulu, ses_modulu, niyet_yonlendirici, cografya, llm_istemci
+
+# Uygulama trafik almadan önce pahalı ilk çağrıları (model eğitimi, DB açılışı, gTTS) üstlenir.
+# /ready bu aşama bitene kadar 503 döner; yük dengeleyici sadece ısınmış işçilere trafik yollar.
+
+# Sık kullanılan sabit cevaplar; sesleri önceden üretilip önbelleğe alınır
+ORTAK_CEVAPLAR = [
+    "Hoş geldiniz. Size nasıl yardımcı olabilirim?",
+    "Size yardımcı olabilmem için önce adınızı ve soyadınızı öğrenebilir miyim?",
+    "Güvenliğiniz için son olarak telefon numaranızı rica edebilir miyim?",
+    "Anlıyorum, yaşadığınız sorun nedir? Lütfen şikayetinizi kısaca belirtin.",
+    "Bir hata oluştu.",
+]
+
+HAZIR = threading.Event()
+_durum = {'basladi': None, 'bitti': None, 'asamalar': {}}
+_baslatma_kilit = threading.Lock()
+_baslatildi = False
+
+
+def _asama(ad, fonksiyon, zorunlu=True):
+    baslangic = time.perf_counter()
+    try:
+        fonksiyon()
+        _durum['asamalar'][ad] = {'durum': "tamam", 'sure_sn': round(time.perf_counter() - baslangic, 3)}
+        return True
+    except Exception as e:
+        print(f"Isınma Hatası ({ad}): {e}")
+        _durum['asamalar'][ad] = {'durum': "hata", 'hata': str(e), 'zorunlu': zorunlu,
+                                  'sure_sn': round(time.perf_counter() - baslangic, 3)}
+        return not zorunlu
+
+
+def _duygu_modeli():
+    if ml_modulu.EGITILMIS_MODEL is None and ml_modulu.modeli_egit() is None:
+        raise RuntimeError("Duygu analizi modeli yüklenemedi.")
+
+
+def _niyet_modeli():
+    if niyet_yonlendirici.niyet_modelini_egit() is None:
+        raise RuntimeError("Niyet modeli yüklenemedi.")
+
+
+def _teslimat_modeli():
+    if ml_modulu.teslimat_modelini_yukle() is None:
+        raise RuntimeError("Teslimat modeli yüklenemedi.")
+
+
+def _baglam_onbellegi():
+    # Sabit yönlendirme talimatı sağlayıcıda önceden önbelleğe alınır; ilk turlar oluşturmayı beklemez
+    from modules.gemini_ai import YONLENDIRME_TALIMATI
+    llm_istemci.baglam_onbellegi.model_getir(YONLENDIRME_TALIMATI)
+
+
+def _veritabani():
+    conn = database.get_db_connection()
+    try:
+        conn.execute("SELECT 1").fetchone()
+    finally:
+        conn.close()
+
+
+def _ortak_sesler():
+    for cevap in ORTAK_CEVAPLAR:
+        if not ses_modulu.metni_sese_cevir(cevap):
+            raise RuntimeError(f"'{cevap}' sesi üretilemedi.")
+
+
+def sistemi_isit():
+    _durum['basladi'] = time.time()
+    print("Isınma başlatıldı...")
+
+    basarili = all([
+        _asama("veritabani", _veritabani),
+        _asama("referans_verisi", database.referans_verilerini_yukle),
+        _asama("duygu_modeli", _duygu_modeli),
+        # Niyet modeli yoksa tüm istekler Gemini'ye gider; yavaşlar ama çalışır
+        _asama("niyet_modeli", _niyet_modeli, zorunlu=False),
+        _asama("cografya", cografya.il_mesafe_matrisi, zorunlu=False),
+        _asama("teslimat_modeli", _teslimat_modeli, zorunlu=False),
+        _asama("baglam_onbellegi", _baglam_onbellegi, zorunlu=False),
+        # gTTS ağa bağlı; erişilemezse sesler ilk kullanımda üretilir, hazır olmaya engel değil
+        _asama("ortak_sesler", _ortak_sesler, zorunlu=False),
+    ])
+
+    _durum['bitti'] = time.time()
+    if basarili:
+        HAZIR.set()
+        print(f"Isınma tamamlandı ({_durum['bitti'] - _durum['basladi']:.2f} sn).")
+    else:
+        print("UYARI: Isınma zorunlu aşamalarda başarısız oldu, işçi hazır değil.")
+    return basarili
+
+
+def isinmayi_baslat(arka_planda=True):
+    """Isınmayı bir kez başlatır. ISINMA_BEKLE=1 ise arka_planda parametresinden bağımsız olarak bitene kadar bekler."""
+    global _baslatildi
+    with _baslatma_kilit:
+        if _baslatildi: return
+        _baslatildi = True
+
+    if arka_planda and os.getenv("ISINMA_BEKLE", "0") != "1":
+        threading.Thread(target=sistemi_isit, name="isinma", daemon=True).start()
+    else:
+        sistemi_isit()
+
+
+def hazirlik_durumu():
+    return {
+        "ready": HAZIR.is_set(),
+        "started_at": _durum['basladi'],
+        "finished_at": _durum['bitti'],
+        "stages": dict(_durum['asamalar']),
+    }
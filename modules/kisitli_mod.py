@@ -0,0 +1,114 @@
+import re
+from modules import cografya, vergi_motoru
+from modules.cografya import yer_adi_normallestir
+from modules.niyet_yonlendirici import niyet_tahmin_et, SELAMLAMA_CEVABI
+
+# Gemini'ye ulaşılamadığında (devre kesici açık, süre aşımı) turu yerelde karşılayan kısıtlı mod.
+# Anahtar kelime kuralları, olmazsa niyet modeli ile salt okunur veritabanı fonksiyonlarına yönlendirir;
+# parametreler oturumdan ve mesajdan çıkarılır. Desteklenmeyen istekler şablon cevapla geri çevrilir.
+
+NIYET_ESIGI = 0.5
+
+KISITLI_CEVAP = ("Şu anda yapay zeka servisimizde geçici bir yoğunluk var. Kargo durumu, tahmini teslimat, "
+                 "şube, fiyat ve kampanya bilgisi verebilirim; diğer işlemler için lütfen birkaç dakika sonra "
+                 "tekrar deneyin.")
+DOGRULAMA_CEVABI = ("Şu anda sistemlerimizde yoğunluk var ve kimlik doğrulaması yapamıyorum. Kampanya, şube ve fiyat "
+                    "bilgisi verebilirim; kargonuzla ilgili işlemler için lütfen birkaç dakika sonra tekrar deneyin.")
+EKSIK_YER_CEVABI = "Hangi il veya ilçedeki şubemizi sorduğunuzu söyler misiniz?"
+EKSIK_SEHIR_CEVABI = "Hesaplayabilmem için çıkış ve varış şehirlerini birlikte söyler misiniz? Örneğin İstanbul'dan Ankara'ya 5 desi."
+
+# (niyet, desen) — sırayla denenir, ilk eşleşen kazanır. Desenler normalize metin (küçük harf, Türkçe karaktersiz) üzerinde.
+KURALLAR = [
+    ("selamlama", r"^(merhaba|selam|slm|iyi gunler|gunaydin|iyi aksamlar)\b"),
+    ("vergi_hesapla_ai", r"\b(vergi|gumruk)"),
+    ("kampanya_sorgula", r"\b(kampanya|indirim|firsat|promosyon|ogrenci)"),
+    ("en_yakin_sube_bul", r"\ben yakin\b"),
+    ("sube_saat_sorgula", r"\bsube.*\b(kaca kadar|acik|kapan|saat)|\b(kaca kadar|acik mi)\b"),
+    ("sube_telefon_sorgula", r"\bsube.*\b(telefon|numara)"),
+    ("sube_sorgula", r"\bsube"),
+    # "ne kadar surer" ücret kuralındaki "ne kadar"dan önce yakalanmalı
+    ("teslimat_suresi_hesapla_ai", r"\b(kac gunde|kac gun surer|ne kadar surer)"),
+    ("ucret_hesapla", r"\b(ucret|fiyat|ne kadar|kac para|kac tl)\b"),
+    ("kargo_durum_destek", r"\b(son hareket|nerede kaldi|hangi subede)"),
+    ("tahmini_teslimat", r"\b(ne zaman|teslim tarihi|tahmini teslim|bugun gelir|yarin gelir)"),
+    ("kargo_sorgula", r"\b(kargom|nerede|durumu|takip)"),
+]
+
+DOGRULAMA_GEREKEN = {"kargo_sorgula", "tahmini_teslimat", "kargo_durum_destek"}
+
+
+def _niyet_bul(normal, mesaj):
+    for niyet, desen in KURALLAR:
+        if re.search(desen, normal): return niyet
+    niyet, guven = niyet_tahmin_et(mesaj)
+    return niyet if guven >= NIYET_ESIGI else None
+
+
+def yerleri_bul(mesaj):
+    """Mesajda geçen il/ilçeleri geçiş sırasıyla döner (tekrarsız)."""
+    yerler = []
+    for kelime in yer_adi_normallestir(mesaj).split():
+        if len(kelime) < 4: continue
+        yer = cografya.yer_coz(kelime)
+        if yer and yer not in yerler: yerler.append(yer)
+    return yerler
+
+
+def vergi_parametreleri(mesaj):
+    """Mesajdan ürün kategorisi, fiyat ve hedef ülkeyi çıkarır; biri eksikse None (Gemini'siz tahmin yapılmaz)."""
+    ulke = vergi_motoru.ulke_coz(mesaj)
+    kategori = vergi_motoru.kategori_coz(mesaj)
+    tutar, para = vergi_motoru.fiyat_coz(mesaj)
+    if ulke is None or kategori == "diger" or tutar is None: return None
+    # Para birimi kodu motorun fiyat ayrıştırıcısının tanıdığı biçimde yazılır
+    fiyat = f"{tutar:.2f} {para}" if para else tutar
+    return {"urun_kategorisi": kategori, "fiyat": fiyat, "hedef_ulke": ulke}
+
+
+def _yer_adi(yer):
+    return yer['ilce'] or yer['il']
+
+
+def yonlendir(mesaj, oturum):
+    """Gemini'nin yönlendirme JSON'u ile aynı biçimde karar döner."""
+    normal = yer_adi_normallestir(mesaj)
+    niyet = _niyet_bul(normal, mesaj)
+
+    if niyet == "selamlama":
+        return {"type": "chat", "reply": SELAMLAMA_CEVABI}
+
+    if niyet in DOGRULAMA_GEREKEN:
+        if not oturum.get('verified') or not oturum.get('tracking_no'):
+            return {"type": "chat", "reply": DOGRULAMA_CEVABI}
+        return {"type": "action", "function": niyet, "parameters": {"no": oturum['tracking_no']}}
+
+    if niyet == "kampanya_sorgula":
+        return {"type": "action", "function": niyet, "parameters": {}}
+
+    if niyet == "vergi_hesapla_ai":
+        parametreler = vergi_parametreleri(mesaj)
+        if parametreler is None:
+            return {"type": "chat", "reply": KISITLI_CEVAP}
+        return {"type": "action", "function": niyet, "parameters": parametreler}
+
+    if niyet in ("sube_sorgula", "sube_saat_sorgula", "sube_telefon_sorgula", "en_yakin_sube_bul"):
+        yerler = yerleri_bul(mesaj)
+        if niyet == "en_yakin_sube_bul":
+            bilgi = "telefon" if "telefon" in normal else "saat" if re.search(r"kaca kadar|acik|saat", normal) else "adres"
+            adres = " ".join(filter(None, [yerler[0]['il'], yerler[0]['ilce']])) if yerler else ""
+            return {"type": "action", "function": niyet, "parameters": {"kullanici_adresi": adres, "bilgi_turu": bilgi}}
+        if not yerler:
+            return {"type": "chat", "reply": EKSIK_YER_CEVABI}
+        return {"type": "action", "function": niyet, "parameters": {"lokasyon": _yer_adi(yerler[0])}}
+
+    if niyet in ("ucret_hesapla", "teslimat_suresi_hesapla_ai"):
+        yerler = yerleri_bul(mesaj)
+        if len(yerler) < 2:
+            return {"type": "chat", "reply": EKSIK_SEHIR_CEVABI}
+        # Normalize metinde rakamlar atıldığı için desi ham mesajdan okunur
+        desi = re.search(r"(\d+(?:[.,]\d+)?)\s*desi", mesaj.lower())
+        return {"type": "action", "function": niyet,
+                "parameters": {"cikis": _yer_adi(yerler[0]), "varis": _yer_adi(yerler[1]),
+                               "desi": desi.group(1).replace(",", ".") if desi else "5"}}
+
+    return {"type": "chat", "reply": KISITLI_CEVAP}
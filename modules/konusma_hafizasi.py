@@ -0,0 +1,154 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from modules import llm_istemci
+from modules.oturum_deposu import GECMIS_MAKS_SATIR
+from modules.metrikler import Sayac, Histogram, hata_kaydet
+
+# Prompt'a giren sohbet geçmişini token bütçesiyle sınırlar. Son satırlar olduğu gibi kalır,
+# eskiler arka planda tek paragraflık özete katlanır. Takip no, ad, rol gibi yapısal bilgiler
+# oturum alanlarında tutulduğu için (BAĞLAM bloğu) özete ve serbest metne yazılmaz.
+# Arka plan kuyruğu sınırlıdır; özet yetişemez ve geçmiş depodaki üst sınıra (GECMIS_MAKS_SATIR)
+# yaklaşırsa katlama turun içinde yapılır, satırlar özete girmeden kırpılmaz.
+
+# --- AYARLAR ---
+HAFIZA_TOKEN_BUTCESI = int(os.getenv("HAFIZA_TOKEN_BUTCESI", "600"))
+HAFIZA_SON_SATIR = int(os.getenv("HAFIZA_SON_SATIR", "6"))          # özete katlanmayan son satırlar
+HAFIZA_KATLAMA_SATIR = int(os.getenv("HAFIZA_KATLAMA_SATIR", "12"))  # özetleme bu satır sayısında tetiklenir
+HAFIZA_OZET_KUYRUK_LIMITI = int(os.getenv("HAFIZA_OZET_KUYRUK_LIMITI", "32"))  # arka planda bekleyen oturum sınırı
+# Bu satır sayısına gelen geçmiş turun içinde katlanır; depo GECMIS_MAKS_SATIR'da keser
+HAFIZA_ZORUNLU_KATLAMA_SATIR = GECMIS_MAKS_SATIR - 8
+SATIR_MAKS_KARAKTER = 600
+OZET_MAKS_KARAKTER = 1200
+OZET_ZAMAN_ASIMI_SN = 10
+
+_ozet_havuzu = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ozet")
+_bekleyenler = set()
+_bekleyen_kilit = threading.Lock()
+
+GECMIS_TOKEN = Histogram("hafiza_gecmis_token", "Tur başına prompt'a giren geçmiş (özet + son satırlar) token tahmini.",
+                         kovalar=(50, 100, 200, 400, 800, 1600))
+OZETLEME_SAYACI = Sayac("hafiza_ozetleme_toplam", "Arka plan özetleme sonuçları.", ("sonuc",))
+
+
+def token_tahmin(metin):
+    # Türkçe metinde Gemini tokenizer'ı kabaca 4 karaktere bir token sayıyor
+    return len(metin) // 4 + 1
+
+
+def _satiri_kirp(satir):
+    if len(satir) <= SATIR_MAKS_KARAKTER: return satir
+    return satir[:SATIR_MAKS_KARAKTER] + "..."
+
+
+def gecmis_metni(oturum, butce=HAFIZA_TOKEN_BUTCESI):
+    """Özet + bütçeye sığan en yeni satırlar. Son iki satır (bir tur) bütçeden bağımsız korunur."""
+    ozet = oturum.get('summary') or ""
+    kalan = butce - (token_tahmin(ozet) if ozet else 0)
+
+    secilen = []
+    for satir in reversed(oturum['history']):
+        satir = _satiri_kirp(satir)
+        maliyet = token_tahmin(satir)
+        if len(secilen) >= 2 and maliyet > kalan: break
+        secilen.append(satir)
+        kalan -= maliyet
+    secilen.reverse()
+
+    parcalar = [f"ÖNCEKİ KONUŞMA ÖZETİ: {ozet}"] if ozet else []
+    metin = "\n".join(parcalar + secilen)
+    GECMIS_TOKEN.gozlemle(token_tahmin(metin) if metin else 0)
+    return metin
+
+
+def _kimlikleri_ayikla(metin, oturum):
+    # Yapısal bilgiler BAĞLAM'da zaten var; özette tekrar etmesinler
+    for alan, yerine in (('tracking_no', "AKTIF_NO"), ('user_name', "müşteri")):
+        deger = oturum.get(alan)
+        if deger: metin = metin.replace(str(deger), yerine)
+    return re.sub(r'\d{5,}', "[numara]", metin)
+
+
+def ozet_istemi(eski_ozet, satirlar):
+    return f"""
+    GÖREV: Bir kargo müşteri hizmetleri konuşmasının özetini güncelle.
+    MEVCUT ÖZET: {eski_ozet or "(yok)"}
+    YENİ SATIRLAR:
+    {chr(10).join(satirlar)}
+
+    KURALLAR:
+    1. En fazla 3 kısa cümle. Müşterinin ne istediğini, hangi işlemlerin yapıldığını ve açık kalan konuyu yaz.
+    2. Takip numarası, telefon, isim gibi kimlik bilgilerini YAZMA (bunlar sistemde ayrıca tutuluyor).
+    3. Sadece düz metin, madde işareti veya JSON kullanma.
+    """
+
+
+def _ozet_uret(eski_ozet, satirlar):
+    prompt = ozet_istemi(eski_ozet, satirlar)
+    return llm_istemci.uret(prompt, cagri="ozet", zaman_asimi=OZET_ZAMAN_ASIMI_SN, deneme_sayisi=1).strip()
+
+
+def katla(oturum, katlanacak, yeni_ozet):
+    """katlanacak satırları oturumun geçmişinden özete taşır. Geçmiş artık bu satırlarla başlamıyorsa
+    (oturum sıfırlandı ya da başka bir katlama önce davrandı) dokunmaz ve False döner.
+
+    yeni_ozet boşsa (Gemini'ye ulaşılamadı) satırlar kısaltılıp mevcut özetin sonuna eklenir;
+    özet OZET_MAKS_KARAKTER'i aşarsa en eski kısmı düşer.
+    """
+    if not katlanacak or oturum['history'][:len(katlanacak)] != katlanacak: return False
+    if not yeni_ozet:
+        ekler = " / ".join(_satiri_kirp(satir)[:120] for satir in katlanacak)
+        yeni_ozet = f"{oturum.get('summary') or ''} {ekler}".strip()[-OZET_MAKS_KARAKTER:]
+    oturum['summary'] = _kimlikleri_ayikla(yeni_ozet, oturum)
+    oturum['history'] = oturum['history'][len(katlanacak):]
+    return True
+
+
+def zorunlu_katlanacaklar(oturum):
+    """Geçmiş üst sınıra yaklaştıysa turun içinde katlanması gereken satırlar, yoksa None."""
+    if len(oturum['history']) < HAFIZA_ZORUNLU_KATLAMA_SATIR: return None
+    return list(oturum['history'][:-HAFIZA_SON_SATIR])
+
+
+def _ozetle(session_id, oturum_deposu, katlanacak, eski_ozet):
+    try:
+        yeni_ozet = _ozet_uret(eski_ozet, katlanacak)
+        if not yeni_ozet:
+            OZETLEME_SAYACI.artir(sonuc="bos")
+            return
+
+        # Özet üretilirken gelen tur yazdıysa katlama güncel kaydın üstüne yeniden uygulanır; bu arada
+        # tur içinde katlandıysa sonuç eskidir ve atılır (satırlar o özete girdi)
+        if oturum_deposu.guncelle(session_id, lambda oturum: katla(oturum, katlanacak, yeni_ozet)) is None:
+            OZETLEME_SAYACI.artir(sonuc="atlandi")
+            return
+        OZETLEME_SAYACI.artir(sonuc="tamam")
+
+    except Exception as e:
+        # Özet olmasa da bütçe kırpması prompt'u sınırlı tutar; sadece kayıt düşülür
+        print(f"Özetleme Hatası: {e}")
+        hata_kaydet("hafiza_ozet")
+        OZETLEME_SAYACI.artir(sonuc="hata")
+    finally:
+        with _bekleyen_kilit:
+            _bekleyenler.discard(session_id)
+
+
+def ozetlemeyi_planla(session_id, oturum, oturum_deposu):
+    """Geçmiş katlama eşiğini aştıysa eski satırların özetlenmesini arka plana bırakır."""
+    if len(oturum['history']) < HAFIZA_KATLAMA_SATIR: return False
+    # Servis kesintisinde katlama ertelenir; geçmiş bütçe içinde kalmaya devam eder, devre kapanınca özetlenir
+    if llm_istemci.devre_acik(): return False
+
+    with _bekleyen_kilit:
+        if session_id in _bekleyenler: return False
+        if len(_bekleyenler) >= HAFIZA_OZET_KUYRUK_LIMITI:
+            # Özetçi yetişemiyor; geçmiş büyürse zorunlu katlama turun içinde yapılır
+            OZETLEME_SAYACI.artir(sonuc="kuyruk_dolu")
+            return False
+        _bekleyenler.add(session_id)
+
+    katlanacak = list(oturum['history'][:-HAFIZA_SON_SATIR])
+    _ozet_havuzu.submit(_ozetle, session_id, oturum_deposu, katlanacak, oturum.get('summary') or "")
+    return True
@@ -0,0 +1,619 @@
+import os
+import time
+import asyncio
+import hashlib
+import random
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import timedelta
+from dotenv import load_dotenv
+from modules.metrikler import Sayac, Gosterge, Histogram, hata_kaydet
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+try:
+    from google.api_core import exceptions as google_hatalari
+    _GECICI_HATALAR = (google_hatalari.ResourceExhausted, google_hatalari.ServiceUnavailable,
+                       google_hatalari.DeadlineExceeded, google_hatalari.InternalServerError,
+                       TimeoutError, ConnectionError)
+except ImportError:
+    _GECICI_HATALAR = (TimeoutError, ConnectionError)
+
+# Tüm Gemini çağrılarının geçtiği ortak istemci: tek model nesnesi, çağrı başına süre sınırı,
+# jitter'lı yeniden deneme ve eşzamanlı istek sınırı. Ani yüklerde istekler sağlayıcının
+# hız sınırına takılmak yerine burada sıraya girer. *_async fonksiyonlar aynı sınırları ve devre
+# kesiciyi paylaşır, generate_content_async ile thread tutmadan bekler (ASGI sunucusu için). Eşzamanlılık
+# bütçesi thread'ler ve event loop arasında bölünür (async_payi_ayir).
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# --- AYARLAR ---
+LLM_MODEL = os.getenv("LLM_MODEL", "gemini-2.5-flash")
+LLM_ZAMAN_ASIMI_SN = float(os.getenv("LLM_ZAMAN_ASIMI_SN", "15"))
+LLM_DENEME_SAYISI = int(os.getenv("LLM_DENEME_SAYISI", "3"))
+LLM_ESZAMANLI_LIMIT = int(os.getenv("LLM_ESZAMANLI_LIMIT", "8"))
+# ASGI sunucusunda bütçenin event loop çağrılarına ayrılan kısmı; kalanı thread'lerdeki çağrılarındır (arka plan özeti)
+LLM_ASYNC_PAYI = int(os.getenv("LLM_ASYNC_PAYI", str(max(1, LLM_ESZAMANLI_LIMIT - 2))))
+LLM_BEKLEME_TABANI_SN = 0.25
+LLM_BEKLEME_TAVANI_SN = 4.0
+# Sabit prompt öneklerinin sağlayıcı tarafında önbelleğe alınması: yok | gemini | sahte (yük testi için)
+BAGLAM_ONBELLEGI = os.getenv("BAGLAM_ONBELLEGI", "yok").lower()
+BAGLAM_ONBELLEK_TTL_SN = int(os.getenv("BAGLAM_ONBELLEK_TTL_SN", "3600"))
+
+# --- DEVRE KESİCİ ---
+# Son DEVRE_PENCERE çağrının en az DEVRE_HATA_ORANI'ı hata (veya DEVRE_YAVAS_SN'den yavaş) ise devre açılır;
+# açıkken çağrılar Gemini'ye gitmeden reddedilir, DEVRE_ACIK_SN sonra tek bir deneme çağrısına izin verilir.
+# Yavaşlık sadece Gemini'nin kendi süresinden ölçülür (akışta ilk parçaya kadar); yerel kuyrukta geçen süre
+# ve kuyrukta süre dolması sayılmaz, yoksa yerel yığılma sağlıklı bir Gemini için devreyi açar.
+DEVRE_PENCERE = int(os.getenv("DEVRE_PENCERE", "20"))
+DEVRE_MIN_CAGRI = int(os.getenv("DEVRE_MIN_CAGRI", "5"))
+DEVRE_HATA_ORANI = float(os.getenv("DEVRE_HATA_ORANI", "0.5"))
+DEVRE_YAVAS_SN = float(os.getenv("DEVRE_YAVAS_SN", "8"))
+DEVRE_ACIK_SN = float(os.getenv("DEVRE_ACIK_SN", "30"))
+KAPALI, YARI_ACIK, ACIK = "kapali", "yari_acik", "acik"
+
+if genai and GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+_modeller = {}
+_model_kilit = threading.Lock()
+_eszamanli_sinir = threading.BoundedSemaphore(LLM_ESZAMANLI_LIMIT)
+# asyncio çağrılarının sınırı; async_payi_ayir ile bütçeden pay alınarak kurulur
+_async_sinir = None
+_async_kilit = threading.Lock()
+_aktif_cagri = 0
+_aktif_kilit = threading.Lock()
+_devre = {'durum': KAPALI, 'acilis': 0.0, 'deneme_suruyor': False, 'pencere': deque(maxlen=DEVRE_PENCERE)}
+_devre_kilit = threading.Lock()
+
+CAGRI_SURESI = Histogram("llm_cagri_suresi_saniye",
+                         "Çağrı yerine göre Gemini çağrı süresi (kuyruk bekleme ve yeniden denemeler dahil).",
+                         ("cagri", "sonuc"))
+KUYRUK_BEKLEME = Histogram("llm_kuyruk_bekleme_saniye", "Eşzamanlı istek sınırı yüzünden kuyrukta geçen süre.",
+                           ("cagri",))
+TOKEN_SAYACI = Sayac("llm_token_toplam", "Çağrı yerine göre harcanan token (prompt, cevap).", ("cagri", "tur"))
+DENEME_SAYACI = Sayac("llm_yeniden_deneme_toplam", "Geçici hatalar yüzünden yapılan yeniden deneme sayısı.",
+                      ("cagri",))
+PROMPT_TOKEN = Histogram("llm_prompt_token", "Çağrı yerine göre tur başına prompt token sayısı (önbellekteki önek dahil).",
+                         ("cagri",), kovalar=(250, 500, 1000, 2000, 4000, 8000, 16000))
+BAGLAM_ONBELLEK_SAYACI = Sayac("llm_baglam_onbellegi_toplam", "Önekli çağrılarda bağlam önbelleğinin kullanımı.",
+                               ("sonuc",))
+Gosterge("llm_aktif_cagri", "Şu anda Gemini'de süren çağrı sayısı.", fonksiyon=lambda: _aktif_cagri)
+Gosterge("llm_devre_durumu", "Devre kesici durumu (0: kapalı, 1: yarı açık, 2: açık).",
+         fonksiyon=lambda: {KAPALI: 0, YARI_ACIK: 1, ACIK: 2}[_devre['durum']])
+DEVRE_GECIS = Sayac("llm_devre_gecis_toplam", "Devre kesicinin girdiği durumlar.", ("durum",))
+DEVRE_RED = Sayac("llm_devre_reddedilen_toplam", "Devre açıkken Gemini'ye gönderilmeden reddedilen çağrılar.",
+                  ("cagri",))
+
+
+class LLMHatasi(Exception):
+    """Süre sınırı, kuyruk veya yeniden denemeler tükendiğinde fırlatılır."""
+
+
+class DevreAcikHatasi(LLMHatasi):
+    """Devre kesici açıkken çağrı hiç yapılmadan fırlatılır."""
+
+
+class KuyrukHatasi(LLMHatasi):
+    """Eşzamanlı istek sınırında süre dolduğunda fırlatılır; istek Gemini'ye hiç gitmemiştir."""
+
+
+def kullanilabilir():
+    return genai is not None
+
+
+def model_getir(ad=None):
+    """Model nesnesini bir kez oluşturup tekrar kullanır."""
+    ad = ad or LLM_MODEL
+    with _model_kilit:
+        model = _modeller.get(ad)
+        if model is None:
+            if genai is None: raise LLMHatasi("google-generativeai yüklü değil.")
+            model = _modeller[ad] = genai.GenerativeModel(ad)
+        return model
+
+
+def _aktif_degistir(miktar):
+    global _aktif_cagri
+    with _aktif_kilit:
+        _aktif_cagri += miktar
+
+
+def _sira_al(cagri, son_an):
+    baslangic = time.perf_counter()
+    alindi = _eszamanli_sinir.acquire(timeout=max(0.0, son_an - baslangic))
+    KUYRUK_BEKLEME.gozlemle(time.perf_counter() - baslangic, cagri=cagri)
+    if not alindi:
+        hata_kaydet("llm_kuyruk")
+        raise KuyrukHatasi(f"LLM kuyruğu süre sınırı içinde boşalmadı ({cagri}).")
+    _aktif_degistir(1)
+
+
+def async_payi_ayir(pay=None):
+    """Eşzamanlı istek bütçesinden asyncio çağrılarına pay ayırır ve onların semaforunu döner.
+
+    Pay threading semaforundan kalıcı olarak alınır; böylece iki sınırın toplamı LLM_ESZAMANLI_LIMIT'i
+    aşmaz ve event loop bir thread primitive'ini yoklamaz. ASGI sunucusu trafik almadan önce çağırır,
+    aksi halde ilk async çağrıda o an boşta olan kadarıyla kurulur.
+    """
+    global _async_sinir
+    with _async_kilit:
+        if _async_sinir is None:
+            pay = max(1, min(LLM_ASYNC_PAYI if pay is None else pay, LLM_ESZAMANLI_LIMIT))
+            alinan = 0
+            while alinan < pay and _eszamanli_sinir.acquire(blocking=False):
+                alinan += 1
+            _async_sinir = asyncio.Semaphore(max(1, alinan))
+        return _async_sinir
+
+
+async def _sira_al_async(cagri, son_an):
+    # asyncio.Semaphore bekleyenleri sırayla (FIFO) uyandırır, beklerken loop'u meşgul etmez
+    sinir = _async_sinir or async_payi_ayir()
+    baslangic = time.perf_counter()
+    try:
+        await asyncio.wait_for(sinir.acquire(), max(0.0, son_an - baslangic))
+        alindi = True
+    except asyncio.TimeoutError:
+        alindi = False
+    KUYRUK_BEKLEME.gozlemle(time.perf_counter() - baslangic, cagri=cagri)
+    if not alindi:
+        hata_kaydet("llm_kuyruk")
+        raise KuyrukHatasi(f"LLM kuyruğu süre sınırı içinde boşalmadı ({cagri}).")
+    _aktif_degistir(1)
+
+
+def _sirayi_birak():
+    _aktif_degistir(-1)
+    _eszamanli_sinir.release()
+
+
+def _sirayi_birak_async():
+    _aktif_degistir(-1)
+    _async_sinir.release()
+
+
+def _durum_degistir(durum):
+    # _devre_kilit altında çağrılır
+    if _devre['durum'] == durum: return
+    print(f"LLM Devre Kesici: {_devre['durum']} -> {durum}")
+    _devre['durum'] = durum
+    DEVRE_GECIS.artir(durum=durum)
+    if durum == ACIK:
+        _devre['acilis'] = time.time()
+    elif durum == KAPALI:
+        _devre['pencere'].clear()
+
+
+def devre_acik():
+    """Çağrı şu an reddedilecekse True. Yarı açıkta deneme hakkı boştaysa False döner (çağrı deneme olur)."""
+    with _devre_kilit:
+        if _devre['durum'] == KAPALI: return False
+        if _devre['durum'] == ACIK:
+            return time.time() - _devre['acilis'] < DEVRE_ACIK_SN
+        return _devre['deneme_suruyor']
+
+
+def devre_durumu():
+    return _devre['durum']
+
+
+def _devre_izin(cagri):
+    """Çağrıya izin verir; deneme çağrısıysa True döner. İzin yoksa DevreAcikHatasi."""
+    with _devre_kilit:
+        if _devre['durum'] == KAPALI: return False
+        if _devre['durum'] == ACIK and time.time() - _devre['acilis'] >= DEVRE_ACIK_SN:
+            _durum_degistir(YARI_ACIK)
+            _devre['deneme_suruyor'] = False
+        if _devre['durum'] == YARI_ACIK and not _devre['deneme_suruyor']:
+            _devre['deneme_suruyor'] = True
+            return True
+    DEVRE_RED.artir(cagri=cagri)
+    raise DevreAcikHatasi(f"LLM devre kesici açık ({cagri}).")
+
+
+def _devre_kaydet(basarili, deneme):
+    """basarili None ise sonuç sayılmaz (iptal); deneme çağrısının hakkı yine de bırakılır."""
+    with _devre_kilit:
+        if deneme:
+            _devre['deneme_suruyor'] = False
+            if basarili is not None: _durum_degistir(KAPALI if basarili else ACIK)
+            return
+        if _devre['durum'] != KAPALI or basarili is None: return
+
+        pencere = _devre['pencere']
+        pencere.append(basarili)
+        hata = pencere.count(False)
+        if len(pencere) >= DEVRE_MIN_CAGRI and hata / len(pencere) >= DEVRE_HATA_ORANI:
+            _durum_degistir(ACIK)
+
+
+def _devre_sonucu(sonuc, ust_sure):
+    """Devreye yazılacak sonuç: iptal ve yerel kuyruk hataları sayılmaz (None), başarı Gemini süresiyle ölçülür."""
+    if sonuc in ("iptal", "kuyruk"): return None
+    return sonuc == "tamam" and ust_sure < DEVRE_YAVAS_SN
+
+
+def _bekleme_suresi(deneme):
+    # Full jitter: aynı anda hata alan istekler aynı anda tekrar denemesin
+    return random.uniform(0, min(LLM_BEKLEME_TAVANI_SN, LLM_BEKLEME_TABANI_SN * (2 ** deneme)))
+
+
+def _tokenlari_kaydet(cagri, cevap):
+    kullanim = getattr(cevap, 'usage_metadata', None)
+    if not kullanim: return
+    prompt_token = getattr(kullanim, 'prompt_token_count', 0) or 0
+    TOKEN_SAYACI.artir(prompt_token, cagri=cagri, tur="prompt")
+    TOKEN_SAYACI.artir(getattr(kullanim, 'candidates_token_count', 0) or 0, cagri=cagri, tur="cevap")
+    # prompt_token_count önbellekten okunan kısmı da içerir; "onbellek" bunun indirimli faturalanan payıdır
+    TOKEN_SAYACI.artir(getattr(kullanim, 'cached_content_token_count', 0) or 0, cagri=cagri, tur="onbellek")
+    if prompt_token: PROMPT_TOKEN.gozlemle(prompt_token, cagri=cagri)
+
+
+class BaglamOnbellegi:
+    """Sabit prompt önekini sağlayıcı tarafında tutan arka uç arayüzü.
+
+    model_getir(onek) öneki zaten bilen bir model döner; arka uç kullanılamıyorsa None döner
+    ve çağrı öneki prompt'un başına ekleyerek normal yoldan devam eder.
+    """
+
+    def model_getir(self, onek):
+        return None
+
+    def ag_gerekir(self, onek):
+        """model_getir bu önek için ağ çağrısı yapacak (veya birinin bitmesini bekleyecek) ise True."""
+        return False
+
+
+class GeminiBaglamOnbellegi(BaglamOnbellegi):
+    """Önekleri genai.caching.CachedContent ile saklar; süresi dolmadan yeniler.
+
+    Oluşturma ağ çağrısıdır: kilit dışında yapılır ve aynı önek için eşzamanlı istekler tek
+    oluşturmayı bekler. Async yol ag_gerekir True iken model_getir'i thread'de çağırır.
+    """
+
+    def __init__(self, ttl_sn=BAGLAM_ONBELLEK_TTL_SN):
+        self.ttl_sn = ttl_sn
+        self._kayitlar = {}   # önek özeti -> (model, son geçerlilik anı)
+        self._surenler = {}   # önek özeti -> oluşturmayı bekleten Future
+        self._kilit = threading.Lock()
+        self._hata_zamani = 0.0
+
+    def _taze(self, kayit, simdi):
+        # Süre bitimine %10 kala yenilenir; uçuştaki istek silinmiş önbelleğe denk gelmesin
+        return kayit is not None and kayit[1] - simdi > self.ttl_sn * 0.1
+
+    def ag_gerekir(self, onek):
+        anahtar = hashlib.sha256(onek.encode('utf-8')).hexdigest()
+        simdi = time.time()
+        with self._kilit:
+            if self._taze(self._kayitlar.get(anahtar), simdi): return False
+            return simdi - self._hata_zamani >= 60
+
+    def model_getir(self, onek):
+        anahtar = hashlib.sha256(onek.encode('utf-8')).hexdigest()
+        simdi = time.time()
+        with self._kilit:
+            kayit = self._kayitlar.get(anahtar)
+            if self._taze(kayit, simdi): return kayit[0]
+            # Oluşturma başarısızsa (kota, çok kısa önek vb.) her turda tekrar denenmez
+            if simdi - self._hata_zamani < 60: return kayit[0] if kayit and kayit[1] > simdi else None
+            suren = self._surenler.get(anahtar)
+            sahibi = suren is None
+            if sahibi:
+                suren = self._surenler[anahtar] = Future()
+            elif kayit and kayit[1] > simdi:
+                # Yenileme sürerken süresi henüz dolmamış önbellek kullanılır
+                return kayit[0]
+        if not sahibi: return suren.result()
+
+        model = None
+        try:
+            onbellek = genai.caching.CachedContent.create(
+                model=f"models/{LLM_MODEL}", display_name=f"onek-{anahtar[:12]}",
+                system_instruction=onek, ttl=timedelta(seconds=self.ttl_sn))
+            model = genai.GenerativeModel.from_cached_content(cached_content=onbellek)
+        except Exception as e:
+            print(f"Bağlam Önbelleği Hatası: {e}")
+            hata_kaydet("llm_baglam_onbellegi")
+            # Yenileme başarısızsa süresi dolmamış eski önbellek kullanılmaya devam eder
+            if kayit and kayit[1] > time.time(): model = kayit[0]
+        finally:
+            with self._kilit:
+                if model is None or (kayit and model is kayit[0]):
+                    self._hata_zamani = simdi
+                else:
+                    self._kayitlar[anahtar] = (model, simdi + self.ttl_sn)
+                self._surenler.pop(anahtar, None)
+            suren.set_result(model)
+        return model
+
+
+class SahteBaglamOnbellegi(BaglamOnbellegi):
+    """Ağ kullanmayan arka uç: öneki prompt'a ekleyip önbellekten okunmuş gibi token sayar."""
+
+    def __init__(self):
+        self.olusturulan = set()
+
+    def model_getir(self, onek):
+        self.olusturulan.add(hashlib.sha256(onek.encode('utf-8')).hexdigest())
+        return _OnekliModel(model_getir(), onek)
+
+
+class _OnekliModel:
+    def __init__(self, model, onek):
+        self.model, self.onek = model, onek
+
+    def _onbellek_tokeni_yaz(self, cevap):
+        kullanim = getattr(cevap, 'usage_metadata', None)
+        if kullanim is not None:
+            kullanim.cached_content_token_count = len(self.onek) // 4
+        return cevap
+
+    def generate_content(self, prompt, **kwargs):
+        return self._onbellek_tokeni_yaz(self.model.generate_content(f"{self.onek}\n\n{prompt}", **kwargs))
+
+    async def generate_content_async(self, prompt, **kwargs):
+        cevap = await self.model.generate_content_async(f"{self.onek}\n\n{prompt}", **kwargs)
+        return self._onbellek_tokeni_yaz(cevap)
+
+
+def _baglam_onbellegi_olustur():
+    if BAGLAM_ONBELLEGI == "gemini": return GeminiBaglamOnbellegi()
+    if BAGLAM_ONBELLEGI == "sahte": return SahteBaglamOnbellegi()
+    return BaglamOnbellegi()
+
+
+baglam_onbellegi = _baglam_onbellegi_olustur()
+
+
+def _model_ve_prompt(prompt, onek):
+    """Önek varsa önce bağlam önbelleğini dener, olmazsa öneki prompt'un başına ekler."""
+    if not onek: return model_getir(), prompt
+    model = baglam_onbellegi.model_getir(onek)
+    if model is not None:
+        BAGLAM_ONBELLEK_SAYACI.artir(sonuc="onbellek")
+        return model, prompt
+    BAGLAM_ONBELLEK_SAYACI.artir(sonuc="tam_prompt")
+    return model_getir(), f"{onek}\n\n{prompt}"
+
+
+async def _model_ve_prompt_async(prompt, onek):
+    # Bağlam önbelleğini oluşturmak/yenilemek ağ çağrısıdır; event loop'u tutmasın diye thread'de yapılır
+    if onek and baglam_onbellegi.ag_gerekir(onek):
+        return await asyncio.to_thread(_model_ve_prompt, prompt, onek)
+    return _model_ve_prompt(prompt, onek)
+
+
+def _denemeleri_yurut(cagri, zaman_asimi, deneme_sayisi, istek):
+    """istek(kalan_sn) fonksiyonunu süre sınırı içinde, geçici hatalarda jitter'lı beklemeyle tekrar çalıştırır."""
+    zaman_asimi = zaman_asimi or LLM_ZAMAN_ASIMI_SN
+    deneme_sayisi = deneme_sayisi or LLM_DENEME_SAYISI
+    son_an = time.perf_counter() + zaman_asimi
+
+    for deneme in range(deneme_sayisi):
+        kalan = son_an - time.perf_counter()
+        if kalan <= 0: break
+        try:
+            return istek(kalan)
+        except _GECICI_HATALAR as e:
+            print(f"LLM Geçici Hata ({cagri}, deneme {deneme + 1}): {e}")
+            if deneme + 1 >= deneme_sayisi: break
+            bekleme = _bekleme_suresi(deneme)
+            if time.perf_counter() + bekleme >= son_an: break
+            DENEME_SAYACI.artir(cagri=cagri)
+            time.sleep(bekleme)
+
+    hata_kaydet("llm_zaman_asimi")
+    raise LLMHatasi(f"LLM çağrısı {zaman_asimi:.0f} sn içinde tamamlanamadı ({cagri}).")
+
+
+async def _denemeleri_yurut_async(cagri, zaman_asimi, deneme_sayisi, istek):
+    """_denemeleri_yurut'un asyncio sürümü; istek(kalan_sn) bir coroutine döner."""
+    zaman_asimi = zaman_asimi or LLM_ZAMAN_ASIMI_SN
+    deneme_sayisi = deneme_sayisi or LLM_DENEME_SAYISI
+    son_an = time.perf_counter() + zaman_asimi
+
+    for deneme in range(deneme_sayisi):
+        kalan = son_an - time.perf_counter()
+        if kalan <= 0: break
+        try:
+            return await istek(kalan)
+        except _GECICI_HATALAR as e:
+            print(f"LLM Geçici Hata ({cagri}, deneme {deneme + 1}): {e}")
+            if deneme + 1 >= deneme_sayisi: break
+            bekleme = _bekleme_suresi(deneme)
+            if time.perf_counter() + bekleme >= son_an: break
+            DENEME_SAYACI.artir(cagri=cagri)
+            await asyncio.sleep(bekleme)
+
+    hata_kaydet("llm_zaman_asimi")
+    raise LLMHatasi(f"LLM çağrısı {zaman_asimi:.0f} sn içinde tamamlanamadı ({cagri}).")
+
+
+def uret(prompt, cagri="genel", zaman_asimi=None, deneme_sayisi=None, onek=None):
+    """Prompt'u ortak model ile çalıştırır ve cevap metnini döner.
+
+    onek: her turda aynı kalan talimat metni; bağlam önbelleği açıksa sağlayıcıya bir kez gönderilir.
+    """
+    deneme = _devre_izin(cagri)
+    baslangic = time.perf_counter()
+    son_an = baslangic + (zaman_asimi or LLM_ZAMAN_ASIMI_SN)
+    sonuc = "hata"
+    ust_sure = [0.0]  # son denemenin Gemini'de geçen süresi
+
+    def istek(kalan):
+        _sira_al(cagri, son_an)
+        try:
+            model, tam_prompt = _model_ve_prompt(prompt, onek)
+            cagri_ani = time.perf_counter()
+            try:
+                cevap = model.generate_content(tam_prompt, request_options={"timeout": kalan})
+            finally:
+                ust_sure[0] = time.perf_counter() - cagri_ani
+        finally:
+            _sirayi_birak()
+        _tokenlari_kaydet(cagri, cevap)
+        return cevap.text
+
+    try:
+        metin = _denemeleri_yurut(cagri, zaman_asimi, deneme_sayisi, istek)
+        sonuc = "tamam"
+        return metin
+    except KuyrukHatasi:
+        sonuc = "kuyruk"
+        raise
+    finally:
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
+
+
+def akisli_uret(prompt, cagri="genel", zaman_asimi=None, deneme_sayisi=None):
+    """Cevabı stream=True ile üretip metin parçalarını yayar.
+
+    Yeniden deneme sadece ilk parça gelmeden önceki hatalarda yapılır; yayılmış bir
+    parçayı geri almak mümkün olmadığından sonraki hatalar çağırana iletilir.
+    """
+    deneme = _devre_izin(cagri)
+    baslangic = time.perf_counter()
+    son_an = baslangic + (zaman_asimi or LLM_ZAMAN_ASIMI_SN)
+    sonuc = "hata"
+    ust_sure = [0.0]  # son denemede ilk parçanın gelme süresi
+
+    def istek(kalan):
+        _sira_al(cagri, son_an)
+        cagri_ani = time.perf_counter()
+        try:
+            akis = iter(model_getir().generate_content(prompt, stream=True, request_options={"timeout": kalan}))
+            return akis, next(akis, None)
+        except BaseException:
+            _sirayi_birak()
+            raise
+        finally:
+            ust_sure[0] = time.perf_counter() - cagri_ani
+
+    try:
+        akis, parca = _denemeleri_yurut(cagri, zaman_asimi, deneme_sayisi, istek)
+    except BaseException as e:
+        if isinstance(e, KuyrukHatasi): sonuc = "kuyruk"
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
+        raise
+
+    try:
+        son_parca = None
+        while parca is not None:
+            son_parca = parca
+            try:
+                metin = parca.text
+            except ValueError:
+                metin = ""
+            if metin: yield metin
+            parca = next(akis, None)
+        sonuc = "tamam"
+        _tokenlari_kaydet(cagri, son_parca)
+    except GeneratorExit:
+        # İstemci akışı yarıda bıraktı; sağlayıcının sağlığı hakkında bilgi vermez
+        sonuc = "iptal"
+        raise
+    finally:
+        _sirayi_birak()
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
+
+
+async def uret_async(prompt, cagri="genel", zaman_asimi=None, deneme_sayisi=None, onek=None):
+    """uret'in asyncio sürümü (generate_content_async)."""
+    deneme = _devre_izin(cagri)
+    baslangic = time.perf_counter()
+    son_an = baslangic + (zaman_asimi or LLM_ZAMAN_ASIMI_SN)
+    sonuc = "hata"
+    ust_sure = [0.0]
+
+    async def istek(kalan):
+        await _sira_al_async(cagri, son_an)
+        try:
+            model, tam_prompt = await _model_ve_prompt_async(prompt, onek)
+            cagri_ani = time.perf_counter()
+            try:
+                cevap = await model.generate_content_async(tam_prompt, request_options={"timeout": kalan})
+            finally:
+                ust_sure[0] = time.perf_counter() - cagri_ani
+        finally:
+            _sirayi_birak_async()
+        _tokenlari_kaydet(cagri, cevap)
+        return cevap.text
+
+    try:
+        metin = await _denemeleri_yurut_async(cagri, zaman_asimi, deneme_sayisi, istek)
+        sonuc = "tamam"
+        return metin
+    except KuyrukHatasi:
+        sonuc = "kuyruk"
+        raise
+    finally:
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
+
+
+async def _sonraki_parca(akis):
+    try:
+        return await akis.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def akisli_uret_async(prompt, cagri="genel", zaman_asimi=None, deneme_sayisi=None):
+    """akisli_uret'in asyncio sürümü: metin parçalarını async generator olarak yayar."""
+    deneme = _devre_izin(cagri)
+    baslangic = time.perf_counter()
+    son_an = baslangic + (zaman_asimi or LLM_ZAMAN_ASIMI_SN)
+    sonuc = "hata"
+    ust_sure = [0.0]
+
+    async def istek(kalan):
+        await _sira_al_async(cagri, son_an)
+        cagri_ani = time.perf_counter()
+        try:
+            cevap = await model_getir().generate_content_async(prompt, stream=True, request_options={"timeout": kalan})
+            akis = cevap.__aiter__()
+            return akis, await _sonraki_parca(akis)
+        except BaseException:
+            _sirayi_birak_async()
+            raise
+        finally:
+            ust_sure[0] = time.perf_counter() - cagri_ani
+
+    try:
+        akis, parca = await _denemeleri_yurut_async(cagri, zaman_asimi, deneme_sayisi, istek)
+    except BaseException as e:
+        if isinstance(e, KuyrukHatasi): sonuc = "kuyruk"
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
+        raise
+
+    try:
+        son_parca = None
+        while parca is not None:
+            son_parca = parca
+            try:
+                metin = parca.text
+            except ValueError:
+                metin = ""
+            if metin: yield metin
+            parca = await _sonraki_parca(akis)
+        sonuc = "tamam"
+        _tokenlari_kaydet(cagri, son_parca)
+    except GeneratorExit:
+        sonuc = "iptal"
+        raise
+    finally:
+        _sirayi_birak_async()
+        _devre_kaydet(_devre_sonucu(sonuc, ust_sure[0]), deneme)
+        CAGRI_SURESI.gozlemle(time.perf_counter() - baslangic, cagri=cagri, sonuc=sonuc)
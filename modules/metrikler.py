@@ -0,0 +1,173 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Prometheus metin formatında (text/plain; version=0.0.4) dışa aktarılan basit metrik kaydı.
+# Harici bağımlılık yok; her işçi kendi sayaçlarını tutar.
+
+VARSAYILAN_KOVALAR = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SONSUZ_KOVA = 'le="+Inf"'
+
+_kayit = []
+_kayit_kilit = threading.Lock()
+
+
+def _etiket_kacis(deger):
+    return str(deger).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiket_metni(adlar, degerler, ek=None):
+    ciftler = [f'{ad}="{_etiket_kacis(deger)}"' for ad, deger in zip(adlar, degerler)]
+    if ek: ciftler.append(ek)
+    return "{" + ",".join(ciftler) + "}" if ciftler else ""
+
+
+def _sayi_metni(deger):
+    if deger == float('inf'): return "+Inf"
+    if float(deger).is_integer(): return str(int(deger))
+    return repr(float(deger))
+
+
+class _Metrik:
+    tip = None
+
+    def __init__(self, ad, aciklama, etiketler=()):
+        self.ad = ad
+        self.aciklama = aciklama
+        self.etiketler = tuple(etiketler)
+        self._kilit = threading.Lock()
+        with _kayit_kilit:
+            _kayit.append(self)
+
+    def _anahtar(self, etiket_degerleri):
+        return tuple(str(etiket_degerleri.get(ad, "")) for ad in self.etiketler)
+
+    def satirlar(self):
+        raise NotImplementedError
+
+
+class Sayac(_Metrik):
+    tip = "counter"
+
+    def __init__(self, ad, aciklama, etiketler=()):
+        super().__init__(ad, aciklama, etiketler)
+        self._degerler = {}
+
+    def artir(self, miktar=1, **etiket_degerleri):
+        anahtar = self._anahtar(etiket_degerleri)
+        with self._kilit:
+            self._degerler[anahtar] = self._degerler.get(anahtar, 0) + miktar
+
+    def deger(self, **etiket_degerleri):
+        with self._kilit:
+            return self._degerler.get(self._anahtar(etiket_degerleri), 0)
+
+    def satirlar(self):
+        with self._kilit:
+            ogeler = sorted(self._degerler.items())
+        return [f"{self.ad}{_etiket_metni(self.etiketler, a)} {_sayi_metni(d)}" for a, d in ogeler]
+
+
+class Gosterge(_Metrik):
+    """Anlık değer. fonksiyon verilirse değer her okumada ondan alınır."""
+    tip = "gauge"
+
+    def __init__(self, ad, aciklama, etiketler=(), fonksiyon=None):
+        super().__init__(ad, aciklama, etiketler)
+        self._degerler = {}
+        self._fonksiyon = fonksiyon
+
+    def ayarla(self, deger, **etiket_degerleri):
+        with self._kilit:
+            self._degerler[self._anahtar(etiket_degerleri)] = deger
+
+    def satirlar(self):
+        if self._fonksiyon is not None:
+            return [f"{self.ad} {_sayi_metni(self._fonksiyon())}"]
+        with self._kilit:
+            ogeler = sorted(self._degerler.items())
+        return [f"{self.ad}{_etiket_metni(self.etiketler, a)} {_sayi_metni(d)}" for a, d in ogeler]
+
+
+class Histogram(_Metrik):
+    tip = "histogram"
+
+    def __init__(self, ad, aciklama, etiketler=(), kovalar=VARSAYILAN_KOVALAR):
+        super().__init__(ad, aciklama, etiketler)
+        self.kovalar = tuple(sorted(kovalar))
+        self._seriler = {}
+
+    def gozlemle(self, deger, **etiket_degerleri):
+        anahtar = self._anahtar(etiket_degerleri)
+        with self._kilit:
+            seri = self._seriler.get(anahtar)
+            if seri is None:
+                seri = self._seriler[anahtar] = {'kova': [0] * len(self.kovalar), 'toplam': 0.0, 'adet': 0}
+            indeks = bisect.bisect_left(self.kovalar, deger)
+            if indeks < len(self.kovalar):
+                seri['kova'][indeks] += 1
+            seri['toplam'] += deger
+            seri['adet'] += 1
+
+    @contextmanager
+    def olc(self, **etiket_degerleri):
+        baslangic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.gozlemle(time.perf_counter() - baslangic, **etiket_degerleri)
+
+    def satirlar(self):
+        with self._kilit:
+            ogeler = sorted((a, dict(s, kova=list(s['kova']))) for a, s in self._seriler.items())
+
+        satirlar = []
+        for anahtar, seri in ogeler:
+            birikimli = 0
+            for sinir, adet in zip(self.kovalar, seri['kova']):
+                birikimli += adet
+                le = f'le="{_sayi_metni(sinir)}"'
+                satirlar.append(f"{self.ad}_bucket{_etiket_metni(self.etiketler, anahtar, le)} {birikimli}")
+            satirlar.append(f"{self.ad}_bucket{_etiket_metni(self.etiketler, anahtar, SONSUZ_KOVA)} {seri['adet']}")
+            satirlar.append(f"{self.ad}_sum{_etiket_metni(self.etiketler, anahtar)} {_sayi_metni(seri['toplam'])}")
+            satirlar.append(f"{self.ad}_count{_etiket_metni(self.etiketler, anahtar)} {seri['adet']}")
+        return satirlar
+
+
+def prometheus_metni():
+    with _kayit_kilit:
+        metrikler = list(_kayit)
+
+    cikti = []
+    for metrik in metrikler:
+        cikti.append(f"# HELP {metrik.ad} {metrik.aciklama}")
+        cikti.append(f"# TYPE {metrik.ad} {metrik.tip}")
+        cikti.extend(metrik.satirlar())
+    return "\n".join(cikti) + "\n"
+
+
+# --- SOHBET TURU METRİKLERİ ---
+ASAMA_SURESI = Histogram("sohbet_asama_suresi_saniye",
+                         "Bir sohbet turundaki aşamaların süresi (duygu_analizi, yonlendirme_llm, ifade_llm, tts).",
+                         ("asama",))
+AKSIYON_SURESI = Histogram("aksiyon_suresi_saniye",
+                           "process_with_gemini içinde çalıştırılan aksiyon fonksiyonlarının süresi.",
+                           ("fonksiyon",))
+SECILEN_FONKSIYON = Sayac("secilen_fonksiyon_toplam",
+                          "Yönlendirme sonucunda seçilen fonksiyon sayısı (sohbet cevapları için 'chat').",
+                          ("fonksiyon",))
+YONLENDIRME_KAYNAGI = Sayac("yonlendirme_toplam",
+                            "Yönlendirme kararını kimin verdiği (yerel niyet modeli, llm veya kısıtlı mod).",
+                            ("kaynak",))
+CEVAP_POLITIKASI_SAYACI = Sayac("cevap_politikasi_toplam",
+                                "Aksiyon cevaplarının iletilme biçimi (direkt, sablon, llm, ozel).",
+                                ("politika",))
+ON_YUKLEME_SAYACI = Sayac("on_yukleme_toplam",
+                          "Doğrulanmış turlarda önden okunan kargo bilgisinin kullanımı (isabet, iska, gecersiz).",
+                          ("sonuc",))
+HATA_SAYACI = Sayac("hata_toplam", "Hata yollarına göre yakalanan hata sayısı.", ("yol",))
+
+
+def hata_kaydet(yol):
+    HATA_SAYACI.artir(yol=yol)
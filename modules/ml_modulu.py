@@ -1,58 +1,201 @@
-from sklearn.linear_model import LinearRegression
-import pandas as pd
 import os
 import re
+import json
+import time
+import hashlib
+import threading
+import copy
+import shutil
+from importlib import metadata
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import make_pipeline
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, f1_score
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from modules.database import sikayet_metinleri_getir
+from modules.duygu_numpy import NumpyDuyguModeli, disa_aktar
 
+# pandas ve scikit-learn sadece eğitim/toplu işlerde gerekir ve kullanıldıkları fonksiyonların içinde yüklenir.
+# Model dosyaları hazırsa (model_hazirla.py) sohbet süreci ikisini de yüklemez: duygu ve niyet tahmini NumPy
+# dizilerinden, teslimat tahmini joblib ile okunan katsayılardan yapılır. Dosya yoksa ısınmadaki eğitim bu
+# kütüphaneleri yükler; vergi motoru (vergi_motoru.py) pandas'ı ilk vergi sorusunda yükler.
 
-def teslimat_suresi_hesapla(mesafe, agirlik):
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        base_dir = os.path.dirname(current_dir)
-        csv_path = os.path.join(base_dir, 'teslimat_verisi.csv')
-
-        if not os.path.exists(csv_path):
-            return "HATA: 'teslimat_verisi.csv' dosyası bulunamadı."
-
-        df = pd.read_csv(csv_path)
-        df = df[df['Status'].isin(['Delivered', 'Delayed'])]
-        df = df.dropna(subset=['Distance_miles', 'Weight_kg', 'Transit_Days'])
-
-        X = df[['Distance_miles', 'Weight_kg']]
-        y = df['Transit_Days']
 
-        # --- MODEL PERFORMANSI ---
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        model = LinearRegression()
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
+EGITILMIS_MODEL = None
+# Yüklü duygu artifact'ı (model + üst bilgi); akışlı modda güncellemeler bunun üzerine yapılır
+DUYGU_KAYDI = None
+_duygu_kilit = threading.RLock()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Eğitilmiş modeller burada saklanır; her işçi açılışta eğitmek yerine dosyadan yükler (bkz. model_hazirla.py)
+MODEL_KLASORU = os.getenv("MODEL_KLASORU", os.path.join(BASE_DIR, 'model_artifacts'))
+
+DUYGU_CSV = 'duygu_analizi.csv'
+# Değişirse parmak izi de değişir ve model yeniden eğitilir
+DUYGU_HIPERPARAMETRELERI = {
+    "ngram_range": [1, 2],
+    "min_df": 2,
+    "max_features": 5000,
+    "max_iter": 1000,
+    "test_size": 0.2,
+    "random_state": 42,
+}
+
+# tfidf: tüm CSV ile sıfırdan eğitilen TF-IDF + LogisticRegression (varsayılan)
+# akisli: sözlüksüz HashingVectorizer + SGDClassifier; CSV parça parça okunur, yeni örnekler partial_fit ile eklenir
+DUYGU_MODU = os.getenv("DUYGU_MODU", "tfidf").lower()
+# tfidf modunda tahmini kim yapar: numpy (mmap'li dizilerden, varsayılan) | sklearn (joblib pipeline)
+DUYGU_MOTORU = os.getenv("DUYGU_MOTORU", "numpy").lower()
+AKISLI_HIPERPARAMETRELERI = {
+    "n_features": 2 ** 18,
+    "ngram_range": [1, 2],
+    "alpha": 1e-5,
+    "parca_boyutu": 2000,
+    "tur_sayisi": 5,
+    "siniflar": ["Olumlu", "Olumsuz", "Tarafsız"],
+    "random_state": 42,
+}
+
+
+def parmak_izi(csv_path, hiperparametreler, sklearn_surumu=True):
+    """Eğitim verisi + hiperparametreler + sklearn sürümünden kısa özet üretir (pickle sürümler arası taşınmaz).
+
+    NumPy dizileri sürümden bağımsız olduğundan onlar için sklearn_surumu=False verilir.
+    """
+    ozet = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for blok in iter(lambda: f.read(1 << 20), b""):
+            ozet.update(blok)
+    ozet.update(json.dumps(hiperparametreler, sort_keys=True).encode('utf-8'))
+    if sklearn_surumu: ozet.update(metadata.version("scikit-learn").encode('utf-8'))
+    return ozet.hexdigest()[:16]
+
+
+def artifact_yolu(ad, parmak):
+    return os.path.join(MODEL_KLASORU, f"{ad}_{parmak}.joblib")
+
+
+def artifact_yukle(ad, parmak):
+    """Parmak izine ait artifact varsa içeriğini, yoksa veya okunamazsa None döner."""
+    yol = artifact_yolu(ad, parmak)
+    if not os.path.exists(yol): return None
+    import joblib
+    try:
+        return joblib.load(yol)
+    except Exception as e:
+        print(f"Model Dosyası Okunamadı ({yol}): {e}")
+        return None
 
-        mae = mean_absolute_error(y_test, y_pred)
-        r2 = r2_score(y_test, y_pred)
 
-        # Bu print sadece bu dosya doğrudan çalıştırılırsa anlamlıdır
-        if __name__ == "__main__":
-            print(f"\n--- TESLİMAT MODELİ PERFORMANSI ---")
-            print(f"Ortalama Hata (MAE): {mae:.2f} gün")
-            print(f"Başarı Skoru (R2)  : {r2:.2f}")
-            print("-----------------------------------\n")
+def artifact_kaydet(ad, parmak, icerik):
+    import joblib
+    os.makedirs(MODEL_KLASORU, exist_ok=True)
+    yol = artifact_yolu(ad, parmak)
+    # Aynı anda açılan işçiler yarım yazılmış dosyayı okumasın
+    gecici = f"{yol}.{os.getpid()}.tmp"
+    joblib.dump(icerik, gecici)
+    os.replace(gecici, yol)
+    return yol
+
+
+def eski_artifactlari_sil(ad, parmak):
+    """Aynı modelin başka parmak izli eski dosyalarını siler, silinenleri döner."""
+    if not os.path.isdir(MODEL_KLASORU): return []
+    silinen = []
+    for dosya in os.listdir(MODEL_KLASORU):
+        # "duygu" ile "duygu_akisli" karışmasın diye ad + 16 haneli parmak izi birebir eşleşmeli
+        eslesme = re.fullmatch(rf"{re.escape(ad)}_([0-9a-f]{{16}})(\.joblib)?", dosya)
+        if not eslesme or eslesme.group(1) == parmak: continue
+        yol = os.path.join(MODEL_KLASORU, dosya)
+        # NumPy dışa aktarımları klasördür
+        if os.path.isdir(yol): shutil.rmtree(yol)
+        else: os.remove(yol)
+        silinen.append(dosya)
+    return silinen
+
+
+TESLIMAT_CSV = 'teslimat_verisi.csv'
+TESLIMAT_HIPERPARAMETRELERI = {
+    "ozellikler": ["Distance_miles", "Weight_kg"],
+    "durumlar": ["Delivered", "Delayed"],
+    "test_size": 0.2,
+    "random_state": 42,
+}
+MIN_TESLIMAT_GUN = 1.0
+
+# {'sabit', 'katsayilar', 'mae', 'r2', ...}; tahmin için sadece katsayılar gerekir, sklearn nesnesi tutulmaz
+TESLIMAT_MODELI = None
+_teslimat_kilit = threading.Lock()
+
+
+def _teslimat_modeli_egit(csv_path):
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    hp = TESLIMAT_HIPERPARAMETRELERI
+    df = pd.read_csv(csv_path)
+    df = df[df['Status'].isin(hp['durumlar'])]
+    df = df.dropna(subset=hp['ozellikler'] + ['Transit_Days'])
+
+    X = df[hp['ozellikler']]
+    y = df['Transit_Days']
+
+    # --- MODEL PERFORMANSI (sadece eğitimde) ---
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=hp['test_size'],
+                                                        random_state=hp['random_state'])
+    model = LinearRegression()
+    model.fit(X_train, y_train)
+    y_pred = model.predict(X_test)
+    mae = mean_absolute_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+
+    # Gerçek tahmin için tüm veriyle eğit
+    model.fit(X, y)
+    return {
+        "sabit": float(model.intercept_),
+        "katsayilar": [float(k) for k in model.coef_],
+        "mae": round(float(mae), 4),
+        "r2": round(float(r2), 4),
+        "ornek_sayisi": int(len(df)),
+    }
+
+
+def teslimat_modelini_yukle(yeniden=False):
+    """Teslimat modelini artifact'tan yükler; yoksa bir kez eğitip kaydeder. Veri dosyası yoksa None."""
+    global TESLIMAT_MODELI
+    with _teslimat_kilit:
+        if TESLIMAT_MODELI is not None and not yeniden: return TESLIMAT_MODELI
+
+        csv_path = os.path.join(BASE_DIR, TESLIMAT_CSV)
+        if not os.path.exists(csv_path):
+            print(f"UYARI: {csv_path} bulunamadı.")
+            return None
+
+        parmak = parmak_izi(csv_path, TESLIMAT_HIPERPARAMETRELERI)
+        kayit = None if yeniden else artifact_yukle("teslimat", parmak)
+        if kayit is None:
+            baslangic = time.perf_counter()
+            kayit = _teslimat_modeli_egit(csv_path)
+            kayit.update(parmak_izi=parmak, hiperparametreler=TESLIMAT_HIPERPARAMETRELERI,
+                         egitim_suresi_sn=round(time.perf_counter() - baslangic, 3), olusturma=time.time())
+            try:
+                yol = artifact_kaydet("teslimat", parmak, kayit)
+                print(f"Teslimat modeli eğitildi ve kaydedildi: {yol}")
+            except OSError as e:
+                print(f"Model Kaydetme Hatası: {e}")
+
+        TESLIMAT_MODELI = kayit
+        return kayit
 
-        # Gerçek tahmin için tüm veriyle eğit
-        model.fit(X, y)
 
-        yeni_veri = pd.DataFrame({
-            'Distance_miles': [float(mesafe)],
-            'Weight_kg': [float(agirlik)]
-        })
+def teslimat_suresi_hesapla(mesafe, agirlik):
+    """Tek gönderi için tahmini gün (en az 1, 1 ondalık). Hata durumunda metin döner."""
+    try:
+        model = TESLIMAT_MODELI or teslimat_modelini_yukle()
+        if model is None:
+            return f"HATA: '{TESLIMAT_CSV}' dosyası bulunamadı."
 
-        tahmin = model.predict(yeni_veri)[0]
-        if tahmin < 1.0: tahmin = 1.0
+        k_mesafe, k_agirlik = model['katsayilar']
+        tahmin = model['sabit'] + k_mesafe * float(mesafe) + k_agirlik * float(agirlik)
+        if tahmin < MIN_TESLIMAT_GUN: tahmin = MIN_TESLIMAT_GUN
 
         return round(tahmin, 1)
 
@@ -60,7 +203,15 @@ def teslimat_suresi_hesapla(mesafe, agirlik):
         return f"Model Hatası: {e}"
 
 
-EGITILMIS_MODEL = None
+def teslimat_suresi_toplu(mesafeler, agirliklar):
+    """Çok sayıda gönderi için vektörel tahmin; numpy dizisi döner."""
+    model = TESLIMAT_MODELI or teslimat_modelini_yukle()
+    if model is None:
+        raise FileNotFoundError(TESLIMAT_CSV)
+
+    X = np.column_stack([np.asarray(mesafeler, dtype=float), np.asarray(agirliklar, dtype=float)])
+    tahmin = X @ np.asarray(model['katsayilar']) + model['sabit']
+    return np.round(np.maximum(tahmin, MIN_TESLIMAT_GUN), 1)
 
 
 def metin_temizle(metin):
@@ -72,49 +223,260 @@ def metin_temizle(metin):
     return metin
 
 
-def modeli_egit():
-    global EGITILMIS_MODEL
-    CSV_DOSYA_ADI = 'duygu_analizi.csv'
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    csv_path = os.path.join(base_dir, CSV_DOSYA_ADI)
+def metinleri_temizle(metinler):
+    """metin_temizle'nin pandas string işlemleriyle toplu hali; aynı çıktıyı Series olarak döner."""
+    import pandas as pd
+    seri = pd.Series(metinler, dtype=object)
+    seri = seri.where(seri.map(lambda m: isinstance(m, str)), "")
+    seri = seri.str.replace(r'<.*?>', '', regex=True)
+    seri = seri.str.replace(r'[^a-zA-ZçÇğĞıİöÖşŞüÜ\s]', '', regex=True)
+    seri = seri.str.lower()
+    return seri.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _csv_kodlamasi(csv_path):
+    with open(csv_path, 'rb') as f:
+        return 'utf-16' if f.read(2) in (b'\xff\xfe', b'\xfe\xff') else 'utf-8'
+
+
+def _duygu_verisi_oku(csv_path):
+    import pandas as pd
+    try:
+        df = pd.read_csv(csv_path, encoding='utf-8')
+    except:
+        df = pd.read_csv(csv_path, encoding='utf-16')
+
+    df = df.dropna()
+    df['clean_text'] = metinleri_temizle(df['text']).values
+    return df
+
+
+def _duygu_modeli_egit(csv_path):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report, f1_score
+
+    hp = DUYGU_HIPERPARAMETRELERI
+    df = _duygu_verisi_oku(csv_path)
+
+    X_train, X_test, y_train, y_test = train_test_split(df['clean_text'], df['label'], test_size=hp['test_size'],
+                                                        random_state=hp['random_state'])
+
+    vectorizer = TfidfVectorizer(ngram_range=tuple(hp['ngram_range']), min_df=hp['min_df'],
+                                 max_features=hp['max_features'])
+    clf = LogisticRegression(max_iter=hp['max_iter'])
+    model = make_pipeline(vectorizer, clf)
+    model.fit(X_train, y_train)
+
+    y_pred = model.predict(X_test)
+    skor = f1_score(y_test, y_pred, average='weighted')
+
+    if __name__ == "__main__":
+        print("\n--- MODEL PERFORMANS RAPORU ---")
+        print(f"F1 Skoru (Weighted): {skor:.4f}")
+        print("\nSınıflandırma Raporu:")
+        print(classification_report(y_test, y_pred))
+        print("---------------------------------\n")
+
+    return model, skor
+
+
+def _akisli_vektorlestirici(hp):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=hp['n_features'], ngram_range=tuple(hp['ngram_range']),
+                             alternate_sign=False, norm='l2')
+
+
+def _etiketli_parca(metinler, etiketler, siniflar):
+    """Temizlenmiş, boş olmayan ve etiketi bilinen satırları (metinler, etiketler) listeleri olarak döner."""
+    import pandas as pd
+    temiz = metinleri_temizle(list(metinler))
+    etiketler = pd.Series(list(etiketler), dtype=object)
+    maske = (temiz.str.len() > 0).values & etiketler.isin(siniflar).values
+    return temiz[maske].tolist(), etiketler[maske].tolist()
+
+
+def _akisli_modeli_egit(csv_path):
+    """CSV'yi parca_boyutu satırlık parçalarla okuyup partial_fit ile eğitir; bellekte tek parça tutulur.
+
+    Ayrı test kümesi yerine ilk turda her parça öğrenilmeden önce puanlanır (önce test, sonra eğit).
+    """
+    import pandas as pd
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import make_pipeline
+    from sklearn.metrics import f1_score
+
+    hp = AKISLI_HIPERPARAMETRELERI
+    vektorlestirici = _akisli_vektorlestirici(hp)
+    clf = SGDClassifier(loss='log_loss', alpha=hp['alpha'], random_state=hp['random_state'])
+    kodlama = _csv_kodlamasi(csv_path)
+    gercekler, tahminler = [], []
+
+    for tur in range(hp['tur_sayisi']):
+        for parca in pd.read_csv(csv_path, encoding=kodlama, chunksize=hp['parca_boyutu']):
+            metinler, etiketler = _etiketli_parca(parca['text'], parca['label'], hp['siniflar'])
+            if not metinler: continue
+            X = vektorlestirici.transform(metinler)
+            if tur == 0 and hasattr(clf, 'coef_'):
+                gercekler.extend(etiketler)
+                tahminler.extend(clf.predict(X))
+            clf.partial_fit(X, etiketler, classes=hp['siniflar'])
+
+    skor = f1_score(gercekler, tahminler, average='weighted') if gercekler else 0.0
+    if __name__ == "__main__":
+        print(f"\n--- AKIŞLI MODEL (önce test, sonra eğit) F1: {skor:.4f} ---\n")
+    return make_pipeline(vektorlestirici, clf), skor
+
+
+def duygu_ayarlari():
+    """Seçili DUYGU_MODU için (artifact adı, hiperparametreler, eğitim fonksiyonu)."""
+    if DUYGU_MODU == "akisli":
+        return "duygu_akisli", AKISLI_HIPERPARAMETRELERI, _akisli_modeli_egit
+    return "duygu", DUYGU_HIPERPARAMETRELERI, _duygu_modeli_egit
+
+
+def modeli_egit(yeniden=False):
+    """Duygu modelini artifact'tan yükler; parmak izi değiştiyse (veya yeniden=True) eğitip kaydeder."""
+    global EGITILMIS_MODEL, DUYGU_KAYDI
+    csv_path = os.path.join(BASE_DIR, DUYGU_CSV)
 
     if not os.path.exists(csv_path):
         print(f"UYARI: {csv_path} bulunamadı.")
         return None
 
     try:
-        try:
-            df = pd.read_csv(csv_path, encoding='utf-8')
-        except:
-            df = pd.read_csv(csv_path, encoding='utf-16')
+        ad, hiperparametreler, egit = duygu_ayarlari()
+        numpy_klasoru = None
+        if ad == "duygu" and DUYGU_MOTORU == "numpy":
+            numpy_klasoru = artifact_yolu("duygu_numpy", parmak_izi(csv_path, hiperparametreler, sklearn_surumu=False))
+            numpy_klasoru = numpy_klasoru[:-len(".joblib")]
+            if yeniden:
+                shutil.rmtree(numpy_klasoru, ignore_errors=True)
+            elif os.path.isdir(numpy_klasoru):
+                # Dışa aktarılmış diziler varsa pipeline (ve sklearn) hiç yüklenmez
+                return _numpy_modelini_kullan(numpy_klasoru)
+
+        parmak = parmak_izi(csv_path, hiperparametreler)
+        kayit = None if yeniden else artifact_yukle(ad, parmak)
+
+        if kayit is None:
+            baslangic = time.perf_counter()
+            model, skor = egit(csv_path)
+            kayit = {
+                "model": model,
+                "parmak_izi": parmak,
+                "hiperparametreler": hiperparametreler,
+                "f1": round(float(skor), 4),
+                "egitim_suresi_sn": round(time.perf_counter() - baslangic, 2),
+                "olusturma": time.time(),
+            }
+            try:
+                yol = artifact_kaydet(ad, parmak, kayit)
+                print(f"Duygu modeli eğitildi ve kaydedildi: {yol}")
+            except OSError as e:
+                # Salt okunur dosya sisteminde model yine bellekte kullanılır
+                print(f"Model Kaydetme Hatası: {e}")
+
+        if numpy_klasoru:
+            try:
+                ust_bilgi = {k: v for k, v in kayit.items() if k not in ("model", "hiperparametreler")}
+                disa_aktar(kayit["model"], numpy_klasoru, ust_bilgi)
+                return _numpy_modelini_kullan(numpy_klasoru)
+            except Exception as e:
+                print(f"NumPy Dışa Aktarma Hatası, sklearn pipeline kullanılacak: {e}")
+
+        DUYGU_KAYDI = kayit
+        EGITILMIS_MODEL = kayit["model"]
+        return EGITILMIS_MODEL
+
+    except Exception as e:
+        print(f"Model Eğitme Hatası: {e}")
+        return None
 
-        df = df.dropna()
-        df['clean_text'] = df['text'].apply(metin_temizle)
 
-        X_train, X_test, y_train, y_test = train_test_split(df['clean_text'], df['label'], test_size=0.2,
-                                                            random_state=42)
+def _numpy_modelini_kullan(klasor):
+    global EGITILMIS_MODEL, DUYGU_KAYDI
+    model = NumpyDuyguModeli(klasor)
+    DUYGU_KAYDI = dict(model.bilgi, model=model)
+    EGITILMIS_MODEL = model
+    return model
 
-        vectorizer = TfidfVectorizer(ngram_range=(1, 2), min_df=2, max_features=5000)
-        clf = LogisticRegression(max_iter=1000)
-        model = make_pipeline(vectorizer, clf)
-        model.fit(X_train, y_train)
 
-        if __name__ == "__main__":
-            y_pred = model.predict(X_test)
-            skor = f1_score(y_test, y_pred, average='weighted')
+def duygu_modelini_guncelle(metinler, etiketler, **ust_bilgi):
+    """Akışlı modda yeni etiketli mesajları küçük parçalar halinde partial_fit ile modele katar.
 
-            print("\n--- MODEL PERFORMANS RAPORU ---")
-            print(f"F1 Skoru (Weighted): {skor:.4f}")
-            print("\nSınıflandırma Raporu:")
-            print(classification_report(y_test, y_pred))
-            print("---------------------------------\n")
+    Güncelleme modelin kopyası üzerinde yapılır ve bitince tek atamayla devreye alınır; bu sırada
+    gelen tahminler eski modelle devam eder. Artifact aynı parmak izinin üzerine yazılır. Katılan örnek sayısını döner.
+    """
+    global EGITILMIS_MODEL, DUYGU_KAYDI
+    if DUYGU_MODU != "akisli":
+        raise ValueError("Artımlı güncelleme sadece DUYGU_MODU=akisli iken kullanılabilir.")
+    from sklearn.pipeline import make_pipeline
 
-        EGITILMIS_MODEL = model
-        return model
+    with _duygu_kilit:
+        if DUYGU_KAYDI is None and modeli_egit() is None:
+            raise RuntimeError("Duygu analizi modeli yüklenemedi.")
 
-    except Exception as e:
-        print(f"Model Eğitme Hatası: {e}")
-        return None
+        hp = AKISLI_HIPERPARAMETRELERI
+        metinler, etiketler = _etiketli_parca(metinler, etiketler, hp['siniflar'])
+        if not metinler: return 0
+
+        vektorlestirici, clf = DUYGU_KAYDI["model"][0], copy.deepcopy(DUYGU_KAYDI["model"][-1])
+        for i in range(0, len(metinler), hp['parca_boyutu']):
+            clf.partial_fit(vektorlestirici.transform(metinler[i:i + hp['parca_boyutu']]),
+                            etiketler[i:i + hp['parca_boyutu']])
+
+        kayit = dict(DUYGU_KAYDI, **ust_bilgi)
+        kayit.update(model=make_pipeline(vektorlestirici, clf), guncelleme=time.time(),
+                     ek_ornek=DUYGU_KAYDI.get("ek_ornek", 0) + len(metinler))
+        try:
+            artifact_kaydet("duygu_akisli", kayit["parmak_izi"], kayit)
+        except OSError as e:
+            print(f"Model Kaydetme Hatası: {e}")
+
+        DUYGU_KAYDI = kayit
+        EGITILMIS_MODEL = kayit["model"]
+        return len(metinler)
+
+
+def sikayetleri_ogren():
+    """sikayetler tablosunda müşterinin kendi ifadesiyle açtığı, çözülmüş ve henüz katılmamış kayıtları 'Olumsuz' olarak öğrenir.
+
+    Filigran (son taranan id ve o sırada açık olan id'ler) kilit altında okunup ilerletilir; aynı anda
+    çalışan iki çağrı aynı şikayeti iki kez katmaz.
+    """
+    global DUYGU_KAYDI
+    with _duygu_kilit:
+        if DUYGU_KAYDI is None and modeli_egit() is None:
+            raise RuntimeError("Duygu analizi modeli yüklenemedi.")
+
+        tarama = sikayet_metinleri_getir(DUYGU_KAYDI.get("son_sikayet_id", 0),
+                                         DUYGU_KAYDI.get("acik_sikayet_idleri", ()))
+        filigran = {"son_sikayet_id": tarama['son_id'], "acik_sikayet_idleri": tarama['acik']}
+        satirlar = tarama['cozulmus']
+        adet = duygu_modelini_guncelle([s['konu'] for s in satirlar], ["Olumsuz"] * len(satirlar),
+                                       **filigran) if satirlar else 0
+        if not adet:
+            # Katılacak örnek yoksa filigran sadece bellekte ilerler; artifact'e sonraki güncellemeyle yazılır
+            DUYGU_KAYDI = dict(DUYGU_KAYDI, **filigran)
+        return adet
+
+
+GUVEN_ESIGI = 0.60
+
+
+def _duygu_etiketi(tahmin, guven_skoru):
+    if guven_skoru < GUVEN_ESIGI:
+        return "NÖTR (Düşük Güven)", 0
+
+    if tahmin in ["Olumlu", "Pozitif", "1"]:
+        return "MUTLU (POZİTİF)", 2
+    elif tahmin in ["Olumsuz", "Negatif", "-1"]:
+        return "KIZGIN (NEGATİF)", -2
+    else:
+        return "NÖTR", 0
 
 
 def duygu_analizi_yap(gelen_cumle):
@@ -132,32 +494,69 @@ def duygu_analizi_yap(gelen_cumle):
         olasiliklar = EGITILMIS_MODEL.predict_proba([temiz_cumle])[0]
         siniflar = EGITILMIS_MODEL.classes_
         max_index = np.argmax(olasiliklar)
-        tahmin = siniflar[max_index]
-        guven_skoru = olasiliklar[max_index]
-
-        if guven_skoru < 0.60:
-            return "NÖTR (Düşük Güven)", 0
-
-        if tahmin in ["Olumlu", "Pozitif", "1"]:
-            return "MUTLU (POZİTİF)", 2
-        elif tahmin in ["Olumsuz", "Negatif", "-1"]:
-            return "KIZGIN (NEGATİF)", -2
-        else:
-            return "NÖTR", 0
+        return _duygu_etiketi(siniflar[max_index], olasiliklar[max_index])
 
     except Exception as e:
         print(f"Analiz Hatası: {e}")
         return "NÖTR", 0
 
 
+def duygu_analizi_toplu(mesajlar):
+    """Mesaj listesi/iteratörü için duygu_analizi_yap ile aynı (etiket, skor) çiftlerini sırayla döner.
+
+    Temizlik pandas string işlemleriyle, tahmin tek predict_proba çağrısıyla yapılır; konuşma
+    kayıtları ve şikayet listeleri gibi toplu raporlama işleri içindir.
+    """
+    global EGITILMIS_MODEL
+    temiz = metinleri_temizle(list(mesajlar))
+    if EGITILMIS_MODEL is None:
+        EGITILMIS_MODEL = modeli_egit()
+        if EGITILMIS_MODEL is None:
+            return [("NÖTR (Model Yok)", 0)] * len(temiz)
+
+    sonuclar = [("NÖTR (Yetersiz Veri)", 0)] * len(temiz)
+    gecerli = np.flatnonzero(temiz.str.len().values >= 3)
+    if len(gecerli) == 0: return sonuclar
+
+    try:
+        olasiliklar = EGITILMIS_MODEL.predict_proba(temiz.iloc[gecerli].tolist())
+        siniflar = EGITILMIS_MODEL.classes_
+        max_index = olasiliklar.argmax(axis=1)
+        guvenler = olasiliklar[np.arange(len(gecerli)), max_index]
+        for i, sinif_no, guven in zip(gecerli, max_index, guvenler):
+            sonuclar[i] = _duygu_etiketi(siniflar[sinif_no], guven)
+        return sonuclar
+
+    except Exception as e:
+        print(f"Toplu Analiz Hatası: {e}")
+        return [("NÖTR", 0)] * len(temiz)
+
+
 # --- ANA ÇALIŞTIRMA BLOĞU ---
 if __name__ == "__main__":
     print("Program Başlatılıyor...")
 
     # 1. Teslimat Süresi Testi
+    model = teslimat_modelini_yukle()
+    if model:
+        print(f"\n--- TESLİMAT MODELİ PERFORMANSI ---")
+        print(f"Ortalama Hata (MAE): {model['mae']:.2f} gün")
+        print(f"Başarı Skoru (R2)  : {model['r2']:.2f}")
+        print("-----------------------------------\n")
     sonuc = teslimat_suresi_hesapla(500, 10)
     print(f"Teslimat Sonucu: {sonuc}")
 
     # 2. Duygu Analizi Raporunu Görmek İçin Modeli Tetikliyoruz
     print("Duygu Analizi Modeli Eğitiliyor ve Raporlanıyor...")
-    duygu_analizi_yap("Test mesajı")
\ No newline at end of file
+    duygu_analizi_yap("Test mesajı")
+
+    # 3. Tekli ve toplu skorlama karşılaştırması
+    ornekler = _duygu_verisi_oku(os.path.join(BASE_DIR, DUYGU_CSV))['text'].tolist()
+    baslangic = time.perf_counter()
+    tekli = [duygu_analizi_yap(m) for m in ornekler]
+    tekli_sure = time.perf_counter() - baslangic
+    baslangic = time.perf_counter()
+    toplu = duygu_analizi_toplu(ornekler)
+    toplu_sure = time.perf_counter() - baslangic
+    print(f"\n{len(ornekler)} mesaj -> tekli: {tekli_sure:.2f} sn, toplu: {toplu_sure:.2f} sn "
+          f"({tekli_sure / toplu_sure:.0f}x), aynı sonuç: {tekli == toplu}")
@@ -0,0 +1,187 @@
+import os
+import re
+import shutil
+import threading
+import numpy as np
+from modules import ml_modulu
+from modules.ml_modulu import metin_temizle
+from modules.duygu_numpy import NumpyDuyguModeli, disa_aktar
+
+# Sık gelen, parametresi oturumdan okunabilen istekleri Gemini'ye gitmeden yönlendiren yerel sınıflandırıcı.
+# Güven eşiğin altındaysa veya niyet güvenli listede değilse karar Gemini'ye bırakılır.
+# Model duygu modeli gibi NumPy dizileri olarak dışa aktarılır; diziler varsa pandas/sklearn yüklenmez.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_DOSYA_ADI = 'niyet_ornekleri.csv'
+# Kısa ve çekimli Türkçe ifadeler için ("kargom", "kargomun") kelime yerine karakter n-gram kullanılır.
+# Değişirse parmak izi de değişir ve model yeniden eğitilir.
+NIYET_HIPERPARAMETRELERI = {
+    "analyzer": "char_wb",
+    "ngram_range": [2, 5],
+    "sublinear_tf": True,
+    "max_iter": 3000,
+    "C": 100,
+}
+
+NIYET_ESIGI = float(os.getenv("NIYET_ESIGI", "0.8"))
+YEREL_YONLENDIRME_ACIK = os.getenv("YEREL_YONLENDIRME", "1") == "1"
+
+# Sadece salt okunur ve parametresi oturumdaki takip numarasından gelen işlemler
+DOGRULAMA_GEREKEN_NIYETLER = {"kargo_sorgula", "tahmini_teslimat", "kargo_durum_destek", "fatura_bilgisi_gonderici"}
+# Parametresiz ama yönlendirme talimatında sadece doğrulanmış kullanıcıya sunulan işlemler (SENARYO 2)
+DOGRULANMIS_KULLANICI_NIYETLERI = {"hizli_teslimat_ovgu"}
+# Kimlik gerektirmeyen, parametresiz işlemler
+MISAFIR_NIYETLERI = {"kampanya_sorgula", "selamlama"}
+YEREL_NIYETLER = DOGRULAMA_GEREKEN_NIYETLER | DOGRULANMIS_KULLANICI_NIYETLERI | MISAFIR_NIYETLERI
+
+SELAMLAMA_CEVABI = "Hoş geldiniz. Size nasıl yardımcı olabilirim?"
+
+NIYET_MODELI = None
+_egitim_kilit = threading.Lock()
+
+
+def _ornekleri_oku():
+    import pandas as pd
+    csv_path = os.path.join(BASE_DIR, CSV_DOSYA_ADI)
+    if not os.path.exists(csv_path):
+        print(f"UYARI: {csv_path} bulunamadı.")
+        return None
+
+    df = pd.read_csv(csv_path, encoding='utf-8').dropna()
+    df['clean_text'] = df['text'].apply(metin_temizle)
+    return df[df['clean_text'] != ""]
+
+
+def _model_olustur():
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    hp = NIYET_HIPERPARAMETRELERI
+    vectorizer = TfidfVectorizer(analyzer=hp['analyzer'], ngram_range=tuple(hp['ngram_range']),
+                                 sublinear_tf=hp['sublinear_tf'])
+    clf = LogisticRegression(max_iter=hp['max_iter'], C=hp['C'])
+    return make_pipeline(vectorizer, clf)
+
+
+def numpy_klasoru():
+    """Eğitim verisi + hiperparametrelere ait NumPy dışa aktarım klasörü; veri dosyası yoksa None."""
+    csv_path = os.path.join(BASE_DIR, CSV_DOSYA_ADI)
+    if not os.path.exists(csv_path): return None
+    parmak = ml_modulu.parmak_izi(csv_path, NIYET_HIPERPARAMETRELERI, sklearn_surumu=False)
+    return ml_modulu.artifact_yolu("niyet_numpy", parmak)[:-len(".joblib")]
+
+
+def niyet_modelini_egit(yeniden=False):
+    """Niyet modelini NumPy dizilerinden yükler; yoksa (veya yeniden=True) eğitip dışa aktarır."""
+    global NIYET_MODELI
+    with _egitim_kilit:
+        if NIYET_MODELI is not None and not yeniden: return NIYET_MODELI
+        try:
+            klasor = numpy_klasoru()
+            if klasor is None:
+                print(f"UYARI: {os.path.join(BASE_DIR, CSV_DOSYA_ADI)} bulunamadı.")
+                return None
+            if yeniden:
+                shutil.rmtree(klasor, ignore_errors=True)
+            elif os.path.isdir(klasor):
+                NIYET_MODELI = NumpyDuyguModeli(klasor)
+                return NIYET_MODELI
+
+            df = _ornekleri_oku()
+            if df is None: return None
+
+            model = _model_olustur()
+            model.fit(df['clean_text'], df['label'])
+            try:
+                model = NumpyDuyguModeli(disa_aktar(model, klasor, {"ornek_sayisi": int(len(df))}))
+                print(f"Niyet modeli eğitildi ve kaydedildi: {klasor}")
+            except Exception as e:
+                # Salt okunur dosya sisteminde pipeline bellekte kullanılır
+                print(f"NumPy Dışa Aktarma Hatası, sklearn pipeline kullanılacak: {e}")
+            NIYET_MODELI = model
+            return model
+
+        except Exception as e:
+            print(f"Niyet Modeli Eğitme Hatası: {e}")
+            return None
+
+
+def niyet_tahmin_et(mesaj):
+    """(niyet, güven) döner. Model yoksa veya metin boşsa (None, 0.0)."""
+    model = NIYET_MODELI or niyet_modelini_egit()
+    temiz = metin_temizle(mesaj)
+    if model is None or not temiz: return None, 0.0
+
+    olasiliklar = model.predict_proba([temiz])[0]
+    indeks = int(np.argmax(olasiliklar))
+    return model.classes_[indeks], float(olasiliklar[indeks])
+
+
+def yerel_yonlendirme(mesaj, oturum):
+    """Gemini'nin döneceği biçimde bir yönlendirme kararı döner; emin olunamazsa None."""
+    if not YEREL_YONLENDIRME_ACIK or not mesaj: return None
+
+    # Sayı içeren mesajlar kimlik/parametre girişidir, ayrıştırma Gemini'de kalır
+    if re.search(r'\d{3,}', mesaj): return None
+    # Parça parça doğrulama sürerken bağlamı Gemini takip ediyor
+    if not oturum.get('verified') and oturum.get('pending_intent'): return None
+
+    niyet, guven = niyet_tahmin_et(mesaj)
+    if niyet not in YEREL_NIYETLER or guven < NIYET_ESIGI: return None
+
+    if niyet == "selamlama":
+        return {"type": "chat", "reply": SELAMLAMA_CEVABI, "guven": guven}
+
+    if niyet in DOGRULAMA_GEREKEN_NIYETLER:
+        if not oturum.get('verified') or not oturum.get('tracking_no'): return None
+        return {"type": "action", "function": niyet, "parameters": {"no": oturum['tracking_no']}, "guven": guven}
+
+    # Misafirde bu niyetleri Gemini de seçmez; karar rol kurallarıyla birlikte Gemini'ye bırakılır
+    if niyet in DOGRULANMIS_KULLANICI_NIYETLERI and not oturum.get('verified'): return None
+
+    return {"type": "action", "function": niyet, "parameters": {}, "guven": guven}
+
+
+def rapor_yazdir(esikler=(0.5, 0.6, 0.7, 0.8, 0.9)):
+    """Çapraz doğrulama ile eşik başına kapsama ve doğruluk raporu."""
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+    df = _ornekleri_oku()
+    if df is None: return
+
+    X, y = df['clean_text'], df['label'].values
+    kat_sayisi = min(5, int(df['label'].value_counts().min()))
+    kfold = StratifiedKFold(n_splits=kat_sayisi, shuffle=True, random_state=42)
+    olasiliklar = cross_val_predict(_model_olustur(), X, y, cv=kfold, method='predict_proba')
+    siniflar = np.array(sorted(set(y)))
+    tahmin = siniflar[olasiliklar.argmax(axis=1)]
+    guven = olasiliklar.max(axis=1)
+
+    print("\n--- NİYET YÖNLENDİRİCİ RAPORU ---")
+    print(f"Örnek: {len(df)}, Niyet: {len(siniflar)}, {kat_sayisi} katlı çapraz doğrulama")
+    print(f"Genel doğruluk (eşiksiz): {(tahmin == y).mean():.3f}")
+
+    yerel_gercek = np.isin(y, list(YEREL_NIYETLER))
+    print(f"\n{'Eşik':>6}{'Kapsama':>10}{'Doğruluk':>10}{'Yanlış yerel':>14}")
+    for esik in esikler:
+        yerel = np.isin(tahmin, list(YEREL_NIYETLER)) & (guven >= esik)
+        # Kapsama: Gemini'siz cevaplanan güvenli isteklerin oranı
+        kapsama = (yerel & yerel_gercek).sum() / max(1, yerel_gercek.sum())
+        dogruluk = (tahmin[yerel] == y[yerel]).mean() if yerel.any() else float('nan')
+        # Yanlış yerel: aslında Gemini'ye gitmesi gereken ama yerelde cevaplanan istekler
+        yanlis = (yerel & ~yerel_gercek).sum()
+        isaret = " <" if esik == NIYET_ESIGI else ""
+        print(f"{esik:>6.2f}{kapsama:>10.3f}{dogruluk:>10.3f}{yanlis:>14}{isaret}")
+
+    print("\nYerel niyet bazında (mevcut eşik):")
+    yerel = np.isin(tahmin, list(YEREL_NIYETLER)) & (guven >= NIYET_ESIGI)
+    for niyet in sorted(YEREL_NIYETLER):
+        maske = y == niyet
+        if not maske.any(): continue
+        yakalanan = (yerel & maske & (tahmin == y)).sum()
+        print(f"  {niyet:<26}{yakalanan:>3}/{maske.sum():<3}")
+    print("---------------------------------\n")
+
+
+if __name__ == "__main__":
+    rapor_yazdir()
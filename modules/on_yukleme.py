@@ -0,0 +1,62 @@
+import os
+from modules.database import kargo_bilgisi_getir, tahmini_teslimat_saati_getir, kargo_durum_destek
+from modules.metrikler import ON_YUKLEME_SAYACI
+from modules import paralel, niyet_yonlendirici
+
+# Doğrulanmış oturumda takip numarası zaten belli; turların çoğu da aşağıdaki salt okunur
+# sorgulardan birine gidiyor. Yönlendirme kararı (Gemini) beklenirken bunlardan en olası olanı
+# önden çalıştırılır, seçilen fonksiyon eşleşirse DB gecikmesi kritik yoldan çıkar. Paylaşılan
+# havuzu meşgul etmemek için tur başına tek sorgu başlatılır.
+
+ON_YUKLEME_ACIK = os.getenv("ON_YUKLEME", "1") == "1"
+# Yerel niyet tahmini bu güvenin altındaysa önceki turun fonksiyonu tahmin edilir
+ON_YUKLEME_ESIGI = float(os.getenv("ON_YUKLEME_ESIGI", "0.5"))
+# Sorgular hata durumunda istisna yerine bu öneklerle başlayan metin döner
+HATA_ONEKLERI = ("Sistem hatası", "Hata:")
+
+# yönlendirme fonksiyon adı -> (takip_no, oturum) ile çalışan sorgu
+SORGULAR = {
+    "kargo_sorgula": lambda no, oturum: kargo_bilgisi_getir(no, user_role=oturum.get('role')),
+    "tahmini_teslimat": lambda no, oturum: tahmini_teslimat_saati_getir(no),
+    "kargo_durum_destek": lambda no, oturum: kargo_durum_destek(no),
+}
+
+
+def tahmin_et(oturum, mesaj):
+    """Bu turda en olası sorgu: mesajın yerel niyet tahmini yeterince güvenliyse o, değilse önceki
+    turda seçilen fonksiyon. Tahmin SORGULAR dışındaysa None."""
+    # Model henüz yüklenmediyse eğitimi tur içinde beklememek için tahmin atlanır
+    if niyet_yonlendirici.NIYET_MODELI is not None and mesaj:
+        niyet, guven = niyet_yonlendirici.niyet_tahmin_et(mesaj)
+        if guven >= ON_YUKLEME_ESIGI:
+            return niyet if niyet in SORGULAR else None
+    onceki = oturum.get('last_function')
+    return onceki if onceki in SORGULAR else None
+
+
+class OnYukleme:
+    """Bir tur için başlatılan ön yükleme. Oturum doğrulanmamışsa hiçbir şey başlatmaz."""
+
+    def __init__(self, oturum, mesaj=None):
+        self.no = oturum.get('tracking_no')
+        self.isler = {}
+        if ON_YUKLEME_ACIK and oturum.get('verified') and self.no:
+            ad = tahmin_et(oturum, mesaj)
+            if ad is not None:
+                self.isler = {ad: paralel.baslat("on_yukleme", SORGULAR[ad], self.no, dict(oturum))}
+
+    def sonuclandir(self, func):
+        """Yönlendirme kararı gelince bir kez çağrılır; isabet oranı için sayılır."""
+        if self.isler:
+            ON_YUKLEME_SAYACI.artir(sonuc="isabet" if func in self.isler else "iska")
+
+    def al(self, func, no, hesapla):
+        """Ön yüklenmiş sonuç aynı fonksiyon ve numara içinse onu, değilse hesapla() sonucunu döner."""
+        is_ = self.isler.get(func)
+        if is_ is not None and str(no) == str(self.no):
+            sonuc = paralel.sonuc_al(is_, asama="on_yukleme")
+            if sonuc is not None and not str(sonuc).startswith(HATA_ONEKLERI): return sonuc
+        if is_ is not None:
+            # Gemini başka bir numara verdi ya da sorgu hata aldı; sonuç normal yoldan hesaplanır
+            ON_YUKLEME_SAYACI.artir(sonuc="gecersiz")
+        return hesapla()
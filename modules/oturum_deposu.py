@@ -0,0 +1,226 @@
+import os
+import copy
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OTURUM_DB_FILE = os.getenv("OTURUM_DB", os.path.join(BASE_DIR, 'oturumlar.db'))
+
+# --- AYARLAR ---
+OTURUM_TTL_SN = int(os.getenv("OTURUM_TTL_DK", "60")) * 60
+OTURUM_MAKS_SAYI = int(os.getenv("OTURUM_MAKS_SAYI", "5000"))
+GECMIS_MAKS_SATIR = 40
+GUNCELLEME_DENEME_SAYISI = 5
+
+# getir'in döndüğü kopyadaki kayıt sürümü; kaydet sadece bu sürüm hâlâ güncelse yazar (compare-and-set)
+SURUM_ALANI = '_surum'
+
+
+def varsayilan_oturum():
+    return {
+        'history': [],
+        'summary': "",
+        'verified': False,
+        'tracking_no': None,
+        'role': None,
+        'user_name': None,
+        'user_id': None,
+        'pending_intent': None,
+        'last_function': None
+    }
+
+
+def _oturumu_duzenle(oturum):
+    for k, v in varsayilan_oturum().items():
+        if k not in oturum: oturum[k] = v
+    # Geçmiş sınırsız büyümesin; eski satırlar normalde konusma_hafizasi özetine katlanır, bu son güvence
+    oturum['history'] = oturum['history'][-GECMIS_MAKS_SATIR:]
+    return oturum
+
+
+def _saklanacak(oturum):
+    return {k: v for k, v in oturum.items() if k != SURUM_ALANI}
+
+
+class OturumDeposu:
+    """Oturum deposu arayüzü. getir her zaman kullanılabilir bir kopya döner, kaydet ile geri yazılır.
+
+    Kopya okunduğu sürümü taşır (yeni oturumda 0); kaydet araya başka bir yazma girdiyse (ör. arka plan
+    özeti) yazmaz ve False döner. Oku-değiştir-yaz işlemleri guncelle veya tur_kaydet ile yapılır."""
+
+    def getir(self, session_id):
+        raise NotImplementedError
+
+    def kaydet(self, session_id, oturum):
+        raise NotImplementedError
+
+    def sil(self, session_id):
+        raise NotImplementedError
+
+    def guncelle(self, session_id, degistir):
+        """Güncel kaydı okuyup degistir(oturum) uygular ve yazar; sürüm çakışırsa baştan dener.
+        degistir False dönerse yazmadan çıkar. Yazılan oturumu, yazılmadıysa None döner."""
+        for _ in range(GUNCELLEME_DENEME_SAYISI):
+            oturum = self.getir(session_id)
+            if degistir(oturum) is False: return None
+            if self.kaydet(session_id, oturum): return oturum
+        print(f"Oturum Yazma Çakışması: {session_id} {GUNCELLEME_DENEME_SAYISI} denemede yazılamadı.")
+        return None
+
+    def tur_kaydet(self, session_id, oturum, yeni_satirlar=()):
+        """Turun kopyasını yazar. Tur sürerken kayıt değiştiyse turun alanları ve eklediği geçmiş satırları
+        güncel kaydın üstüne uygulanır; arada katlanan özet kaybolmaz. oturum yazılan hâle getirilir."""
+        if self.kaydet(session_id, oturum): return True
+
+        def uygula(guncel):
+            guncel.update({k: v for k, v in oturum.items() if k not in ('history', 'summary', SURUM_ALANI)})
+            guncel['history'].extend(yeni_satirlar)
+
+        yazilan = self.guncelle(session_id, uygula)
+        if yazilan is None: return False
+        oturum.clear()
+        oturum.update(yazilan)
+        return True
+
+
+class BellekOturumDeposu(OturumDeposu):
+    """Tek işçiye özel, LRU + TTL ile sınırlandırılmış bellek içi depo."""
+
+    def __init__(self, maks_sayi=OTURUM_MAKS_SAYI, ttl_sn=OTURUM_TTL_SN):
+        self.maks_sayi = maks_sayi
+        self.ttl_sn = ttl_sn
+        self._oturumlar = OrderedDict()
+        self._kilit = threading.Lock()
+
+    def _suresi_dolanlari_sil(self, simdi):
+        while self._oturumlar:
+            sid, (son_erisim, _) = next(iter(self._oturumlar.items()))
+            if simdi - son_erisim <= self.ttl_sn: break
+            del self._oturumlar[sid]
+
+    def getir(self, session_id):
+        simdi = time.time()
+        with self._kilit:
+            self._suresi_dolanlari_sil(simdi)
+            kayit = self._oturumlar.get(session_id)
+            if kayit is None:
+                return varsayilan_oturum()
+            self._oturumlar[session_id] = (simdi, kayit[1])
+            self._oturumlar.move_to_end(session_id)
+            return copy.deepcopy(kayit[1])
+
+    def kaydet(self, session_id, oturum):
+        _oturumu_duzenle(oturum)
+        simdi = time.time()
+        with self._kilit:
+            kayit = self._oturumlar.get(session_id)
+            surum = kayit[1][SURUM_ALANI] if kayit else 0
+            if oturum.get(SURUM_ALANI, 0) != surum: return False
+
+            oturum[SURUM_ALANI] = surum + 1
+            self._oturumlar[session_id] = (simdi, copy.deepcopy(oturum))
+            self._oturumlar.move_to_end(session_id)
+            self._suresi_dolanlari_sil(simdi)
+            while len(self._oturumlar) > self.maks_sayi:
+                self._oturumlar.popitem(last=False)
+        return True
+
+    def sil(self, session_id):
+        with self._kilit:
+            self._oturumlar.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._oturumlar)
+
+
+class SqliteOturumDeposu(OturumDeposu):
+    """Yeniden başlatmalarda kaybolmayan ve işçiler arasında paylaşılan SQLite (WAL) deposu."""
+
+    TEMIZLIK_ARALIGI = 200
+
+    def __init__(self, db_file=OTURUM_DB_FILE, ttl_sn=OTURUM_TTL_SN):
+        self.db_file = db_file
+        self.ttl_sn = ttl_sn
+        self._yerel = threading.local()
+        self._yazma_sayaci = 0
+        self._sayac_kilit = threading.Lock()
+
+        conn = self._baglanti()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''CREATE TABLE IF NOT EXISTS oturumlar (
+            session_id TEXT PRIMARY KEY,
+            veri TEXT,
+            son_erisim REAL,
+            surum INTEGER NOT NULL DEFAULT 0
+        )''')
+        # Sürüm sütunundan önce oluşturulmuş veritabanları
+        if "surum" not in [satir[1] for satir in conn.execute("PRAGMA table_info(oturumlar)")]:
+            conn.execute("ALTER TABLE oturumlar ADD COLUMN surum INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_oturum_erisim ON oturumlar(son_erisim)")
+        conn.commit()
+
+    def _baglanti(self):
+        # sqlite3 bağlantıları thread'ler arasında paylaşılamaz, her thread kendi bağlantısını açar
+        conn = getattr(self._yerel, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._yerel.conn = conn
+        return conn
+
+    def getir(self, session_id):
+        conn = self._baglanti()
+        row = conn.execute("SELECT veri, son_erisim, surum FROM oturumlar WHERE session_id = ?",
+                           (session_id,)).fetchone()
+        if not row:
+            return varsayilan_oturum()
+
+        # Süresi dolmuş satır da sürümünü verir; üzerine yazılan yeni oturum çakışma sayılmaz
+        oturum = varsayilan_oturum()
+        if row[1] > time.time() - self.ttl_sn:
+            try:
+                oturum = _oturumu_duzenle(json.loads(row[0]))
+            except ValueError:
+                pass
+        oturum[SURUM_ALANI] = row[2]
+        return oturum
+
+    def kaydet(self, session_id, oturum):
+        veri = json.dumps(_saklanacak(_oturumu_duzenle(oturum)), ensure_ascii=False)
+        surum = oturum.get(SURUM_ALANI, 0)
+        conn = self._baglanti()
+        if surum == 0:
+            cur = conn.execute("INSERT INTO oturumlar (session_id, veri, son_erisim, surum) VALUES (?, ?, ?, 1) "
+                               "ON CONFLICT(session_id) DO NOTHING", (session_id, veri, time.time()))
+        else:
+            cur = conn.execute("UPDATE oturumlar SET veri = ?, son_erisim = ?, surum = surum + 1 "
+                               "WHERE session_id = ? AND surum = ?", (veri, time.time(), session_id, surum))
+        conn.commit()
+        if cur.rowcount == 0: return False
+        oturum[SURUM_ALANI] = surum + 1
+
+        with self._sayac_kilit:
+            self._yazma_sayaci += 1
+            temizlik = self._yazma_sayaci % self.TEMIZLIK_ARALIGI == 0
+        if temizlik: self.suresi_dolanlari_sil()
+        return True
+
+    def sil(self, session_id):
+        conn = self._baglanti()
+        conn.execute("DELETE FROM oturumlar WHERE session_id = ?", (session_id,))
+        conn.commit()
+
+    def suresi_dolanlari_sil(self):
+        conn = self._baglanti()
+        conn.execute("DELETE FROM oturumlar WHERE son_erisim <= ?", (time.time() - self.ttl_sn,))
+        conn.commit()
+
+
+def depo_olustur(tur=None):
+    tur = (tur or os.getenv("OTURUM_DEPOSU", "sqlite")).lower()
+    if tur == "bellek":
+        return BellekOturumDeposu()
+    return SqliteOturumDeposu()
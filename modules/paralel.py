@@ -0,0 +1,51 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from modules.metrikler import ASAMA_SURESI, Sayac, hata_kaydet
+
+# Bir sohbet turundaki birbirinden bağımsız adımların (duygu analizi, tarife okuma, mesafe,
+# ön yükleme vb.) aynı anda yürüdüğü ortak havuz. Tur süresi adımların toplamı yerine
+# en uzun tekil adıma yaklaşır. Havuzdaki işler başka bir havuz işini beklememeli.
+
+ADIM_ISCI_SAYISI = int(os.getenv("ADIM_ISCI_SAYISI", "16"))
+ONCELIKLI_ISCI_SAYISI = int(os.getenv("ONCELIKLI_ISCI_SAYISI", "4"))
+
+_havuz = ThreadPoolExecutor(max_workers=ADIM_ISCI_SAYISI, thread_name_prefix="adim")
+# Turun başında kısa süreyle beklenen işler (duygu analizi) uzun adımların (mesafe, ön yükleme) arkasında
+# sıraya girmesin diye ayrı havuzda yürür
+_oncelikli_havuz = ThreadPoolExecutor(max_workers=ONCELIKLI_ISCI_SAYISI, thread_name_prefix="oncelikli")
+
+ADIM_ZAMAN_ASIMI = Sayac("paralel_adim_zaman_asimi_toplam",
+                         "Sonucu beklenen süre içinde gelmediği için varsayılan değerle devam edilen adımlar.",
+                         ("asama",))
+
+
+def _olculu(asama, fonksiyon, args, kwargs):
+    baslangic = time.perf_counter()
+    try:
+        return fonksiyon(*args, **kwargs)
+    finally:
+        ASAMA_SURESI.gozlemle(time.perf_counter() - baslangic, asama=asama)
+
+
+def baslat(asama, fonksiyon, *args, **kwargs):
+    """Adımı havuzda başlatır ve Future döner. Süresi ASAMA_SURESI'ne asama etiketiyle yazılır."""
+    return _havuz.submit(_olculu, asama, fonksiyon, args, kwargs)
+
+
+def oncelikli_baslat(asama, fonksiyon, *args, **kwargs):
+    """baslat gibi, ama ortak havuzu değil öncelikli işlere ayrılmış havuzu kullanır."""
+    return _oncelikli_havuz.submit(_olculu, asama, fonksiyon, args, kwargs)
+
+
+def sonuc_al(is_, varsayilan=None, zaman_asimi=None, asama="adim"):
+    """Adımın sonucunu bekler. Süre dolarsa veya adım hata verirse varsayılan değer döner."""
+    try:
+        return is_.result(timeout=zaman_asimi)
+    except FutureTimeoutError:
+        ADIM_ZAMAN_ASIMI.artir(asama=asama)
+        return varsayilan
+    except Exception as e:
+        print(f"Paralel Adım Hatası ({asama}): {e}")
+        hata_kaydet(f"paralel_{asama}")
+        return varsayilan
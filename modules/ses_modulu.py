@@ -0,0 +1,339 @@
+import os
+import re
+import asyncio
+import uuid
+import time
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from gtts import gTTS
+from modules.metrikler import ASAMA_SURESI, Sayac, Gosterge, hata_kaydet
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIO_FOLDER = os.path.join(BASE_DIR, 'static')
+CACHE_FOLDER = os.path.join(AUDIO_FOLDER, 'tts_cache')
+
+# --- HAVUZ AYARLARI ---
+TTS_ISCI_SAYISI = int(os.getenv("TTS_ISCI_SAYISI", "4"))
+TTS_KUYRUK_LIMITI = int(os.getenv("TTS_KUYRUK_LIMITI", "64"))
+TTS_IS_OMRU_SN = 600
+
+# --- ÖNBELLEK AYARLARI ---
+TTS_ONBELLEK_MAKS_BAYT = int(os.getenv("TTS_ONBELLEK_MAKS_MB", "200")) * 1024 * 1024
+TTS_ONBELLEK_MAKS_YAS_SN = int(os.getenv("TTS_ONBELLEK_MAKS_GUN", "30")) * 24 * 3600
+TTS_ONBELLEK_KIRPMA_ARALIGI_SN = int(os.getenv("TTS_ONBELLEK_KIRPMA_ARALIGI_SN", "600"))
+# Son bu kadar saniyede verilen dosyalar silinmez; istemci URL'yi aldıktan sonra indirmeye yetişsin
+TTS_ONBELLEK_KORUMA_SN = int(os.getenv("TTS_ONBELLEK_KORUMA_SN", "120"))
+
+if not os.path.exists(CACHE_FOLDER): os.makedirs(CACHE_FOLDER)
+
+_havuz = ThreadPoolExecutor(max_workers=TTS_ISCI_SAYISI, thread_name_prefix="tts")
+_kuyruk_siniri = threading.BoundedSemaphore(TTS_KUYRUK_LIMITI)
+_isler = {}
+_isler_kilit = threading.Lock()
+_bekleyen_is = 0
+
+
+# anahtar -> (boyut, olusturma_zamani, son_erisim); sıralama en eski erişimden en yeniye.
+# Klasör işçiler arasında ortaktır: erişim dosyanın atime'ına yazılır ve indeks periyodik olarak diskten
+# yeniden kurulur, böylece bayt sınırı her süreç için ayrı ayrı değil klasörün tamamı için uygulanır.
+_onbellek = OrderedDict()
+_onbellek_kilit = threading.Lock()
+_onbellek_toplam_bayt = 0
+# anahtar -> sentezi süren Future; aynı metin için eşzamanlı ıskalar tek gTTS çağrısını bekler
+_suren_sentezler = {}
+_onbellek_sayac = Sayac("tts_onbellek_toplam", "TTS ses önbelleği olayları (hit, miss, bekleme, eviction).", ("sonuc",))
+Gosterge("tts_onbellek_bayt", "TTS ses önbelleğinin diskteki toplam boyutu.", fonksiyon=lambda: _onbellek_toplam_bayt)
+Gosterge("tts_kuyruktaki_is", "Sentez bekleyen veya süren TTS işi sayısı.",
+         fonksiyon=lambda: _bekleyen_is)
+
+
+def metni_normallestir(text):
+    text = unicodedata.normalize('NFC', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def onbellek_anahtari(text, lang='tr'):
+    return hashlib.sha256(f"{lang}\n{metni_normallestir(text)}".encode('utf-8')).hexdigest()
+
+
+def _onbellek_yolu(anahtar):
+    # 256x256 alt klasöre dağıt, tek klasörde binlerce dosya birikmesin
+    return os.path.join(CACHE_FOLDER, anahtar[:2], anahtar[2:4], f"{anahtar}.mp3")
+
+
+def _onbellek_url(anahtar):
+    return f"/static/tts_cache/{anahtar[:2]}/{anahtar[2:4]}/{anahtar}.mp3"
+
+
+def _diski_tara():
+    """İndeksi klasördeki dosyalardan son erişim sırasıyla yeniden kurar (diğer işçilerin yazdıkları dahil)."""
+    global _onbellek, _onbellek_toplam_bayt
+    kayitlar = []
+    for kok, _, dosyalar in os.walk(CACHE_FOLDER):
+        for dosya in dosyalar:
+            if not dosya.endswith(".mp3"): continue
+            try:
+                st = os.stat(os.path.join(kok, dosya))
+            except OSError:
+                continue
+            kayitlar.append((dosya[:-4], st.st_size, st.st_mtime, max(st.st_atime, st.st_mtime)))
+
+    with _onbellek_kilit:
+        yeni = {}
+        for anahtar, boyut, olusturma, erisim in kayitlar:
+            # Bu süreçteki erişim diske henüz yansımamış olabilir
+            eski = _onbellek.get(anahtar)
+            yeni[anahtar] = (boyut, olusturma, max(erisim, eski[2]) if eski else erisim)
+        _onbellek = OrderedDict(sorted(yeni.items(), key=lambda k: k[1][2]))
+        _onbellek_toplam_bayt = sum(k[0] for k in _onbellek.values())
+
+
+def _onbellegi_kirp():
+    """Yaş sınırını ve toplam boyut sınırını aşan kayıtları LRU sırasıyla siler, silinen anahtarları döner."""
+    global _onbellek_toplam_bayt
+    simdi = time.time()
+    yas_siniri = simdi - TTS_ONBELLEK_MAKS_YAS_SN
+    koruma_siniri = simdi - TTS_ONBELLEK_KORUMA_SN
+
+    # Silme kilit altında yapılır: indeksten düşen dosya, arada aynı anahtarla yeniden üretilmiş
+    # (veya onbellekten_getir ile verilmiş) haliyle karışmasın
+    with _onbellek_kilit:
+        silinecekler = [a for a, (_, olusturma, erisim) in _onbellek.items()
+                        if olusturma < yas_siniri and erisim < koruma_siniri]
+        for anahtar in silinecekler:
+            _onbellek_toplam_bayt -= _onbellek.pop(anahtar)[0]
+
+        while _onbellek and _onbellek_toplam_bayt > TTS_ONBELLEK_MAKS_BAYT:
+            anahtar, (boyut, _, erisim) = next(iter(_onbellek.items()))
+            # En eski kayıt bile yeni verilmişse kalanlar da öyledir; sınır geçici olarak aşılır
+            if erisim >= koruma_siniri: break
+            del _onbellek[anahtar]
+            _onbellek_toplam_bayt -= boyut
+            silinecekler.append(anahtar)
+
+        for anahtar in silinecekler:
+            try:
+                os.remove(_onbellek_yolu(anahtar))
+            except OSError:
+                pass
+        if silinecekler: _onbellek_sayac.artir(len(silinecekler), sonuc="eviction")
+    return silinecekler
+
+
+def _periyodik_kirp():
+    # Yaş sınırı yeni ıska olmasa da işlesin, diğer işçilerin dosyaları da sayılsın diye
+    # indeks düzenli aralıklarla diskten yeniden kurulup kırpılır
+    while True:
+        time.sleep(TTS_ONBELLEK_KIRPMA_ARALIGI_SN)
+        try:
+            _diski_tara()
+            _onbellegi_kirp()
+        except Exception as e:
+            print(f"Ses Önbelleği Kırpma Hatası: {e}")
+
+
+def onbellek_istatistikleri():
+    with _onbellek_kilit:
+        return {
+            "hit": _onbellek_sayac.deger(sonuc="hit"),
+            "miss": _onbellek_sayac.deger(sonuc="miss"),
+            "eviction": _onbellek_sayac.deger(sonuc="eviction"),
+            "bekleme": _onbellek_sayac.deger(sonuc="bekleme"),
+            "dosya_sayisi": len(_onbellek),
+            "toplam_bayt": _onbellek_toplam_bayt,
+        }
+
+
+def onbellekten_getir(text, lang='tr'):
+    """Metnin sesi diskte hazırsa URL'sini döner, yoksa None (sentez yapmaz)."""
+    global _onbellek_toplam_bayt
+    if not text: return None
+    anahtar = onbellek_anahtari(text, lang)
+    yol = _onbellek_yolu(anahtar)
+    simdi = time.time()
+
+    with _onbellek_kilit:
+        try:
+            # Erişim atime'a yazılır (mtime oluşturma zamanı olarak kalır); diğer işçilerin kırpması da görür
+            st = os.stat(yol)
+            os.utime(yol, (simdi, st.st_mtime))
+        except OSError:
+            # Başka bir işçi silmiş ya da hiç üretilmemiş
+            kayit = _onbellek.pop(anahtar, None)
+            if kayit: _onbellek_toplam_bayt -= kayit[0]
+            return None
+
+        kayit = _onbellek.get(anahtar)
+        if kayit is None:
+            # Başka bir işçinin ürettiği dosya indekse katılır
+            _onbellek_toplam_bayt += st.st_size
+            kayit = (st.st_size, st.st_mtime, simdi)
+        _onbellek[anahtar] = (kayit[0], kayit[1], simdi)
+        _onbellek.move_to_end(anahtar)
+        _onbellek_sayac.artir(sonuc="hit")
+        return _onbellek_url(anahtar)
+
+
+def metni_sese_cevir(text, lang='tr'):
+    with ASAMA_SURESI.olc(asama="tts"):
+        return _metni_sese_cevir(text, lang)
+
+
+def _metni_sese_cevir(text, lang):
+    try:
+        if not text or not metni_normallestir(text): return None
+
+        hazir = onbellekten_getir(text, lang)
+        if hazir: return hazir
+
+        anahtar = onbellek_anahtari(text, lang)
+        with _onbellek_kilit:
+            suren = _suren_sentezler.get(anahtar)
+            sahibi = suren is None
+            if sahibi: suren = _suren_sentezler[anahtar] = Future()
+
+        if not sahibi:
+            _onbellek_sayac.artir(sonuc="bekleme")
+            return suren.result()
+
+        _onbellek_sayac.artir(sonuc="miss")
+        url = None
+        try:
+            url = _sentezle(text, lang, anahtar)
+        finally:
+            with _onbellek_kilit:
+                _suren_sentezler.pop(anahtar, None)
+            suren.set_result(url)
+
+        _onbellegi_kirp()
+        return url
+    except Exception as e:
+        print(f"Ses Hatası: {e}")
+        hata_kaydet("tts")
+        return None
+
+
+def _sentezle(text, lang, anahtar):
+    global _onbellek_toplam_bayt
+    yol = _onbellek_yolu(anahtar)
+    os.makedirs(os.path.dirname(yol), exist_ok=True)
+    gecici_yol = f"{yol}.{uuid.uuid4().hex}.tmp"
+    try:
+        gTTS(text=metni_normallestir(text), lang=lang).save(gecici_yol)
+        os.replace(gecici_yol, yol)
+    finally:
+        if os.path.exists(gecici_yol): os.remove(gecici_yol)
+
+    with _onbellek_kilit:
+        eski = _onbellek.pop(anahtar, None)
+        if eski: _onbellek_toplam_bayt -= eski[0]
+        boyut = os.path.getsize(yol)
+        simdi = time.time()
+        _onbellek[anahtar] = (boyut, simdi, simdi)
+        _onbellek_toplam_bayt += boyut
+    return _onbellek_url(anahtar)
+
+
+def _eski_isleri_temizle():
+    sinir = time.time() - TTS_IS_OMRU_SN
+    with _isler_kilit:
+        silinecekler = [jid for jid, job in _isler.items() if job['bitis'] and job['bitis'] < sinir]
+        for jid in silinecekler:
+            del _isler[jid]
+
+
+def _isi_calistir(job_id, text):
+    global _bekleyen_is
+    try:
+        audio = metni_sese_cevir(text)
+    finally:
+        _kuyruk_siniri.release()
+
+    with _isler_kilit:
+        _bekleyen_is -= 1
+        job = _isler.get(job_id)
+        if job is None: return
+        job['audio'] = audio
+        job['status'] = "ready" if audio else "error"
+        job['bitis'] = time.time()
+    # Durum yazıldıktan sonra bekleyen long-poll'lar uyandırılır
+    job['gelecek'].set_result(None)
+
+
+def ses_isi_baslat(text):
+    """Metni TTS kuyruğuna ekler ve iş kimliğini döner. Kuyruk doluysa None döner."""
+    global _bekleyen_is
+    if not text: return None
+
+    _eski_isleri_temizle()
+
+    # Önbellekte olan cevaplar kuyruğa girmeden hazır olarak döner
+    hazir = onbellekten_getir(text)
+    if hazir:
+        job_id = uuid.uuid4().hex
+        gelecek = Future()
+        gelecek.set_result(None)
+        with _isler_kilit:
+            _isler[job_id] = {'status': "ready", 'audio': hazir, 'bitis': time.time(), 'gelecek': gelecek}
+        return job_id
+
+    if not _kuyruk_siniri.acquire(blocking=False):
+        print("Ses Kuyruğu Dolu: TTS işi reddedildi.")
+        hata_kaydet("tts_kuyruk_dolu")
+        return None
+
+    job_id = uuid.uuid4().hex
+    # İşin bitişini bildiren Future kayıtla birlikte oluşur; havuza gönderilmeden sorgulansa bile beklenebilir
+    with _isler_kilit:
+        _isler[job_id] = {'status': "pending", 'audio': None, 'bitis': None, 'gelecek': Future()}
+        _bekleyen_is += 1
+
+    try:
+        _havuz.submit(_isi_calistir, job_id, text)
+    except Exception as e:
+        _kuyruk_siniri.release()
+        with _isler_kilit:
+            job = _isler.pop(job_id)
+            _bekleyen_is -= 1
+        job['gelecek'].set_result(None)
+        print(f"Ses Kuyruğu Hatası: {e}")
+        return None
+
+    return job_id
+
+
+def ses_isi_durumu(job_id, bekle=0):
+    """İşin durumunu döner. bekle > 0 ise iş bitene kadar en fazla o kadar saniye bekler (long-poll)."""
+    with _isler_kilit:
+        job = _isler.get(job_id)
+
+    if job is None:
+        return {"job_id": job_id, "status": "unknown", "audio": None}
+
+    if bekle > 0 and job['status'] == "pending":
+        wait([job['gelecek']], timeout=bekle)
+
+    return {"job_id": job_id, "status": job['status'], "audio": job['audio']}
+
+
+async def ses_isi_durumu_async(job_id, bekle=0):
+    """ses_isi_durumu'nun asyncio sürümü: beklerken thread tutmaz."""
+    with _isler_kilit:
+        job = _isler.get(job_id)
+
+    if job is None:
+        return {"job_id": job_id, "status": "unknown", "audio": None}
+
+    if bekle > 0 and job['status'] == "pending":
+        await asyncio.wait([asyncio.wrap_future(job['gelecek'])], timeout=bekle)
+
+    return {"job_id": job_id, "status": job['status'], "audio": job['audio']}
+
+
+_diski_tara()
+_onbellegi_kirp()
+if TTS_ONBELLEK_KIRPMA_ARALIGI_SN > 0:
+    threading.Thread(target=_periyodik_kirp, name="tts-onbellek-kirp", daemon=True).start()
@@ -0,0 +1,242 @@
+import os
+import re
+import threading
+import numpy as np
+from modules.cografya import yer_adi_normallestir
+
+# Yurt dışı gönderiler için kural tabanlı gümrük vergisi + KDV hesabı. Oranlar ve muafiyet
+# sınırları veri dosyalarındadır; aynı girdi her zaman aynı sonucu verir. Tabloda olmayan
+# ülkeler için çağıran taraf Gemini'ye (vergi_hesapla_ai) düşer.
+# Tablolar pandas ile tutulur; pandas modül açılışında değil, ilk vergi sorusunda yüklenir.
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ULKE_DOSYASI = os.path.join(BASE_DIR, 'ulke_vergi_oranlari.csv')
+KATEGORI_DOSYASI = os.path.join(BASE_DIR, 'kategori_vergi_oranlari.csv')
+
+# 1 birim = ? TL. Sadece müşterinin söylediği para birimi hedef ülkeninkinden farklıysa çevrim için
+# kullanılan referans kurlar; tahmini cevap içindir, günlük kur takibi yapılmaz.
+REFERANS_KURLAR_TRY = {
+    "TRY": 1.0, "EUR": 48.0, "USD": 41.5, "GBP": 55.5, "CHF": 51.5,
+    "PLN": 11.3, "CAD": 29.8, "AUD": 27.2, "JPY": 0.28,
+}
+PARA_SEMBOLLERI = {"EUR": "€", "USD": "$", "GBP": "£", "TRY": "TL", "CHF": "CHF", "PLN": "zł",
+                   "CAD": "CAD", "AUD": "AUD", "JPY": "¥"}
+
+# Fiyat metninde geçen para birimi ifadeleri (normalize edilmiş halleriyle)
+PARA_IFADELERI = [
+    ("EUR", r"€|\beuro?\b|\beur\b|\bavro\b"),
+    ("USD", r"\$|\bdolar\b|\busd\b|\bdollar\b"),
+    ("GBP", r"£|\bsterlin\b|\bpound\b|\bgbp\b"),
+    ("CHF", r"\bfrank\b|\bchf\b"),
+    ("PLN", r"\bzloti\b|\bpln\b"),
+    ("JPY", r"¥|\byen\b|\bjpy\b"),
+    ("CAD", r"\bcad\b"),
+    ("AUD", r"\baud\b"),
+    ("TRY", r"\btl\b|\blira\b|\btry\b|₺"),
+]
+
+# Serbest metindeki ürün adını tablo kategorisine eşler; eşleşmeyen ürünler 'diger' (ülke varsayılanı)
+KATEGORI_ANAHTARLARI = {
+    "elektronik": ["laptop", "bilgisayar", "telefon", "tablet", "kulaklik", "elektronik", "kamera", "akilli saat",
+                   "televizyon", "konsol", "playstation", "iphone", "notebook"],
+    "giyim": ["giyim", "tisort", "gomlek", "elbise", "mont", "ceket", "pantolon", "kazak", "etek", "kiyafet",
+              "tekstil", "hirka"],
+    "ayakkabi": ["ayakkabi", "bot", "cizme", "terlik", "sneaker"],
+    "kozmetik": ["kozmetik", "parfum", "krem", "makyaj", "ruj", "sampuan"],
+    "kitap": ["kitap", "dergi", "roman"],
+    "oyuncak": ["oyuncak", "lego", "bebek oyuncak", "puzzle"],
+    "mucevher": ["mucevher", "taki", "kolye", "yuzuk", "bileklik", "altin", "gumus"],
+    "gida": ["gida", "yiyecek", "lokum", "cay", "kahve", "baharat", "findik", "yemek"],
+}
+
+_yukleme_kilit = threading.Lock()
+_ulkeler = None      # ulke_kodu -> satır (DataFrame, index ulke_kodu)
+_ad_indeksi = None   # normalize ad -> ulke_kodu
+# ISO kodları ve iki harfli kısaltmalar ("de", "uk") cümle içinde bağlaç/ek olarak geçer;
+# sadece girdinin tamamıysa eşleşir
+_kod_indeksi = None
+_kategoriler = None  # ulke_kodu, kategori, gumruk_orani, kdv_orani (boş kdv = ülkenin genel oranı)
+
+
+def _tablolari_yukle():
+    global _ulkeler, _ad_indeksi, _kod_indeksi, _kategoriler
+    with _yukleme_kilit:
+        if _ulkeler is not None: return
+        import pandas as pd
+
+        ulkeler = pd.read_csv(ULKE_DOSYASI, encoding='utf-8').set_index('ulke_kodu')
+        ad_indeksi, kod_indeksi = {}, {}
+        for kod, row in ulkeler.iterrows():
+            kod_indeksi[yer_adi_normallestir(kod)] = kod
+            for ad in row['adlar'].split('|') + [row['ulke']]:
+                normal = yer_adi_normallestir(ad)
+                (kod_indeksi if len(normal) <= 2 else ad_indeksi)[normal] = kod
+
+        kategoriler = pd.read_csv(KATEGORI_DOSYASI, encoding='utf-8')
+        _kategoriler = kategoriler
+        _ad_indeksi = ad_indeksi
+        _kod_indeksi = kod_indeksi
+        _ulkeler = ulkeler
+
+
+def ulke_coz(metin):
+    """Serbest metindeki ülke adını ('Almanya'ya', 'ABD', 'germany') ülke koduna çevirir; yoksa None."""
+    _tablolari_yukle()
+    normal = yer_adi_normallestir(metin)
+    if not normal: return None
+    if normal in _ad_indeksi: return _ad_indeksi[normal]
+    if normal in _kod_indeksi: return _kod_indeksi[normal]
+    # Ek almış halleri ("almanyaya") en uzun ön ek eşleşmesiyle yakala
+    adaylar = [ad for ad in _ad_indeksi if len(ad) >= 4 and normal.startswith(ad)]
+    if adaylar: return _ad_indeksi[max(adaylar, key=len)]
+    for kelime in normal.split():
+        if kelime in _ad_indeksi: return _ad_indeksi[kelime]
+        adaylar = [ad for ad in _ad_indeksi if len(ad) >= 4 and " " not in ad and kelime.startswith(ad)]
+        if adaylar: return _ad_indeksi[max(adaylar, key=len)]
+    return None
+
+
+def kategori_coz(urun):
+    normal = yer_adi_normallestir(urun)
+    kelimeler = normal.split()
+    for kategori, anahtarlar in KATEGORI_ANAHTARLARI.items():
+        # Çekimli halleri yakalamak için kelime başı eşleşmesi ("telefonu"), "robot" -> "bot" gibi iç eşleşme sayılmaz
+        for anahtar in anahtarlar:
+            if (" " in anahtar and anahtar in normal) or any(k.startswith(anahtar) for k in kelimeler):
+                return kategori
+    return "diger"
+
+
+def fiyat_coz(fiyat):
+    """'1.000 Euro', '249,90 $', 500 -> (tutar, para birimi veya None). Sayı yoksa (None, None)."""
+    if fiyat is None: return None, None
+    if isinstance(fiyat, (int, float)): return float(fiyat), None
+
+    metin = str(fiyat).lower()
+    para = next((kod for kod, ifade in PARA_IFADELERI if re.search(ifade, metin)), None)
+    sayi = re.search(r"\d[\d.,]*", metin)
+    if not sayi: return None, para
+
+    ham = sayi.group().rstrip(".,")
+    # "1.000" / "1.000,50" Türkçe, "1,000.50" İngilizce yazım
+    if "," in ham and "." in ham:
+        ham = ham.replace(".", "").replace(",", ".") if ham.rfind(",") > ham.rfind(".") else ham.replace(",", "")
+    elif "," in ham:
+        ham = ham.replace(",", ".") if len(ham.split(",")[-1]) != 3 else ham.replace(",", "")
+    elif ham.count(".") >= 1 and len(ham.split(".")[-1]) == 3:
+        ham = ham.replace(".", "")
+    return float(ham), para
+
+
+def kur_cevir(tutar, kaynak, hedef):
+    if not kaynak or kaynak == hedef: return tutar
+    return tutar * REFERANS_KURLAR_TRY[kaynak] / REFERANS_KURLAR_TRY[hedef]
+
+
+def toplu_teklif(kalemler):
+    """Çok sayıda kalem için vergi hesabı, tek vektörel işlemle.
+
+    kalemler: DataFrame veya dict listesi; kolonlar ulke_kodu, kategori, deger (hedef ülke para biriminde).
+    İsteğe bağlı 'gonderi' kolonu verilirse muafiyet sınırları kalem yerine gönderi toplamına uygulanır
+    (aynı koliye giren sepet). Dönen tabloya gumruk, kdv, toplam_vergi ve para_birimi eklenir.
+    """
+    import pandas as pd
+    _tablolari_yukle()
+    df = pd.DataFrame(kalemler).copy()
+    df['kategori'] = df['kategori'].fillna("diger")
+
+    df = df.merge(_ulkeler[['para_birimi', 'kdv_orani', 'gumruk_muafiyet_siniri', 'kdv_muafiyet_siniri',
+                            'varsayilan_gumruk_orani']], left_on='ulke_kodu', right_index=True, how='left')
+    df = df.merge(_kategoriler.rename(columns={'kdv_orani': 'kategori_kdv_orani'}),
+                  on=['ulke_kodu', 'kategori'], how='left')
+
+    gumruk_orani = df['gumruk_orani'].fillna(df['varsayilan_gumruk_orani']).to_numpy(dtype=float)
+    kdv_orani = df['kategori_kdv_orani'].fillna(df['kdv_orani']).to_numpy(dtype=float)
+    deger = df['deger'].to_numpy(dtype=float)
+
+    if 'gonderi' in df.columns:
+        gonderi_degeri = df.groupby('gonderi')['deger'].transform('sum').to_numpy(dtype=float)
+    else:
+        gonderi_degeri = deger
+
+    # Muafiyet sınırı: gönderi değeri sınırı aşmıyorsa o vergi alınmaz (0 = muafiyet yok)
+    gumruk = np.where(gonderi_degeri > df['gumruk_muafiyet_siniri'].to_numpy(dtype=float),
+                      deger * gumruk_orani, 0.0)
+    kdv = np.where(gonderi_degeri > df['kdv_muafiyet_siniri'].to_numpy(dtype=float),
+                   (deger + gumruk) * kdv_orani, 0.0)
+
+    df['gumruk_orani'] = gumruk_orani
+    df['kdv_orani'] = kdv_orani
+    df['gumruk'] = np.round(gumruk, 2)
+    df['kdv'] = np.round(kdv, 2)
+    df['toplam_vergi'] = np.round(gumruk + kdv, 2)
+    return df.drop(columns=['kategori_kdv_orani', 'varsayilan_gumruk_orani'])
+
+
+def _tutar_metni(tutar, para):
+    metin = f"{tutar:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+    if metin.endswith(",00"): metin = metin[:-3]
+    return f"{metin} {PARA_SEMBOLLERI.get(para, para)}"
+
+
+def vergi_teklifi(urun_kategorisi, fiyat, hedef_ulke):
+    """Müşteriye okunacak tek cümle. Ülke tabloda yoksa None döner (çağıran Gemini'ye düşer)."""
+    if not hedef_ulke:
+        return "Vergi hesaplayabilmem için gönderinin hangi ülkeye gideceğini söyler misiniz?"
+
+    kod = ulke_coz(hedef_ulke)
+    if kod is None: return None
+
+    tutar, para = fiyat_coz(fiyat)
+    if tutar is None:
+        return "Vergi hesaplayabilmem için ürünün fiyatını da söyler misiniz?"
+
+    ulke = _ulkeler.loc[kod]
+    hedef_para = ulke['para_birimi']
+    deger = round(kur_cevir(tutar, para, hedef_para), 2)
+    kategori = kategori_coz(urun_kategorisi)
+    sonuc = toplu_teklif([{"ulke_kodu": kod, "kategori": kategori, "deger": deger}]).iloc[0]
+
+    cevrim = f" ({_tutar_metni(tutar, para)} yaklaşık {_tutar_metni(deger, hedef_para)} eder)" \
+        if para and para != hedef_para else ""
+    giris = f"{ulke['ulke']} gönderinizde{cevrim} {_tutar_metni(deger, hedef_para)} değerindeki ürün için"
+
+    if sonuc['toplam_vergi'] == 0:
+        if deger <= ulke['gumruk_muafiyet_siniri'] and deger <= ulke['kdv_muafiyet_siniri']:
+            return f"{giris} muafiyet sınırı altında kaldığından gümrük vergisi veya KDV çıkmıyor."
+        return f"{giris} bu ürün grubunda gümrük vergisi veya KDV çıkmıyor."
+
+    kalemler = [f"{_tutar_metni(sonuc[ad], hedef_para)} {etiket}"
+                for ad, etiket in (('gumruk', "gümrük vergisi"), ('kdv', "KDV")) if sonuc[ad] > 0]
+    if len(kalemler) == 1:
+        return f"{giris} tahmini {kalemler[0]} çıkıyor."
+    return (f"{giris} tahmini {kalemler[0]} ve {kalemler[1]} olmak üzere toplam "
+            f"{_tutar_metni(sonuc['toplam_vergi'], hedef_para)} vergi çıkıyor.")
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+
+    _tablolari_yukle()
+    print("\n--- VERGİ MOTORU ---")
+    print(f"Ülke: {len(_ulkeler)}, Kategori kuralı: {len(_kategoriler)}")
+
+    print("\nÖrnekler:")
+    for urun, fiyat, ulke in [("Laptop", "1000 Euro", "Almanya'ya"), ("tişört", "100 €", "Fransa"),
+                              ("telefon", "800 dolar", "Amerika"), ("ayakkabı", "5000 TL", "İngiltere"),
+                              ("kitap", "40", "Almanya"), ("parfüm", "90 $", "Kanada"), ("mont", "300", "Brezilya")]:
+        print(f"  {urun:<9} {fiyat:<10} {ulke:<11} -> {vergi_teklifi(urun, fiyat, ulke)}")
+
+    rng = np.random.default_rng(42)
+    n = 100_000
+    kalemler = pd.DataFrame({
+        "ulke_kodu": rng.choice(_ulkeler.index.to_numpy(), n),
+        "kategori": rng.choice(list(KATEGORI_ANAHTARLARI) + ["diger"], n),
+        "deger": rng.uniform(5, 2000, n).round(2),
+        "gonderi": rng.integers(0, n // 3, n),
+    })
+    baslangic = time.perf_counter()
+    sonuc = toplu_teklif(kalemler)
+    print(f"\nToplu teklif: {n} kalem {1000 * (time.perf_counter() - baslangic):.1f} ms, "
+          f"toplam vergi (ilk ülke): {sonuc[sonuc.ulke_kodu == _ulkeler.index[0]]['toplam_vergi'].sum():,.0f}")
+    print("--------------------\n")
@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+import pytest
+
+from modules import cevap_onbellegi
+
+
+@pytest.fixture
+def onbellek(monkeypatch):
+    monkeypatch.setattr(cevap_onbellegi, "CEVAP_ONBELLEGI_ACIK", True)
+    monkeypatch.setattr(cevap_onbellegi, "CEVAP_ONBELLEK_DB", "")
+    monkeypatch.setattr(cevap_onbellegi, "_bellek", OrderedDict())
+    return monkeypatch
+
+
+def test_parmak_izi_bosluk_ve_buyuk_harfe_duyarsiz():
+    anahtar = cevap_onbellegi.parmak_izi("kimlik_basari", "Ayşe  Yılmaz ", "alici")
+    assert anahtar == cevap_onbellegi.parmak_izi("kimlik_basari", "ayşe yılmaz", "ALICI")
+    assert anahtar != cevap_onbellegi.parmak_izi("kimlik_basari", "ayşe yılmaz", "gonderici")
+    # Çağrı yeri anahtarın parçası; aynı girdiler başka çağrıda çakışmaz
+    assert anahtar != cevap_onbellegi.parmak_izi("kimlik_hata", "ayşe yılmaz", "alici")
+    # Girdi sınırları korunur: ("ab", "c") ile ("a", "bc") farklı anahtardır
+    assert cevap_onbellegi.parmak_izi("kampanya", "ab", "c") != cevap_onbellegi.parmak_izi("kampanya", "a", "bc")
+
+
+def test_kayit_ttl_dolunca_dusar(onbellek):
+    anahtar = cevap_onbellegi.parmak_izi("kampanya", "liste", "genel")
+    cevap_onbellegi.kaydet("kampanya", anahtar, "Bahar kampanyası")
+    assert cevap_onbellegi.getir("kampanya", anahtar) == "Bahar kampanyası"
+
+    bitis, metin = cevap_onbellegi._bellek[anahtar]
+    assert bitis - time.time() == pytest.approx(cevap_onbellegi.CAGRI_TTL_SN["kampanya"], abs=5)
+    # Süresi dolmuş kayıt
+    cevap_onbellegi._bellek[anahtar] = (time.time() - 1, metin)
+    assert cevap_onbellegi.getir("kampanya", anahtar) is None
+    assert anahtar not in cevap_onbellegi._bellek
+
+
+def test_listede_olmayan_cagri_onbelleklenmez(onbellek):
+    cevap_onbellegi.kaydet("vergi", "anahtar", "25 € vergi")
+    assert cevap_onbellegi.getir("vergi", "anahtar") is None
+    assert len(cevap_onbellegi._bellek) == 0
+
+
+def test_boyut_siniri_en_eski_kullanilani_atar(onbellek):
+    onbellek.setattr(cevap_onbellegi, "CEVAP_ONBELLEK_BOYUT", 2)
+    for anahtar in ("a", "b"):
+        cevap_onbellegi.kaydet("kampanya", anahtar, anahtar.upper())
+    cevap_onbellegi.getir("kampanya", "a")
+    cevap_onbellegi.kaydet("kampanya", "c", "C")
+
+    assert list(cevap_onbellegi._bellek) == ["a", "c"]
+
+
+def test_disk_katmani_bellek_bosalinca_kullanilir(onbellek, tmp_path):
+    onbellek.setattr(cevap_onbellegi, "CEVAP_ONBELLEK_DB", str(tmp_path / "cevaplar.db"))
+    onbellek.setattr(cevap_onbellegi, "_yerel", type(cevap_onbellegi._yerel)())
+    cevap_onbellegi.kaydet("kimlik_basari", "k1", "Hoş geldiniz Ayşe Hanım")
+    cevap_onbellegi._bellek.clear()
+
+    assert cevap_onbellegi.getir("kimlik_basari", "k1") == "Hoş geldiniz Ayşe Hanım"
+    assert "k1" in cevap_onbellegi._bellek
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from modules import cografya
+
+
+@pytest.mark.parametrize("metin, il, ilce", [
+    ("İstanbul'dan", "İstanbul", None),
+    ("ankaraya", "Ankara", None),
+    ("izmirden", "İzmir", None),
+    ("Izmır", "İzmir", None),
+    ("Kadıköy", "İstanbul", "Kadıköy"),
+    ("Ankara Çankaya", "Ankara", "Çankaya"),
+])
+def test_ekler_ve_yazim_hatalari(metin, il, ilce):
+    yer = cografya.yer_coz(metin)
+    assert (yer['il'], yer['ilce']) == (il, ilce)
+
+
+@pytest.mark.parametrize("metin, il", [("Afyon", "Afyonkarahisar"), ("Urfa'ya", "Şanlıurfa"),
+                                       ("antep", "Gaziantep"), ("Maraş", "Kahramanmaraş"), ("İçel", "Mersin")])
+def test_takma_adlar(metin, il):
+    assert cografya.yer_coz(metin)['il'] == il
+
+
+def test_ayni_adli_ilce_belirtilen_ile_gore_secilir():
+    assert cografya.yer_coz("Zonguldak Ereğli")['il'] == "Zonguldak"
+    assert cografya.yer_coz("Konya Ereğli'ye")['il'] == "Konya"
+    # İl verilmezse de bir Ereğli döner
+    assert cografya.yer_coz("Ereğli")['ilce'] == "Ereğli"
+
+
+def test_bilinmeyen_yer():
+    assert cografya.yer_coz("Mars") is None
+    assert cografya.yer_coz("") is None
+    assert cografya.mesafe_hesapla("Mars", "Ankara") == 0
+
+
+def test_mesafe_kalibrasyon_ciftlerine_yakin():
+    hatalar = []
+    for a, b, km in cografya.KALIBRASYON_CIFTLERI:
+        tahmin = cografya.mesafe_hesapla(a, b)
+        assert tahmin == cografya.mesafe_hesapla(b, a)
+        hatalar.append(abs(tahmin - km) / km)
+    assert max(hatalar) < 0.3
+    assert np.mean(hatalar) < 0.1
+
+
+def test_ayni_sehir_en_az_sehir_ici_mesafe():
+    assert cografya.mesafe_hesapla("Ankara", "ankaraya") == cografya.SEHIR_ICI_MIN_KM
@@ -0,0 +1,67 @@
+from modules import database
+
+
+def _kampanyalar(monkeypatch, basliklar):
+    rows = [{'baslik': b, 'detay': ""} for b in basliklar]
+    monkeypatch.setattr(database, "referans_verisi", lambda tablo: rows)
+
+
+def test_kampanya_kategorisi_basliga_gore_eslesir(monkeypatch):
+    _kampanyalar(monkeypatch, ["Öğrenci İndirimi", "Bahar Kampanyası"])
+    assert database.kampanya_kategorisi("Öğrencilere indirim var mı?") == "ogren"
+    assert database.kampanya_kategorisi("kurumsal firmalara indirim") == "genel"
+
+
+def test_kampanya_kategorisi_bos_basligi_atlar(monkeypatch):
+    _kampanyalar(monkeypatch, ["", None, "Bahar Kampanyası"])
+    assert database.kampanya_kategorisi("bahar kampanyası ne") == "bahar"
+
+
+def _sikayet_tablosu(monkeypatch, tmp_path):
+    import sqlite3
+    db = str(tmp_path / "sirket.db")
+    conn = sqlite3.connect(db)
+    conn.execute('''CREATE TABLE sikayetler (
+        sikayet_id INTEGER PRIMARY KEY AUTOINCREMENT, siparis_no TEXT, olusturan_musteri_id INTEGER,
+        konu TEXT, durum TEXT DEFAULT 'ACIK', tarih DATE, tip TEXT, takip_no TEXT, aciklama TEXT)''')
+    conn.commit()
+    monkeypatch.setattr(database, "DB_FILE", db)
+    return conn
+
+
+def test_sikayet_metinleri_sadece_cozulmus_musteri_sikayetleri(monkeypatch, tmp_path):
+    conn = _sikayet_tablosu(monkeypatch, tmp_path)
+    database.sikayet_olustur("100", "Kargom kutusu ezik geldi, çok kızgınım", 1)
+    conn.execute("INSERT INTO sikayetler (siparis_no, konu, durum, tip) VALUES "
+                 "('101', '[KRİTİK] Yanlış Adres Bildirimi - Dağıtımda', 'COZULDU', 'YANLIS_ADRES')")
+    conn.commit()
+    database.sikayet_olustur("102", "Kurye kapıya bile gelmedi", 2)
+    conn.execute("UPDATE sikayetler SET durum = 'COZULDU' WHERE siparis_no IN ('100', '102')")
+    conn.commit()
+
+    satirlar = database.sikayet_metinleri_getir()['cozulmus']
+    assert [s['konu'] for s in satirlar] == ["Kargom kutusu ezik geldi, çok kızgınım", "Kurye kapıya bile gelmedi"]
+
+
+def test_acik_sikayet_sonradan_cozulunce_alinir(monkeypatch, tmp_path):
+    conn = _sikayet_tablosu(monkeypatch, tmp_path)
+    for no in ("100", "101", "102"):
+        database.sikayet_olustur(no, f"{no} numaralı kargom hâlâ gelmedi", 1)
+    conn.execute("UPDATE sikayetler SET durum = 'COZULDU' WHERE siparis_no IN ('100', '102')")
+    conn.commit()
+
+    # 101 açık olsa da arkasındaki 102 öğrenilir; 101 sonraki taramada tekrar bakılmak üzere döner
+    tarama = database.sikayet_metinleri_getir()
+    assert [s['sikayet_id'] for s in tarama['cozulmus']] == [1, 3]
+    assert tarama['acik'] == [2] and tarama['son_id'] == 3
+
+    database.sikayet_olustur("103", "103 numaralı kargom hasarlı", 1)
+    tarama = database.sikayet_metinleri_getir(tarama['son_id'], tarama['acik'])
+    assert tarama == {'cozulmus': [], 'acik': [2, 4], 'son_id': 4}
+
+    conn.execute("UPDATE sikayetler SET durum = 'KAPANDI' WHERE siparis_no = '101'")
+    conn.execute("UPDATE sikayetler SET durum = 'REDDEDILDI' WHERE siparis_no = '103'")
+    conn.commit()
+    tarama = database.sikayet_metinleri_getir(tarama['son_id'], tarama['acik'])
+    assert tarama == {'cozulmus': [{'sikayet_id': 2, 'konu': "101 numaralı kargom hâlâ gelmedi"}],
+                      'acik': [], 'son_id': 4}
@@ -0,0 +1,25 @@
+import pytest
+
+from modules import gemini_ai, llm_istemci
+
+
+def _calistir(akis, hata):
+    istek = next(akis)
+    assert isinstance(istek, gemini_ai.LLMIstegi) and istek.cagri == "vergi"
+    with pytest.raises(StopIteration) as sonuc:
+        akis.throw(hata)
+    return sonuc.value.value
+
+
+def test_vergi_ai_devre_acikken_hata_kaydetmez(monkeypatch):
+    monkeypatch.setattr(llm_istemci, "kullanilabilir", lambda: True)
+    kayitlar = []
+    monkeypatch.setattr(gemini_ai, "hata_kaydet", kayitlar.append)
+
+    cevap = _calistir(gemini_ai.vergi_hesapla_ai("laptop", "1000 dolar", "Brezilya"),
+                      llm_istemci.DevreAcikHatasi("vergi"))
+    assert "geçici bir yoğunluk" in cevap
+    assert kayitlar == []
+
+    _calistir(gemini_ai.vergi_hesapla_ai("laptop", "1000 dolar", "Brezilya"), ValueError("bozuk cevap"))
+    assert kayitlar == ["vergi_ai"]
@@ -0,0 +1,69 @@
+import threading
+import pytest
+
+from modules import isinma, database, cografya
+
+
+@pytest.fixture
+def asamalar(monkeypatch):
+    monkeypatch.setattr(isinma, "HAZIR", threading.Event())
+    monkeypatch.setattr(isinma, "_durum", {'basladi': None, 'bitti': None, 'asamalar': {}})
+    cagrilan = []
+    for ad in ("_veritabani", "_duygu_modeli", "_niyet_modeli", "_teslimat_modeli", "_baglam_onbellegi",
+               "_ortak_sesler"):
+        monkeypatch.setattr(isinma, ad, lambda ad=ad: cagrilan.append(ad))
+    monkeypatch.setattr(database, "referans_verilerini_yukle", lambda: cagrilan.append("referans_verisi"))
+    monkeypatch.setattr(cografya, "il_mesafe_matrisi", lambda: cagrilan.append("cografya"))
+    return monkeypatch
+
+
+def _bozuk():
+    raise RuntimeError("yüklenemedi")
+
+
+def test_tum_asamalar_tamamsa_hazir(asamalar):
+    assert isinma.sistemi_isit()
+    durum = isinma.hazirlik_durumu()
+    assert durum['ready']
+    assert {a['durum'] for a in durum['stages'].values()} == {"tamam"}
+    assert len(durum['stages']) == 8
+
+
+def test_istege_bagli_asama_hatasi_hazir_olmayi_engellemez(asamalar):
+    asamalar.setattr(isinma, "_ortak_sesler", _bozuk)
+    asamalar.setattr(isinma, "_baglam_onbellegi", _bozuk)
+
+    assert isinma.sistemi_isit()
+    durum = isinma.hazirlik_durumu()
+    assert durum['ready']
+    asama = durum['stages']['ortak_sesler']
+    assert (asama['durum'], asama['hata'], asama['zorunlu']) == ("hata", "yüklenemedi", False)
+
+
+def test_zorunlu_asama_hatasi_hazir_yapmaz(asamalar):
+    asamalar.setattr(isinma, "_duygu_modeli", _bozuk)
+
+    assert not isinma.sistemi_isit()
+    durum = isinma.hazirlik_durumu()
+    assert not durum['ready']
+    assert durum['stages']['duygu_modeli']['zorunlu'] is True
+    # Sonraki aşamalar yine de denenir
+    assert durum['stages']['ortak_sesler']['durum'] == "tamam"
+
+
+def test_ready_isinma_bitince_200_doner(asamalar):
+    pytest.importorskip("flask")
+    asamalar.setenv("OTURUM_DEPOSU", "bellek")
+    # Uygulama içe aktarılırken gerçek ısınma başlatılmasın
+    asamalar.setattr(isinma, "_baslatildi", True)
+    import webhook
+    istemci = webhook.app.test_client()
+
+    cevap = istemci.get("/ready")
+    assert cevap.status_code == 503
+    assert cevap.get_json()['ready'] is False
+
+    isinma.sistemi_isit()
+    cevap = istemci.get("/ready")
+    assert cevap.status_code == 200
+    assert cevap.get_json()['ready'] is True
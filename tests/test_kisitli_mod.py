@@ -0,0 +1,31 @@
+from modules import kisitli_mod
+from modules.oturum_deposu import varsayilan_oturum
+
+
+def test_ne_kadar_surer_teslimat_suresine_gider():
+    karar = kisitli_mod.yonlendir("İzmir İstanbul arası ne kadar sürer?", varsayilan_oturum())
+    assert karar["function"] == "teslimat_suresi_hesapla_ai"
+    assert karar["parameters"]["cikis"] == "İzmir" and karar["parameters"]["varis"] == "İstanbul"
+
+
+def test_ne_kadar_ucrete_gider():
+    karar = kisitli_mod.yonlendir("İzmir'den İstanbul'a 3 desi ne kadar?", varsayilan_oturum())
+    assert karar["function"] == "ucret_hesapla"
+    assert karar["parameters"]["desi"] == "3"
+
+
+def test_kargo_sorgusu_dogrulama_ister():
+    karar = kisitli_mod.yonlendir("Kargom nerede?", varsayilan_oturum())
+    assert karar == {"type": "chat", "reply": kisitli_mod.DOGRULAMA_CEVABI}
+
+
+def test_vergi_parametreleri_mesajdan_cikarilir():
+    karar = kisitli_mod.yonlendir("Almanya'ya 1.000 euro laptop gönderirsem vergi ne kadar?", varsayilan_oturum())
+    assert karar == {"type": "action", "function": "vergi_hesapla_ai",
+                     "parameters": {"urun_kategorisi": "elektronik", "fiyat": "1000.00 EUR", "hedef_ulke": "DE"}}
+
+
+def test_vergi_bilgisi_eksikse_sabit_cevap():
+    for mesaj in ("Japonya'ya gümrük vergisi ne kadar?", "Laptop için 500 dolar vergi çıkar mı?",
+                  "Brezilya'ya 300 dolar telefon vergisi"):
+        assert kisitli_mod.yonlendir(mesaj, varsayilan_oturum()) == {"type": "chat", "reply": kisitli_mod.KISITLI_CEVAP}
@@ -0,0 +1,120 @@
+import time
+import pytest
+
+from modules import konusma_hafizasi, gemini_ai, llm_istemci
+from modules.oturum_deposu import BellekOturumDeposu, GECMIS_MAKS_SATIR
+
+
+def _satirlar(n, baslangic=0):
+    return [f"KULLANICI: soru {i}" if i % 2 == 0 else f"ASİSTAN: cevap {i}" for i in range(baslangic, baslangic + n)]
+
+
+def _bekle(kosul, sure_sn=2.0):
+    bitis = time.time() + sure_sn
+    while time.time() < bitis:
+        if kosul(): return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def hafiza(monkeypatch):
+    monkeypatch.setattr(konusma_hafizasi, "_bekleyenler", set())
+    monkeypatch.setattr(llm_istemci, "devre_acik", lambda: False)
+    return monkeypatch
+
+
+def test_butce_ozeti_sayar_son_turu_korur():
+    uzun = "x" * 400
+    oturum = {'summary': "kısa özet", 'history': [uzun] * 10}
+    metin = konusma_hafizasi.gecmis_metni(oturum, butce=250)
+    assert metin.startswith("ÖNCEKİ KONUŞMA ÖZETİ: kısa özet")
+    assert metin.count(uzun) == 2
+
+    # Bütçe özete bile yetmese de son tur prompt'a girer
+    oturum['summary'] = "ö" * 2000
+    assert konusma_hafizasi.gecmis_metni(oturum, butce=10).count(uzun) == 2
+
+
+def test_katla_onek_tutmazsa_dokunmaz():
+    oturum = {'summary': "", 'history': _satirlar(8)}
+    assert konusma_hafizasi.katla(oturum, _satirlar(2, baslangic=1), "özet") is False
+    assert oturum['history'] == _satirlar(8)
+
+    assert konusma_hafizasi.katla(oturum, _satirlar(4), "yeni özet") is True
+    assert oturum == {'summary': "yeni özet", 'history': _satirlar(4, baslangic=4)}
+
+
+def test_katla_ozet_yoksa_satirlari_sinirli_ekler():
+    oturum = {'summary': "eski", 'history': _satirlar(6), 'tracking_no': "123456"}
+    oturum['history'][0] = "KULLANICI: 123456 nolu kargom nerede"
+    assert konusma_hafizasi.katla(oturum, oturum['history'][:4], None)
+    assert oturum['summary'].startswith("eski KULLANICI: AKTIF_NO nolu kargom nerede")
+    assert oturum['history'] == _satirlar(2, baslangic=4)
+
+    oturum = {'summary': "e" * konusma_hafizasi.OZET_MAKS_KARAKTER, 'history': _satirlar(4)}
+    konusma_hafizasi.katla(oturum, _satirlar(2), "")
+    assert len(oturum['summary']) == konusma_hafizasi.OZET_MAKS_KARAKTER
+    assert oturum['summary'].endswith("ASİSTAN: cevap 1")
+
+
+def test_zorunlu_katlama_esigi():
+    assert konusma_hafizasi.HAFIZA_ZORUNLU_KATLAMA_SATIR < GECMIS_MAKS_SATIR
+    esik = konusma_hafizasi.HAFIZA_ZORUNLU_KATLAMA_SATIR
+    assert konusma_hafizasi.zorunlu_katlanacaklar({'history': _satirlar(esik - 1)}) is None
+    katlanacak = konusma_hafizasi.zorunlu_katlanacaklar({'history': _satirlar(esik)})
+    assert katlanacak == _satirlar(esik - konusma_hafizasi.HAFIZA_SON_SATIR)
+
+
+def test_arka_plan_ozeti_katlar(hafiza):
+    hafiza.setattr(konusma_hafizasi, "_ozet_uret", lambda eski, satirlar: f"{len(satirlar)} satır özeti")
+    depo = BellekOturumDeposu()
+    oturum = depo.getir("s1")
+    oturum['history'] = _satirlar(konusma_hafizasi.HAFIZA_KATLAMA_SATIR)
+    depo.kaydet("s1", oturum)
+
+    assert konusma_hafizasi.ozetlemeyi_planla("s1", oturum, depo)
+    assert _bekle(lambda: depo.getir("s1")['summary'])
+    kayit = depo.getir("s1")
+    katlanan = konusma_hafizasi.HAFIZA_KATLAMA_SATIR - konusma_hafizasi.HAFIZA_SON_SATIR
+    assert kayit['summary'] == f"{katlanan} satır özeti"
+    assert kayit['history'] == _satirlar(konusma_hafizasi.HAFIZA_SON_SATIR, baslangic=katlanan)
+
+
+def test_kuyruk_doluysa_planlanmaz(hafiza):
+    hafiza.setattr(konusma_hafizasi, "HAFIZA_OZET_KUYRUK_LIMITI", 2)
+    hafiza.setattr(konusma_hafizasi, "_bekleyenler", {"a", "b"})
+    oturum = {'summary': "", 'history': _satirlar(konusma_hafizasi.HAFIZA_KATLAMA_SATIR)}
+    assert konusma_hafizasi.ozetlemeyi_planla("c", oturum, BellekOturumDeposu()) is False
+    assert konusma_hafizasi._bekleyenler == {"a", "b"}
+
+
+def _zorunlu_katlamayi_calistir(depo, oturum, ozet=None, hata=None):
+    akis = gemini_ai._zorunlu_katlama("s1", oturum, depo)
+    istek = next(akis)
+    assert isinstance(istek, gemini_ai.LLMIstegi) and istek.cagri == "ozet"
+    with pytest.raises(StopIteration):
+        akis.throw(hata) if hata else akis.send(ozet)
+
+
+def test_zorunlu_katlama_satirlari_kirpilmadan_ozete_alir():
+    depo = BellekOturumDeposu()
+    oturum = depo.getir("s1")
+    oturum['history'] = _satirlar(GECMIS_MAKS_SATIR - 2)
+    depo.kaydet("s1", oturum)
+
+    _zorunlu_katlamayi_calistir(depo, oturum, ozet=" tur içi özet ")
+    assert oturum['summary'] == "tur içi özet"
+    assert len(oturum['history']) == konusma_hafizasi.HAFIZA_SON_SATIR
+    assert depo.getir("s1")['history'] == oturum['history']
+
+
+def test_zorunlu_katlama_gemini_yoksa_satirlari_ozete_ekler():
+    depo = BellekOturumDeposu()
+    oturum = depo.getir("s1")
+    oturum['history'] = _satirlar(GECMIS_MAKS_SATIR - 2)
+    depo.kaydet("s1", oturum)
+
+    _zorunlu_katlamayi_calistir(depo, oturum, hata=llm_istemci.DevreAcikHatasi("ozet"))
+    assert "KULLANICI: soru 0" in oturum['summary']
+    assert len(oturum['history']) == konusma_hafizasi.HAFIZA_SON_SATIR
@@ -0,0 +1,258 @@
+import time
+import asyncio
+import threading
+from collections import deque
+import pytest
+
+from modules import llm_istemci
+
+
+class SahteCevap:
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class SahteModel:
+    def __init__(self, gecikme_sn=0.0):
+        self.gecikme_sn = gecikme_sn
+        self.aktif = self.en_cok = 0
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.aktif += 1
+        self.en_cok = max(self.en_cok, self.aktif)
+        try:
+            await asyncio.sleep(self.gecikme_sn)
+        finally:
+            self.aktif -= 1
+        return SahteCevap(prompt)
+
+
+@pytest.fixture
+def istemci(monkeypatch):
+    monkeypatch.setattr(llm_istemci, "LLM_ESZAMANLI_LIMIT", 4)
+    monkeypatch.setattr(llm_istemci, "_eszamanli_sinir", threading.BoundedSemaphore(4))
+    monkeypatch.setattr(llm_istemci, "_async_sinir", None)
+    monkeypatch.setattr(llm_istemci, "_aktif_cagri", 0)
+    monkeypatch.setattr(llm_istemci, "_devre", {'durum': llm_istemci.KAPALI, 'acilis': 0.0, 'deneme_suruyor': False,
+                                                'pencere': deque(maxlen=llm_istemci.DEVRE_PENCERE)})
+    return monkeypatch
+
+
+def test_async_pay_butceden_ayrilir(istemci):
+    llm_istemci.async_payi_ayir(3)
+    # Thread'lere bütçenin kalanı (1) kalır
+    assert llm_istemci._eszamanli_sinir.acquire(blocking=False)
+    assert not llm_istemci._eszamanli_sinir.acquire(blocking=False)
+
+
+def test_async_cagrilar_paya_gore_sinirlanir(istemci):
+    model = SahteModel(gecikme_sn=0.05)
+    istemci.setattr(llm_istemci, "model_getir", lambda ad=None: model)
+    llm_istemci.async_payi_ayir(2)
+
+    async def calistir():
+        return await asyncio.gather(*[llm_istemci.uret_async(f"m{i}", cagri="test") for i in range(6)])
+
+    assert asyncio.run(calistir()) == [f"m{i}" for i in range(6)]
+    assert model.en_cok == 2
+    assert llm_istemci._aktif_cagri == 0
+
+
+def test_async_kuyruk_beklemesi_sureyle_sinirli(istemci):
+    model = SahteModel(gecikme_sn=0.5)
+    istemci.setattr(llm_istemci, "model_getir", lambda ad=None: model)
+    llm_istemci.async_payi_ayir(1)
+
+    async def calistir():
+        uzun = asyncio.ensure_future(llm_istemci.uret_async("uzun", cagri="test", zaman_asimi=2))
+        await asyncio.sleep(0.01)
+        baslangic = time.perf_counter()
+        with pytest.raises(llm_istemci.LLMHatasi):
+            await llm_istemci.uret_async("kisa", cagri="test", zaman_asimi=0.1, deneme_sayisi=1)
+        sure = time.perf_counter() - baslangic
+        await uzun
+        return sure
+
+    assert asyncio.run(calistir()) < 0.3
+
+
+class SahteSenkronModel:
+    def __init__(self, gecikme_sn=0.0, hata=None):
+        self.gecikme_sn, self.hata = gecikme_sn, hata
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.gecikme_sn)
+        if self.hata: raise self.hata
+        return SahteCevap(prompt)
+
+
+@pytest.fixture
+def devre(istemci):
+    istemci.setattr(llm_istemci, "DEVRE_MIN_CAGRI", 2)
+    istemci.setattr(llm_istemci, "DEVRE_HATA_ORANI", 0.5)
+    istemci.setattr(llm_istemci, "DEVRE_YAVAS_SN", 0.1)
+    return istemci
+
+
+def _model(devre, **kwargs):
+    model = SahteSenkronModel(**kwargs)
+    devre.setattr(llm_istemci, "model_getir", lambda ad=None: model)
+    return model
+
+
+def test_hatalar_devreyi_acar_ve_cagrilar_reddedilir(devre):
+    _model(devre, hata=ValueError("bozuk cevap"))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            llm_istemci.uret("x", cagri="test")
+
+    assert llm_istemci.devre_durumu() == llm_istemci.ACIK
+    assert llm_istemci.devre_acik()
+    with pytest.raises(llm_istemci.DevreAcikHatasi):
+        llm_istemci.uret("x", cagri="test")
+
+
+def test_yari_acikta_tek_deneme_basariliysa_kapanir(devre):
+    _model(devre)
+    with llm_istemci._devre_kilit:
+        llm_istemci._durum_degistir(llm_istemci.ACIK)
+        llm_istemci._devre['acilis'] = time.time() - llm_istemci.DEVRE_ACIK_SN
+
+    assert not llm_istemci.devre_acik()
+    assert llm_istemci._devre_izin("test") is True
+    assert llm_istemci.devre_durumu() == llm_istemci.YARI_ACIK
+    # Deneme sürerken ikinci çağrı reddedilir
+    assert llm_istemci.devre_acik()
+    with pytest.raises(llm_istemci.DevreAcikHatasi):
+        llm_istemci._devre_izin("test")
+
+    llm_istemci._devre_kaydet(True, deneme=True)
+    assert llm_istemci.devre_durumu() == llm_istemci.KAPALI
+    assert llm_istemci.uret("tamam", cagri="test") == "tamam"
+
+
+def test_yari_acikta_deneme_basarisizsa_yeniden_acilir(devre):
+    with llm_istemci._devre_kilit:
+        llm_istemci._durum_degistir(llm_istemci.ACIK)
+        llm_istemci._devre['acilis'] = time.time() - llm_istemci.DEVRE_ACIK_SN
+    _model(devre, hata=ValueError("bozuk cevap"))
+
+    with pytest.raises(ValueError):
+        llm_istemci.uret("x", cagri="test")
+    assert llm_istemci.devre_durumu() == llm_istemci.ACIK
+    assert llm_istemci.devre_acik()
+
+
+def test_yavas_gemini_hata_sayilir(devre):
+    _model(devre, gecikme_sn=0.15)
+    llm_istemci.uret("x", cagri="test")
+    llm_istemci.uret("x", cagri="test")
+    assert llm_istemci.devre_durumu() == llm_istemci.ACIK
+
+
+def test_kuyruk_beklemesi_yavaslik_sayilmaz(devre):
+    _model(devre)
+    devre.setattr(llm_istemci, "_eszamanli_sinir", threading.BoundedSemaphore(1))
+    llm_istemci._eszamanli_sinir.acquire()
+    threading.Timer(0.2, llm_istemci._eszamanli_sinir.release).start()
+
+    assert llm_istemci.uret("x", cagri="test") == "x"
+    assert list(llm_istemci._devre['pencere']) == [True]
+
+
+def test_kuyrukta_sure_dolmasi_devreye_yazilmaz(devre):
+    _model(devre)
+    devre.setattr(llm_istemci, "_eszamanli_sinir", threading.BoundedSemaphore(1))
+    llm_istemci._eszamanli_sinir.acquire()
+    try:
+        for _ in range(3):
+            with pytest.raises(llm_istemci.KuyrukHatasi):
+                llm_istemci.uret("x", cagri="test", zaman_asimi=0.05)
+    finally:
+        llm_istemci._eszamanli_sinir.release()
+
+    assert llm_istemci.devre_durumu() == llm_istemci.KAPALI
+    assert list(llm_istemci._devre['pencere']) == []
+
+
+class SahteGenai:
+    """genai.caching.CachedContent.create ağ çağrısını taklit eder."""
+
+    def __init__(self, gecikme_sn=0.0, hata=None):
+        self.gecikme_sn, self.hata, self.olusturma = gecikme_sn, hata, 0
+        sahte = self
+
+        class CachedContent:
+            @staticmethod
+            def create(**kwargs):
+                sahte.olusturma += 1
+                time.sleep(sahte.gecikme_sn)
+                if sahte.hata: raise sahte.hata
+                return kwargs["display_name"]
+
+        class GenerativeModel:
+            @staticmethod
+            def from_cached_content(cached_content):
+                return SahteModel()
+
+        self.caching = type("caching", (), {"CachedContent": CachedContent})
+        self.GenerativeModel = GenerativeModel
+
+
+def test_baglam_onbellegi_tek_olusturma_ve_kilit_disinda(istemci):
+    genai = SahteGenai(gecikme_sn=0.2)
+    istemci.setattr(llm_istemci, "genai", genai)
+    onbellek = llm_istemci.GeminiBaglamOnbellegi(ttl_sn=3600)
+
+    sonuclar = []
+    threadler = [threading.Thread(target=lambda: sonuclar.append(onbellek.model_getir("önek"))) for _ in range(5)]
+    for t in threadler: t.start()
+    time.sleep(0.05)
+    # Oluşturma sürerken kilit tutulmaz
+    baslangic = time.perf_counter()
+    assert onbellek.ag_gerekir("önek")
+    assert time.perf_counter() - baslangic < 0.05
+    for t in threadler: t.join()
+
+    assert genai.olusturma == 1
+    assert len({id(m) for m in sonuclar}) == 1 and sonuclar[0] is not None
+    assert not onbellek.ag_gerekir("önek")
+
+
+def test_baglam_onbellegi_yenileme_hatasinda_eski_kullanilir(istemci):
+    genai = SahteGenai()
+    istemci.setattr(llm_istemci, "genai", genai)
+    onbellek = llm_istemci.GeminiBaglamOnbellegi(ttl_sn=100)
+    ilk = onbellek.model_getir("önek")
+
+    # Süre bitimine %10'dan az kaldı: yenileme denenir ama başarısız olur
+    anahtar = next(iter(onbellek._kayitlar))
+    onbellek._kayitlar[anahtar] = (ilk, time.time() + 5)
+    genai.hata = RuntimeError("kota")
+    assert onbellek.model_getir("önek") is ilk
+    assert onbellek.model_getir("önek") is ilk
+    assert genai.olusturma == 2
+
+
+def test_async_yolda_baglam_onbellegi_event_loopu_bloklamaz(istemci):
+    istemci.setattr(llm_istemci, "genai", SahteGenai(gecikme_sn=0.3))
+    istemci.setattr(llm_istemci, "baglam_onbellegi", llm_istemci.GeminiBaglamOnbellegi(ttl_sn=3600))
+
+    async def calistir():
+        tikler = 0
+
+        async def saat():
+            nonlocal tikler
+            while True:
+                await asyncio.sleep(0.01)
+                tikler += 1
+
+        gorev = asyncio.ensure_future(saat())
+        cevap = await llm_istemci.uret_async("soru", cagri="test", onek="sabit talimat")
+        gorev.cancel()
+        return cevap, tikler
+
+    cevap, tikler = asyncio.run(calistir())
+    assert cevap == "soru"
+    assert tikler >= 10
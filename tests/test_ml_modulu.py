@@ -0,0 +1,216 @@
+import os
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+pd = pytest.importorskip("pandas")
+
+from modules import ml_modulu, niyet_yonlendirici
+from modules.duygu_numpy import NumpyDuyguModeli, disa_aktar
+
+
+@pytest.fixture
+def model_klasoru(tmp_path, monkeypatch):
+    # Depodaki model_artifacts/ kullanılmaz; modeller geçici klasörde sıfırdan üretilir
+    monkeypatch.setattr(ml_modulu, "MODEL_KLASORU", str(tmp_path))
+    monkeypatch.setattr(ml_modulu, "EGITILMIS_MODEL", None)
+    monkeypatch.setattr(ml_modulu, "DUYGU_KAYDI", None)
+    monkeypatch.setattr(ml_modulu, "DUYGU_MODU", "tfidf")
+    monkeypatch.setattr(ml_modulu, "DUYGU_MOTORU", "numpy")
+    return tmp_path
+
+
+def test_duygu_numpy_paritesi(model_klasoru):
+    numpy_modeli = ml_modulu.modeli_egit()
+    assert isinstance(numpy_modeli, NumpyDuyguModeli)
+
+    csv_path = os.path.join(ml_modulu.BASE_DIR, ml_modulu.DUYGU_CSV)
+    kayit = ml_modulu.artifact_yukle("duygu", ml_modulu.parmak_izi(csv_path, ml_modulu.DUYGU_HIPERPARAMETRELERI))
+    assert kayit is not None
+    pipeline = kayit["model"]
+
+    mesajlar = pd.read_csv(csv_path)["text"].dropna().tolist()
+    sonuclar = {}
+    for ad, model in (("sklearn", pipeline), ("numpy", numpy_modeli)):
+        ml_modulu.EGITILMIS_MODEL = model
+        sonuclar[ad] = [ml_modulu.duygu_analizi_yap(m) for m in mesajlar]
+
+    farkli = [m for m, a, b in zip(mesajlar, sonuclar["sklearn"], sonuclar["numpy"]) if a != b]
+    assert farkli == []
+
+
+def test_niyet_numpy_paritesi(model_klasoru):
+    df = niyet_yonlendirici._ornekleri_oku()
+    pipeline = niyet_yonlendirici._model_olustur().fit(df['clean_text'], df['label'])
+    numpy_modeli = NumpyDuyguModeli(disa_aktar(pipeline, str(model_klasoru / "niyet_numpy")))
+
+    metinler = df['clean_text'].tolist()
+    beklenen, gelen = pipeline.predict_proba(metinler), numpy_modeli.predict_proba(metinler)
+    assert list(numpy_modeli.classes_) == list(pipeline.classes_)
+    assert np.abs(beklenen - gelen).max() < 1e-9
+    assert (beklenen.argmax(axis=1) == gelen.argmax(axis=1)).all()
+
+
+def test_niyet_modeli_disa_aktarilan_dizilerden_yuklenir(model_klasoru, monkeypatch):
+    monkeypatch.setattr(niyet_yonlendirici, "NIYET_MODELI", None)
+    assert isinstance(niyet_yonlendirici.niyet_modelini_egit(), NumpyDuyguModeli)
+    assert os.path.isdir(niyet_yonlendirici.numpy_klasoru())
+
+    # İkinci süreç eğitmeden diziyi açar
+    monkeypatch.setattr(niyet_yonlendirici, "NIYET_MODELI", None)
+    monkeypatch.setattr(niyet_yonlendirici, "_ornekleri_oku", lambda: pytest.fail("yeniden eğitildi"))
+    assert isinstance(niyet_yonlendirici.niyet_modelini_egit(), NumpyDuyguModeli)
+    assert niyet_yonlendirici.niyet_tahmin_et("kargom nerede")[0] == "kargo_sorgula"
+
+
+def test_sikayet_filigrani_kilit_altinda_ilerler(monkeypatch):
+    import threading
+    import time
+    monkeypatch.setattr(ml_modulu, "DUYGU_KAYDI", {"son_sikayet_id": 0, "acik_sikayet_idleri": []})
+    taramalar, katilan = [], []
+
+    def getir(son_id, acik_idler):
+        taramalar.append((son_id, list(acik_idler)))
+        time.sleep(0.05)
+        if son_id == 0:
+            return {'cozulmus': [{'sikayet_id': 1, 'konu': "kargom gelmedi"}], 'acik': [2], 'son_id': 3}
+        return {'cozulmus': [], 'acik': [2], 'son_id': 3}
+
+    def guncelle(metinler, etiketler, **ust_bilgi):
+        katilan.extend(metinler)
+        ml_modulu.DUYGU_KAYDI = dict(ml_modulu.DUYGU_KAYDI, **ust_bilgi)
+        return len(metinler)
+
+    monkeypatch.setattr(ml_modulu, "sikayet_metinleri_getir", getir)
+    monkeypatch.setattr(ml_modulu, "duygu_modelini_guncelle", guncelle)
+
+    threadler = [threading.Thread(target=ml_modulu.sikayetleri_ogren) for _ in range(2)]
+    for t in threadler: t.start()
+    for t in threadler: t.join()
+
+    assert katilan == ["kargom gelmedi"]
+    assert taramalar == [(0, []), (3, [2])]
+    assert ml_modulu.DUYGU_KAYDI["acik_sikayet_idleri"] == [2]
+
+
+@pytest.fixture
+def sahte_egitim(model_klasoru, monkeypatch):
+    monkeypatch.setattr(ml_modulu, "DUYGU_MOTORU", "sklearn")
+    egitimler = []
+
+    def egit(csv_path):
+        egitimler.append(csv_path)
+        return {"sahte_model": len(egitimler)}, 0.9
+
+    monkeypatch.setattr(ml_modulu, "_duygu_modeli_egit", egit)
+    return egitimler
+
+
+def _bellegi_bosalt(monkeypatch):
+    monkeypatch.setattr(ml_modulu, "EGITILMIS_MODEL", None)
+    monkeypatch.setattr(ml_modulu, "DUYGU_KAYDI", None)
+
+
+def test_artifact_ayni_parmak_iziyle_yeniden_yuklenir(sahte_egitim, monkeypatch):
+    assert ml_modulu.modeli_egit() == {"sahte_model": 1}
+    _bellegi_bosalt(monkeypatch)
+
+    # İkinci işçi eğitmeden dosyadan açar
+    assert ml_modulu.modeli_egit() == {"sahte_model": 1}
+    assert len(sahte_egitim) == 1
+    assert ml_modulu.DUYGU_KAYDI["f1"] == 0.9
+
+
+def test_hiperparametre_degisince_yeniden_egitilir(sahte_egitim, monkeypatch):
+    ml_modulu.modeli_egit()
+    ilk_parmak = ml_modulu.DUYGU_KAYDI["parmak_izi"]
+    _bellegi_bosalt(monkeypatch)
+    monkeypatch.setattr(ml_modulu, "DUYGU_HIPERPARAMETRELERI", dict(ml_modulu.DUYGU_HIPERPARAMETRELERI, min_df=3))
+
+    assert ml_modulu.modeli_egit() == {"sahte_model": 2}
+    assert ml_modulu.DUYGU_KAYDI["parmak_izi"] != ilk_parmak
+    # Eski parmak izli dosya temizlenebilir, yenisi kalır
+    assert ml_modulu.eski_artifactlari_sil("duygu", ml_modulu.DUYGU_KAYDI["parmak_izi"]) == [f"duygu_{ilk_parmak}.joblib"]
+    assert os.path.exists(ml_modulu.artifact_yolu("duygu", ml_modulu.DUYGU_KAYDI["parmak_izi"]))
+
+
+def test_bozuk_artifact_yeniden_egitilir(sahte_egitim, monkeypatch):
+    ml_modulu.modeli_egit()
+    with open(ml_modulu.artifact_yolu("duygu", ml_modulu.DUYGU_KAYDI["parmak_izi"]), 'wb') as f:
+        f.write(b"yarim yazilmis")
+    _bellegi_bosalt(monkeypatch)
+
+    assert ml_modulu.modeli_egit() == {"sahte_model": 2}
+    _bellegi_bosalt(monkeypatch)
+    assert ml_modulu.modeli_egit() == {"sahte_model": 2}
+
+
+class SahteDuyguModeli:
+    classes_ = np.array(["Olumlu", "Olumsuz", "Tarafsız"])
+
+    def __init__(self):
+        self.cagrilar = []
+
+    def predict_proba(self, metinler):
+        self.cagrilar.append(list(metinler))
+        return np.array([[0.9, 0.05, 0.05] if "teşekkür" in m else [0.2, 0.7, 0.1] if "kızgın" in m
+                         else [0.4, 0.3, 0.3] for m in metinler])
+
+
+def test_toplu_duygu_tek_cagri_ve_sira(monkeypatch):
+    model = SahteDuyguModeli()
+    monkeypatch.setattr(ml_modulu, "EGITILMIS_MODEL", model)
+    mesajlar = ["Çok teşekkür ederim!", "", "ok", "Çok kızgınım, kargo gelmedi", "bilmem ki"]
+
+    sonuclar = ml_modulu.duygu_analizi_toplu(iter(mesajlar))
+    assert sonuclar == [("MUTLU (POZİTİF)", 2), ("NÖTR (Yetersiz Veri)", 0), ("NÖTR (Yetersiz Veri)", 0),
+                        ("KIZGIN (NEGATİF)", -2), ("NÖTR (Düşük Güven)", 0)]
+    assert len(model.cagrilar) == 1 and len(model.cagrilar[0]) == 3
+    assert sonuclar == [ml_modulu.duygu_analizi_yap(m) for m in mesajlar]
+
+
+def test_toplu_duygu_gecerli_mesaj_yoksa_modele_gitmez(monkeypatch):
+    model = SahteDuyguModeli()
+    monkeypatch.setattr(ml_modulu, "EGITILMIS_MODEL", model)
+    assert ml_modulu.duygu_analizi_toplu(["", "!!", "a"]) == [("NÖTR (Yetersiz Veri)", 0)] * 3
+    assert ml_modulu.duygu_analizi_toplu([]) == []
+    assert model.cagrilar == []
+
+
+def test_toplu_duygu_tekil_ile_ayni(model_klasoru):
+    ml_modulu.modeli_egit()
+    mesajlar = pd.read_csv(os.path.join(ml_modulu.BASE_DIR, ml_modulu.DUYGU_CSV))["text"].dropna().tolist()[:300]
+    assert ml_modulu.duygu_analizi_toplu(mesajlar) == [ml_modulu.duygu_analizi_yap(m) for m in mesajlar]
+
+
+@pytest.fixture
+def teslimat(model_klasoru, monkeypatch):
+    monkeypatch.setattr(ml_modulu, "TESLIMAT_MODELI", None)
+    return ml_modulu.teslimat_modelini_yukle()
+
+
+def test_teslimat_modeli_sklearn_ile_ayni_tahmin(teslimat):
+    from sklearn.linear_model import LinearRegression
+    hp = ml_modulu.TESLIMAT_HIPERPARAMETRELERI
+    df = pd.read_csv(os.path.join(ml_modulu.BASE_DIR, ml_modulu.TESLIMAT_CSV))
+    df = df[df['Status'].isin(hp['durumlar'])].dropna(subset=hp['ozellikler'] + ['Transit_Days'])
+    referans = LinearRegression().fit(df[hp['ozellikler']].to_numpy(), df['Transit_Days'])
+
+    mesafeler, agirliklar = np.array([150.0, 800.0, 2400.0]), np.array([1.0, 20.0, 45.5])
+    beklenen = np.round(np.maximum(referans.predict(np.column_stack([mesafeler, agirliklar])),
+                                   ml_modulu.MIN_TESLIMAT_GUN), 1)
+    assert list(ml_modulu.teslimat_suresi_toplu(mesafeler, agirliklar)) == list(beklenen)
+    assert [ml_modulu.teslimat_suresi_hesapla(m, a) for m, a in zip(mesafeler, agirliklar)] == list(beklenen)
+    assert teslimat['ornek_sayisi'] == len(df)
+
+
+def test_teslimat_tahmini_alt_sinir_ve_hatali_girdi(teslimat):
+    assert ml_modulu.teslimat_suresi_hesapla(0, 0) >= ml_modulu.MIN_TESLIMAT_GUN
+    assert ml_modulu.teslimat_suresi_toplu([0], [0])[0] >= ml_modulu.MIN_TESLIMAT_GUN
+    assert ml_modulu.teslimat_suresi_hesapla("uzak", 5).startswith("Model Hatası")
+
+
+def test_teslimat_modeli_dosyadan_yuklenir(teslimat, monkeypatch):
+    monkeypatch.setattr(ml_modulu, "TESLIMAT_MODELI", None)
+    monkeypatch.setattr(ml_modulu, "_teslimat_modeli_egit", lambda csv_path: pytest.fail("yeniden eğitildi"))
+    assert ml_modulu.teslimat_modelini_yukle() == teslimat
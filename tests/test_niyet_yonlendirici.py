@@ -0,0 +1,24 @@
+from modules import niyet_yonlendirici
+from modules.oturum_deposu import varsayilan_oturum
+
+
+def _sabit_niyet(monkeypatch, niyet):
+    monkeypatch.setattr(niyet_yonlendirici, "niyet_tahmin_et", lambda mesaj: (niyet, 0.99))
+
+
+def test_ovgu_misafirde_yerelde_secilmez(monkeypatch):
+    _sabit_niyet(monkeypatch, "hizli_teslimat_ovgu")
+    assert niyet_yonlendirici.yerel_yonlendirme("Çok hızlı geldi, teşekkürler", varsayilan_oturum()) is None
+
+
+def test_ovgu_dogrulanmis_kullanicida_yerelde_secilir(monkeypatch):
+    _sabit_niyet(monkeypatch, "hizli_teslimat_ovgu")
+    oturum = dict(varsayilan_oturum(), verified=True, tracking_no="123456")
+    karar = niyet_yonlendirici.yerel_yonlendirme("Çok hızlı geldi, teşekkürler", oturum)
+    assert karar["type"] == "action" and karar["function"] == "hizli_teslimat_ovgu"
+
+
+def test_kampanya_misafirde_yerelde_secilir(monkeypatch):
+    _sabit_niyet(monkeypatch, "kampanya_sorgula")
+    karar = niyet_yonlendirici.yerel_yonlendirme("Kampanyalarınız neler?", varsayilan_oturum())
+    assert karar["function"] == "kampanya_sorgula"
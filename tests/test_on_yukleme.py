@@ -0,0 +1,69 @@
+import pytest
+
+from modules import on_yukleme, niyet_yonlendirici
+
+
+@pytest.fixture
+def sorgular(monkeypatch):
+    cagrilar = []
+
+    def sorgu(ad, cevap):
+        def calistir(no, oturum):
+            cagrilar.append(ad)
+            return cevap
+        return calistir
+
+    monkeypatch.setattr(on_yukleme, "ON_YUKLEME_ACIK", True)
+    monkeypatch.setattr(on_yukleme, "SORGULAR", {
+        "kargo_sorgula": sorgu("kargo_sorgula", "Kargonuz yolda."),
+        "tahmini_teslimat": sorgu("tahmini_teslimat", "Tahmini teslimat: yarın"),
+        "kargo_durum_destek": sorgu("kargo_durum_destek", "Hata: database is locked"),
+    })
+    monkeypatch.setattr(niyet_yonlendirici, "NIYET_MODELI", None)
+    return cagrilar
+
+
+def _oturum(**alanlar):
+    return {'verified': True, 'tracking_no': "123456", 'role': 'alici', **alanlar}
+
+
+def _niyet(monkeypatch, niyet, guven):
+    monkeypatch.setattr(niyet_yonlendirici, "NIYET_MODELI", object())
+    monkeypatch.setattr(niyet_yonlendirici, "niyet_tahmin_et", lambda mesaj: (niyet, guven))
+
+
+def test_tek_sorgu_onceki_fonksiyondan(sorgular):
+    yukleme = on_yukleme.OnYukleme(_oturum(last_function="tahmini_teslimat"), "peki ne zaman gelir")
+    assert list(yukleme.isler) == ["tahmini_teslimat"]
+    assert yukleme.al("tahmini_teslimat", "123456", lambda: pytest.fail("yeniden hesaplandı")) == "Tahmini teslimat: yarın"
+    assert sorgular == ["tahmini_teslimat"]
+
+
+def test_guvenli_yerel_tahmin_onceki_fonksiyonu_gecer(sorgular, monkeypatch):
+    _niyet(monkeypatch, "kargo_sorgula", 0.9)
+    yukleme = on_yukleme.OnYukleme(_oturum(last_function="tahmini_teslimat"), "kargom nerede")
+    assert list(yukleme.isler) == ["kargo_sorgula"]
+
+    # Sorgu dışı bir niyet güvenliyse hiçbir şey başlatılmaz
+    _niyet(monkeypatch, "kampanya_sorgula", 0.9)
+    assert on_yukleme.OnYukleme(_oturum(last_function="tahmini_teslimat"), "kampanya var mı").isler == {}
+
+    # Tahmin zayıfsa önceki fonksiyona dönülür
+    _niyet(monkeypatch, "kargo_sorgula", 0.3)
+    assert list(on_yukleme.OnYukleme(_oturum(last_function="tahmini_teslimat"), "hmm").isler) == ["tahmini_teslimat"]
+
+
+def test_dogrulanmamis_oturumda_baslatilmaz(sorgular):
+    yukleme = on_yukleme.OnYukleme(_oturum(verified=False, last_function="kargo_sorgula"), "kargom")
+    assert yukleme.isler == {}
+    assert yukleme.al("kargo_sorgula", "123456", lambda: "hesaplandı") == "hesaplandı"
+
+
+def test_hata_metni_iska_sayilir(sorgular):
+    yukleme = on_yukleme.OnYukleme(_oturum(last_function="kargo_durum_destek"), "durum ne")
+    assert yukleme.al("kargo_durum_destek", "123456", lambda: "yeniden okundu") == "yeniden okundu"
+
+
+def test_farkli_numara_icin_yeniden_hesaplanir(sorgular):
+    yukleme = on_yukleme.OnYukleme(_oturum(last_function="kargo_sorgula"), "kargom")
+    assert yukleme.al("kargo_sorgula", "999999", lambda: "diğer kargo") == "diğer kargo"
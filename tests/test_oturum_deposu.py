@@ -0,0 +1,52 @@
+import pytest
+from modules.oturum_deposu import BellekOturumDeposu, SqliteOturumDeposu
+
+
+@pytest.fixture(params=["bellek", "sqlite"])
+def depo(request, tmp_path):
+    if request.param == "bellek":
+        return BellekOturumDeposu()
+    return SqliteOturumDeposu(db_file=str(tmp_path / "oturumlar.db"))
+
+
+def test_eski_kopya_uzerine_yazmaz(depo):
+    ilk = depo.getir("s1")
+    ilk['history'] = ["KULLANICI: a", "ASİSTAN: b"]
+    assert depo.kaydet("s1", ilk)
+
+    eski, yeni = depo.getir("s1"), depo.getir("s1")
+    yeni['summary'] = "özet"
+    assert depo.kaydet("s1", yeni)
+    assert not depo.kaydet("s1", eski)
+    assert depo.getir("s1")['summary'] == "özet"
+
+
+def test_tur_kaydet_arada_katlanan_ozeti_korur(depo):
+    oturum = depo.getir("s1")
+    oturum['history'] = [f"satir {i}" for i in range(8)]
+    depo.kaydet("s1", oturum)
+
+    tur = depo.getir("s1")
+
+    # Tur sürerken arka plan özeti ilk 6 satırı katlar
+    def katla(o):
+        o['summary'] = "eski konuşma"
+        o['history'] = o['history'][6:]
+    assert depo.guncelle("s1", katla) is not None
+
+    yeni_satirlar = ["KULLANICI: kargom nerede", "ASİSTAN: dağıtımda"]
+    tur['history'].extend(yeni_satirlar)
+    tur['verified'] = True
+    assert depo.tur_kaydet("s1", tur, yeni_satirlar)
+
+    sonuc = depo.getir("s1")
+    assert sonuc['summary'] == "eski konuşma"
+    assert sonuc['history'] == ["satir 6", "satir 7"] + yeni_satirlar
+    assert sonuc['verified'] is True
+    # Tur kopyası yazılan hâle getirilir; aynı turdaki sonraki kayıt çakışmaz
+    assert tur['history'] == sonuc['history'] and depo.kaydet("s1", tur)
+
+
+def test_guncelle_degistir_false_donerse_yazmaz(depo):
+    depo.kaydet("s1", depo.getir("s1"))
+    assert depo.guncelle("s1", lambda o: False) is None
@@ -0,0 +1,30 @@
+import time
+import threading
+
+from modules import paralel
+
+
+def test_sonuc_sure_icinde_gelirse_doner():
+    is_ = paralel.baslat("test", lambda a, b: a + b, 2, b=3)
+    assert paralel.sonuc_al(is_, varsayilan=0, zaman_asimi=1) == 5
+
+
+def test_zaman_asiminda_varsayilan_doner_ve_sayilir():
+    birak = threading.Event()
+    once = paralel.ADIM_ZAMAN_ASIMI.deger(asama="test_yavas")
+    is_ = paralel.baslat("test_yavas", birak.wait, 5)
+
+    baslangic = time.perf_counter()
+    assert paralel.sonuc_al(is_, varsayilan="yok", zaman_asimi=0.05, asama="test_yavas") == "yok"
+    assert time.perf_counter() - baslangic < 0.5
+    assert paralel.ADIM_ZAMAN_ASIMI.deger(asama="test_yavas") == once + 1
+    birak.set()
+
+
+def test_hata_veren_adim_varsayilan_doner():
+    def bozuk():
+        raise ValueError("veritabanı kilitli")
+
+    is_ = paralel.oncelikli_baslat("test_hata", bozuk)
+    assert paralel.sonuc_al(is_, varsayilan=("NÖTR", 0), asama="test_hata") == ("NÖTR", 0)
+    assert paralel.sonuc_al(paralel.baslat("test_hata", bozuk)) is None
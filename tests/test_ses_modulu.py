@@ -0,0 +1,115 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import pytest
+
+from modules import ses_modulu
+
+
+class SahteTTS:
+    cagrilar = 0
+    gecikme_sn = 0.0
+
+    def __init__(self, text, lang):
+        self.text = text
+
+    def save(self, yol):
+        SahteTTS.cagrilar += 1
+        time.sleep(SahteTTS.gecikme_sn)
+        with open(yol, 'wb') as f:
+            f.write(b"x" * 100)
+
+
+@pytest.fixture
+def onbellek(tmp_path, monkeypatch):
+    SahteTTS.cagrilar, SahteTTS.gecikme_sn = 0, 0.0
+    monkeypatch.setattr(ses_modulu, "gTTS", SahteTTS)
+    monkeypatch.setattr(ses_modulu, "CACHE_FOLDER", str(tmp_path))
+    monkeypatch.setattr(ses_modulu, "_onbellek", OrderedDict())
+    monkeypatch.setattr(ses_modulu, "_onbellek_toplam_bayt", 0)
+    monkeypatch.setattr(ses_modulu, "_suren_sentezler", {})
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_MAKS_BAYT", 10 ** 9)
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_KORUMA_SN", 0)
+    return tmp_path
+
+
+def _eskit(anahtar, saniye):
+    # Dosyanın ve indeksin son erişimini geçmişe çeker
+    yol = ses_modulu._onbellek_yolu(anahtar)
+    zaman = time.time() - saniye
+    os.utime(yol, (zaman, os.stat(yol).st_mtime))
+    boyut, olusturma, _ = ses_modulu._onbellek[anahtar]
+    ses_modulu._onbellek[anahtar] = (boyut, olusturma, zaman)
+
+
+def test_ayni_metin_icerik_adresli_tek_dosya(onbellek):
+    ilk = ses_modulu.metni_sese_cevir("Hoş  geldiniz.")
+    ikinci = ses_modulu.metni_sese_cevir("Hoş geldiniz.")
+    assert ilk == ikinci
+    assert SahteTTS.cagrilar == 1
+    assert ses_modulu.onbellekten_getir("Hoş geldiniz.") == ilk
+
+
+def test_eszamanli_iskalar_tek_sentez_bekler(onbellek):
+    SahteTTS.gecikme_sn = 0.2
+    sonuclar = []
+    threadler = [threading.Thread(target=lambda: sonuclar.append(ses_modulu.metni_sese_cevir("Kargonuz yolda.")))
+                 for _ in range(5)]
+    for t in threadler: t.start()
+    for t in threadler: t.join()
+
+    assert SahteTTS.cagrilar == 1
+    assert len(set(sonuclar)) == 1 and sonuclar[0]
+    assert ses_modulu._suren_sentezler == {}
+
+
+def test_bayt_siniri_en_eski_erisileni_siler(onbellek, monkeypatch):
+    for i, metin in enumerate(["bir", "iki", "üç"]):
+        ses_modulu.metni_sese_cevir(metin)
+        _eskit(ses_modulu.onbellek_anahtari(metin), 100 - i)
+    # "bir" yeniden istendi, en eski erişilen artık "iki"
+    ses_modulu.onbellekten_getir("bir")
+
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_MAKS_BAYT", 200)
+    silinen = ses_modulu._onbellegi_kirp()
+
+    assert silinen == [ses_modulu.onbellek_anahtari("iki")]
+    assert not os.path.exists(ses_modulu._onbellek_yolu(silinen[0]))
+    assert ses_modulu.onbellekten_getir("iki") is None
+    assert ses_modulu.onbellekten_getir("bir") and ses_modulu.onbellekten_getir("üç")
+
+
+def test_yeni_verilen_dosya_silinmez(onbellek, monkeypatch):
+    url = ses_modulu.metni_sese_cevir("Az önce verildi.")
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_MAKS_BAYT", 0)
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_KORUMA_SN", 60)
+
+    assert ses_modulu._onbellegi_kirp() == []
+    assert ses_modulu.onbellekten_getir("Az önce verildi.") == url
+
+
+def test_sinir_diger_islerin_dosyalarini_da_sayar(onbellek, monkeypatch):
+    ses_modulu.metni_sese_cevir("bu işçi")
+    # Başka bir işçinin aynı klasöre yazdığı, daha eski erişilmiş dosya
+    anahtar = ses_modulu.onbellek_anahtari("öteki işçi")
+    yol = ses_modulu._onbellek_yolu(anahtar)
+    os.makedirs(os.path.dirname(yol), exist_ok=True)
+    with open(yol, 'wb') as f:
+        f.write(b"y" * 100)
+    os.utime(yol, (time.time() - 1000, time.time() - 1000))
+
+    ses_modulu._diski_tara()
+    assert ses_modulu._onbellek_toplam_bayt == 200
+
+    monkeypatch.setattr(ses_modulu, "TTS_ONBELLEK_MAKS_BAYT", 150)
+    assert ses_modulu._onbellegi_kirp() == [anahtar]
+    assert ses_modulu.onbellekten_getir("bu işçi")
+
+
+def test_baska_iscinin_sildigi_dosya_iska_sayilir(onbellek):
+    ses_modulu.metni_sese_cevir("silinecek")
+    os.remove(ses_modulu._onbellek_yolu(ses_modulu.onbellek_anahtari("silinecek")))
+
+    assert ses_modulu.onbellekten_getir("silinecek") is None
+    assert ses_modulu._onbellek_toplam_bayt == 0
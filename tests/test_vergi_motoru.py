@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+from modules import vergi_motoru
+
+
+@pytest.mark.parametrize("metin, kod", [
+    ("Almanya'ya", "DE"),
+    ("germany", "DE"),
+    ("ABD", "US"),
+    ("Amerika Birleşik Devletleri", "US"),
+    ("de", "DE"),
+    ("UK'ye", "GB"),
+    ("Japonya'da", "JP"),
+    ("Ben de Japonya icin soruyorum", "JP"),
+    ("Fransa da olur", "FR"),
+    ("ingiltereye gidecek", "GB"),
+])
+def test_ulke_coz(metin, kod):
+    assert vergi_motoru.ulke_coz(metin) == kod
+
+
+@pytest.mark.parametrize("metin", ["ben de soruyorum", "orada da var mi", "Brezilya", "Türkiye", ""])
+def test_ulke_coz_bulamazsa_none(metin):
+    assert vergi_motoru.ulke_coz(metin) is None
+
+
+@pytest.mark.parametrize("fiyat, beklenen", [
+    ("1,000", (1000.0, None)),
+    ("1.5 euro", (1.5, "EUR")),
+    ("1.000 Euro", (1000.0, "EUR")),
+    ("1.000,50 TL", (1000.5, "TRY")),
+    ("1,000.50 $", (1000.5, "USD")),
+    ("249,90 dolar", (249.9, "USD")),
+    (500, (500.0, None)),
+    ("bilmiyorum", (None, None)),
+])
+def test_fiyat_coz(fiyat, beklenen):
+    assert vergi_motoru.fiyat_coz(fiyat) == beklenen
+
+
+def test_muafiyet_siniri_dahil_vergisiz():
+    # Kanada: gümrük ve KDV muafiyet sınırı 20 CAD
+    assert "muafiyet sınırı altında" in vergi_motoru.vergi_teklifi("kitap", "20 CAD", "Kanada")
+    assert "1,05 CAD KDV" in vergi_motoru.vergi_teklifi("kitap", "21 CAD", "Kanada")
+
+    sonuc = vergi_motoru.toplu_teklif([{"ulke_kodu": "JP", "kategori": "diger", "deger": 10000},
+                                       {"ulke_kodu": "JP", "kategori": "diger", "deger": 10001}])
+    assert list(sonuc['toplam_vergi'] > 0) == [False, True]
+
+
+def test_gonderi_toplami_muafiyeti_asar():
+    sonuc = vergi_motoru.toplu_teklif([{"ulke_kodu": "CA", "kategori": "kitap", "deger": 15, "gonderi": 1},
+                                       {"ulke_kodu": "CA", "kategori": "kitap", "deger": 15, "gonderi": 1}])
+    assert (sonuc['kdv'] > 0).all()
+
+
+@pytest.mark.parametrize("ulke", ["Türkiye", "Brezilya"])
+def test_tabloda_olmayan_ulke_gemini_ye_birakilir(ulke):
+    assert vergi_motoru.vergi_teklifi("laptop", "1000 dolar", ulke) is None
+
+
+def test_eksik_bilgi_sorulur():
+    assert "hangi ülkeye" in vergi_motoru.vergi_teklifi("laptop", "1000", None)
+    assert "fiyatını" in vergi_motoru.vergi_teklifi("laptop", None, "Almanya")
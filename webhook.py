@@ -1,38 +1,37 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 import os
-import uuid
-from gtts import gTTS
+import json
 
 from dotenv import load_dotenv
-from modules.gemini_ai import process_with_gemini
-
-
-app = Flask(__name__)
 
 # --- AYARLAR ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-AUDIO_FOLDER = os.path.join(BASE_DIR, 'static')
 ENV_FILE = os.path.join(BASE_DIR, '.env')
 
+# Modüller ayarlarını içe aktarılırken okur; .env her şeyden önce yüklenmeli
 load_dotenv(ENV_FILE)
 
-if not os.path.exists(AUDIO_FOLDER): os.makedirs(AUDIO_FOLDER)
+from modules.gemini_ai import process_with_gemini, sohbet_akisi
+from modules.ses_modulu import ses_isi_baslat, ses_isi_durumu
+from modules.oturum_deposu import depo_olustur
+from modules.metrikler import prometheus_metni
+from modules.isinma import isinmayi_baslat, hazirlik_durumu
 
-user_sessions = {}
 
-def metni_sese_cevir(text):
-    filename = f"ses_{uuid.uuid4().hex}.mp3"
-    try:
-        if not text: return None
-        gTTS(text=text, lang='tr').save(os.path.join(AUDIO_FOLDER, filename))
-        return f"/static/{filename}"
-    except Exception as e:
-        print(f"Ses Hatası: {e}")
-        return None
+app = Flask(__name__)
+
+# Senkron sunucuda long-poll bir istek thread'ini tutar; bekleme kısa tutulur, istemci tekrar sorar
+SES_BEKLEME_SINIRI_SN = float(os.getenv("SES_BEKLEME_SINIRI_SN", "1"))
+
+# OTURUM_DEPOSU=sqlite (varsayılan, kalıcı ve işçiler arası paylaşımlı) veya bellek
+oturum_deposu = depo_olustur()
+
+# Model eğitimi, DB açılışı ve sık cevapların sesleri trafikten önce hazırlanır (/ready)
+isinmayi_baslat()
 
 
 @app.route('/')
-def ana_sayfa(): return render_template('index.html')
+def ana_sayfa(): return render_template('index.html', ses_bekleme_siniri=SES_BEKLEME_SINIRI_SN)
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -43,22 +42,62 @@ def chat_api():
 
     if not sid: sid = "test_user"
 
-    # Kullanıcı ilk kez geliyorsa hafızada yer aç
-    if sid not in user_sessions:
-        user_sessions[sid] = {
-            'history': [],
-            'verified': False,
-            'tracking_no': None,
-            'role': None,
-            'user_name': None,
-            'user_id': None,
-            'pending_intent': None
-        }
+    # Ses sentezi arka planda yapılır, istemci /api/audio/<job_id> ile sorgular.
+    # Cevap belli olur olmaz (oturum kaydı beklenmeden) başlatılır.
+    ses = {}
+    resp = process_with_gemini(sid, msg, oturum_deposu,
+                               cevap_hazir=lambda metin: ses.setdefault('is', ses_isi_baslat(metin)))
+    audio_job = ses.get('is') or ses_isi_baslat(resp)
+    return jsonify({"response": resp, "audio_job": audio_job, "session_id": sid})
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream_api():
+    data = request.get_json()
+    msg = data.get('message', '')
+    sid = data.get('session_id')
+
+    if not sid: sid = "test_user"
+
+    def olay_akisi():
+        for olay in sohbet_akisi(sid, msg, oturum_deposu):
+            # Her cümle hazır olur olmaz sese çevrilmeye başlar
+            if olay['event'] == "sentence":
+                olay['audio_job'] = ses_isi_baslat(olay['text'])
+            elif olay['event'] == "done":
+                olay['session_id'] = sid
+            elif olay['event'] == "reply":
+                # Cümleler zaten seslendirildi, tam metin done ile gelir
+                continue
+            yield f"event: {olay['event']}\ndata: {json.dumps(olay, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(olay_akisi()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/audio/<job_id>', methods=['GET'])
+def audio_api(job_id):
+    try:
+        bekle = float(request.args.get('wait', 0))
+    except ValueError:
+        bekle = 0
+    bekle = max(0, min(bekle, SES_BEKLEME_SINIRI_SN))
+
+    durum = ses_isi_durumu(job_id, bekle)
+    if durum['status'] == "unknown":
+        return jsonify(durum), 404
+    return jsonify(durum)
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    return Response(prometheus_metni(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
-    resp = process_with_gemini(sid, msg, user_sessions)
 
-    audio = metni_sese_cevir(resp)
-    return jsonify({"response": resp, "audio": audio, "session_id": sid})
+@app.route('/ready', methods=['GET'])
+def ready_api():
+    durum = hazirlik_durumu()
+    return jsonify(durum), (200 if durum['ready'] else 503)
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
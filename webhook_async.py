@@ -0,0 +1,112 @@
+from quart import Quart, request, jsonify, render_template, Response
+from concurrent.futures import ThreadPoolExecutor
+import os
+import json
+
+from dotenv import load_dotenv
+
+# Asenkron (ASGI) sunucu: webhook.py ile aynı rotalar ve şablonlar.
+# Çalıştırma: uvicorn webhook_async:app  (senkron mod için: python webhook.py)
+
+# --- AYARLAR ---
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENV_FILE = os.path.join(BASE_DIR, '.env')
+
+# Modüller ayarlarını içe aktarılırken okur; .env her şeyden önce yüklenmeli
+load_dotenv(ENV_FILE)
+
+from modules.gemini_ai import process_with_gemini_async, sohbet_akisi_async
+from modules.ses_modulu import ses_isi_baslat, ses_isi_durumu_async
+from modules.oturum_deposu import depo_olustur
+from modules.metrikler import prometheus_metni
+from modules.isinma import isinmayi_baslat, hazirlik_durumu
+from modules import llm_istemci
+
+app = Quart(__name__)
+
+SES_BEKLEME_SINIRI_SN = 25  # asyncio sunucusunda bekleme thread tutmaz
+ASYNC_ISCI_SAYISI = int(os.getenv("ASYNC_ISCI_SAYISI", "32"))
+
+# Bloklayan adımlar (SQLite, model, TTS kuyruğu) bu havuzda yürür; Gemini çağrıları async istemciyle
+# event loop'ta beklendiği için havuz LLM süresince thread tutmaz
+is_havuzu = ThreadPoolExecutor(max_workers=ASYNC_ISCI_SAYISI, thread_name_prefix="sohbet")
+
+oturum_deposu = depo_olustur()
+
+# Gemini eşzamanlılık bütçesinin event loop'a düşen payı trafikten önce ayrılır
+llm_istemci.async_payi_ayir()
+
+
+@app.before_serving
+async def isinma():
+    # Model eğitimi, DB açılışı ve sık cevapların sesleri trafikten önce hazırlanır (/ready)
+    isinmayi_baslat()
+
+
+@app.route('/')
+async def ana_sayfa(): return await render_template('index.html', ses_bekleme_siniri=SES_BEKLEME_SINIRI_SN)
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat_api():
+    data = await request.get_json()
+    msg = data.get('message', '')
+    sid = data.get('session_id')
+
+    if not sid: sid = "test_user"
+
+    ses = {}
+    resp = await process_with_gemini_async(sid, msg, oturum_deposu, is_havuzu,
+                                           cevap_hazir=lambda metin: ses.setdefault('is', ses_isi_baslat(metin)))
+    audio_job = ses.get('is') or ses_isi_baslat(resp)
+    return jsonify({"response": resp, "audio_job": audio_job, "session_id": sid})
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream_api():
+    data = await request.get_json()
+    msg = data.get('message', '')
+    sid = data.get('session_id')
+
+    if not sid: sid = "test_user"
+
+    async def olay_akisi():
+        async for olay in sohbet_akisi_async(sid, msg, oturum_deposu, is_havuzu):
+            if olay['event'] == "sentence":
+                olay['audio_job'] = ses_isi_baslat(olay['text'])
+            elif olay['event'] == "done":
+                olay['session_id'] = sid
+            elif olay['event'] == "reply":
+                continue
+            yield f"event: {olay['event']}\ndata: {json.dumps(olay, ensure_ascii=False)}\n\n"
+
+    return Response(olay_akisi(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/audio/<job_id>', methods=['GET'])
+async def audio_api(job_id):
+    try:
+        bekle = float(request.args.get('wait', 0))
+    except ValueError:
+        bekle = 0
+    bekle = max(0, min(bekle, SES_BEKLEME_SINIRI_SN))
+
+    durum = await ses_isi_durumu_async(job_id, bekle)
+    if durum['status'] == "unknown":
+        return jsonify(durum), 404
+    return jsonify(durum)
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics_api():
+    return Response(prometheus_metni(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/ready', methods=['GET'])
+async def ready_api():
+    durum = hazirlik_durumu()
+    return jsonify(durum), (200 if durum['ready'] else 503)
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,256 @@
+import os
+import re
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+import numpy as np
+
+# Gerçek Gemini kotası harcamadan /api/chat hattının (orkestrasyon, DB, TTS) yük testi.
+# Kullanım: python yuk_testi.py --eszamanli 8 --tekrar 5 --llm-gecikme 400 --tts-gecikme 300
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- SENARYOLAR ---
+# Her adım: (kullanıcı mesajı, sahte Gemini'nin bu mesaja vereceği yönlendirme cevabı)
+DOGRULAMA_ADIMLARI = [
+    ("Merhaba", {"type": "chat", "reply": "Hoş geldiniz. Size nasıl yardımcı olabilirim?"}),
+    ("Adım Can Demir", {"type": "chat", "reply": "Teşekkürler Can Demir. Şimdi kargo takip numaranızı söyler misiniz?"}),
+    ("123456", {"type": "chat", "reply": "Güvenliğiniz için son olarak telefon numaranızı rica edebilir miyim?"}),
+    ("5354445566", {"type": "action", "function": "kimlik_dogrula",
+                    "parameters": {"ad": "Can Demir", "no": "123456", "telefon": "5354445566"}}),
+]
+
+SENARYOLAR = {
+    "dogrulama": DOGRULAMA_ADIMLARI,
+    "takip": DOGRULAMA_ADIMLARI + [
+        ("Kargom nerede?", {"type": "action", "function": "kargo_sorgula", "parameters": {"no": "123456"}}),
+        ("Ne zaman gelir?", {"type": "action", "function": "tahmini_teslimat", "parameters": {"no": "123456"}}),
+    ],
+    "sikayet": DOGRULAMA_ADIMLARI + [
+        ("Kargom çok gecikti, rezalet!", {"type": "action", "function": "gecikme_sikayeti",
+                                         "parameters": {"no": "123456", "musteri_id": "1"}}),
+        ("Kurye kaba davrandı, şikayetçiyim", {"type": "action", "function": "sikayet_olustur",
+                                               "parameters": {"no": "123456", "konu": "Kurye kaba davrandı"}}),
+    ],
+    "fiyat": [
+        ("İstanbul'dan Ankara'ya 5 desi kargo ne kadar?", {"type": "action", "function": "ucret_hesapla",
+                                                           "parameters": {"cikis": "İstanbul", "varis": "Ankara", "desi": "5"}}),
+        ("İzmir'den Bursa'ya kaç günde gider?", {"type": "action", "function": "teslimat_suresi_hesapla_ai",
+                                                 "parameters": {"cikis": "İzmir", "varis": "Bursa", "desi": "5"}}),
+        ("Öğrenci indirimi var mı?", {"type": "action", "function": "kampanya_sorgula", "parameters": {}}),
+    ],
+    "sube": [
+        ("Kadıköy şubeniz nerede?", {"type": "action", "function": "sube_sorgula", "parameters": {"lokasyon": "Kadıköy"}}),
+        ("Orası kaça kadar açık?", {"type": "action", "function": "sube_saat_sorgula", "parameters": {"lokasyon": "Kadıköy"}}),
+        ("Telefonu ne?", {"type": "action", "function": "sube_telefon_sorgula", "parameters": {"lokasyon": "Kadıköy"}}),
+        ("Bana en yakın şube Çankaya'da mı?", {"type": "action", "function": "en_yakin_sube_bul",
+                                               "parameters": {"kullanici_adresi": "Ankara Çankaya", "bilgi_turu": "adres"}}),
+    ],
+}
+
+
+class _SahteCevap:
+    def __init__(self, text, prompt_token=0, cevap_token=0):
+        self.text = text
+        self.usage_metadata = type("Kullanim", (), {"prompt_token_count": prompt_token,
+                                                   "candidates_token_count": cevap_token})()
+
+
+class SahteGenerativeModel:
+    """genai.GenerativeModel yerine geçen sahte model: yönlendirme için hazır JSON, diğer istemler için kısa metin döner."""
+
+    yonlendirmeler = {}
+    gecikme_sn = 0.0
+
+    def __init__(self, model_name=None, **kwargs):
+        self.model_name = model_name
+
+    @classmethod
+    def _bekle(cls):
+        if cls.gecikme_sn > 0:
+            time.sleep(random.uniform(0.5, 1.5) * cls.gecikme_sn)
+
+    def _cevapla(self, prompt):
+        if "JSON CEVAP:" in prompt:
+            # Bekleyen niyet notu geçmiş satırlarını da içerdiği için son mesaj boş satırdan sonra aranır
+            mesaj = prompt.rsplit("\n\nKULLANICI:", 1)[1].split("\nJSON CEVAP:")[0]
+            mesaj = mesaj.split(" (NOT:")[0].strip()
+            karar = self.yonlendirmeler.get(mesaj, {"type": "chat", "reply": "Size nasıl yardımcı olabilirim?"})
+            return json.dumps(karar, ensure_ascii=False)
+        if "karayolu sürüş mesafesini" in prompt:
+            return str(random.randint(150, 1200))
+        bilgi = re.search(r"nazikçe ilet: (.*?)\. SADECE", prompt, re.S)
+        if bilgi:
+            return bilgi.group(1).strip() + "."
+        return "İşleminiz tamamlandı. Size başka nasıl yardımcı olabilirim?"
+
+    def _cevap(self, prompt, stream):
+        text = self._cevapla(prompt)
+        cevap_token = max(1, len(text) // 4)
+        if stream:
+            return [_SahteCevap(text[i:i + 40]) for i in range(0, len(text), 40)]
+        return _SahteCevap(text, prompt_token=len(prompt) // 4, cevap_token=cevap_token)
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self._bekle()
+        return self._cevap(prompt, stream)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        if self.gecikme_sn > 0:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.gecikme_sn)
+        cevap = self._cevap(prompt, stream)
+        return _SahteAkis(cevap) if stream else cevap
+
+
+class _SahteAkis:
+    """generate_content_async(stream=True) cevabı gibi async iterable."""
+
+    def __init__(self, parcalar):
+        self._parcalar = iter(parcalar)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._parcalar)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class SahteGenai:
+    GenerativeModel = SahteGenerativeModel
+
+    @staticmethod
+    def configure(**kwargs):
+        pass
+
+
+class SahteTTS:
+    """gTTS yerine geçer: ayarlanan gecikme kadar bekleyip küçük bir mp3 dosyası yazar."""
+
+    gecikme_sn = 0.0
+
+    def __init__(self, text, lang='tr'):
+        self.text = text
+
+    def save(self, yol):
+        if self.gecikme_sn > 0:
+            time.sleep(random.uniform(0.5, 1.5) * self.gecikme_sn)
+        with open(yol, 'wb') as f:
+            f.write(b"ID3" + self.text.encode('utf-8'))
+
+
+def ortami_hazirla(llm_gecikme_sn, tts_gecikme_sn, calisma_dizini):
+    # Oturumlar bellekte tutulur, gerçek veritabanı yerine kopyası kullanılır (şikayet vb. yazılar kaybolmasın)
+    os.environ.setdefault("OTURUM_DEPOSU", "bellek")
+
+    from modules import database, ses_modulu, llm_istemci
+
+    db_kopya = os.path.join(calisma_dizini, 'sirket_veritabani.db')
+    shutil.copyfile(database.DB_FILE, db_kopya)
+    database.DB_FILE = db_kopya
+
+    SahteGenerativeModel.gecikme_sn = llm_gecikme_sn
+    SahteGenerativeModel.yonlendirmeler = {mesaj: karar for adimlar in SENARYOLAR.values() for mesaj, karar in adimlar}
+    llm_istemci.genai = SahteGenai
+    llm_istemci._modeller.clear()
+
+    SahteTTS.gecikme_sn = tts_gecikme_sn
+    ses_modulu.gTTS = SahteTTS
+    ses_modulu.CACHE_FOLDER = os.path.join(calisma_dizini, 'tts_cache')
+
+    import webhook
+    return webhook.app
+
+
+def _senaryo_calistir(istemci, ad, adimlar, oturum_id, ses_bekle, sonuclar, kilit):
+    for mesaj, _ in adimlar:
+        baslangic = time.perf_counter()
+        hata = False
+        try:
+            cevap = istemci.post('/api/chat', json={"message": mesaj, "session_id": oturum_id})
+            veri = cevap.get_json()
+            hata = cevap.status_code != 200 or veri.get("response") in (None, "Bir hata oluştu.")
+            if ses_bekle and veri.get("audio_job"):
+                istemci.get(f"/api/audio/{veri['audio_job']}?wait=25")
+        except Exception as e:
+            print(f"İstek Hatası ({ad}): {e}")
+            hata = True
+        sure = time.perf_counter() - baslangic
+
+        with kilit:
+            sonuclar.setdefault(ad, {'sureler': [], 'hata': 0})
+            sonuclar[ad]['sureler'].append(sure)
+            if hata: sonuclar[ad]['hata'] += 1
+
+
+def yuk_testi_calistir(app, eszamanli, tekrar, senaryolar, ses_bekle=False):
+    sonuclar = {}
+    kilit = threading.Lock()
+
+    def sanal_kullanici(no):
+        istemci = app.test_client()
+        for t in range(tekrar):
+            for ad in senaryolar:
+                oturum_id = f"yuk_{no}_{t}_{ad}"
+                _senaryo_calistir(istemci, ad, SENARYOLAR[ad], oturum_id, ses_bekle, sonuclar, kilit)
+
+    baslangic = time.perf_counter()
+    threadler = [threading.Thread(target=sanal_kullanici, args=(i,)) for i in range(eszamanli)]
+    for th in threadler: th.start()
+    for th in threadler: th.join()
+    toplam_sure = time.perf_counter() - baslangic
+
+    return sonuclar, toplam_sure
+
+
+def rapor_yazdir(sonuclar, toplam_sure):
+    print("\n--- YÜK TESTİ RAPORU ---")
+    print(f"{'Senaryo':<12}{'İstek':>8}{'Hata':>7}{'İstek/sn':>11}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}")
+
+    tum_sureler = []
+    toplam_hata = 0
+    for ad, veri in sonuclar.items():
+        sureler = np.array(veri['sureler']) * 1000
+        tum_sureler.extend(veri['sureler'])
+        toplam_hata += veri['hata']
+        p50, p95, p99 = np.percentile(sureler, [50, 95, 99])
+        print(f"{ad:<12}{len(sureler):>8}{veri['hata']:>7}{len(sureler) / toplam_sure:>11.1f}"
+              f"{p50:>11.1f}{p95:>11.1f}{p99:>11.1f}")
+
+    if tum_sureler:
+        sureler = np.array(tum_sureler) * 1000
+        p50, p95, p99 = np.percentile(sureler, [50, 95, 99])
+        print(f"{'TOPLAM':<12}{len(sureler):>8}{toplam_hata:>7}{len(sureler) / toplam_sure:>11.1f}"
+              f"{p50:>11.1f}{p95:>11.1f}{p99:>11.1f}")
+    print(f"Toplam süre: {toplam_sure:.2f} sn")
+    print("------------------------\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sahte Gemini ve sahte TTS ile /api/chat yük testi")
+    parser.add_argument("--eszamanli", type=int, default=4, help="Aynı anda konuşan sanal kullanıcı sayısı")
+    parser.add_argument("--tekrar", type=int, default=3, help="Her kullanıcının senaryoları kaç kez tekrarlayacağı")
+    parser.add_argument("--llm-gecikme", type=float, default=300, help="Sahte Gemini ortalama gecikmesi (ms)")
+    parser.add_argument("--tts-gecikme", type=float, default=200, help="Sahte TTS ortalama gecikmesi (ms)")
+    parser.add_argument("--senaryo", action="append", choices=sorted(SENARYOLAR), help="Sadece seçilen senaryolar")
+    parser.add_argument("--ses-bekle", action="store_true", help="Her cevapta ses hazır olana kadar bekle")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="yuk_testi_") as calisma_dizini:
+        app = ortami_hazirla(args.llm_gecikme / 1000, args.tts_gecikme / 1000, calisma_dizini)
+
+        # Model eğitimi vb. ölçüme girmesin diye ısınmanın bitmesi beklenir
+        from modules.isinma import HAZIR
+        HAZIR.wait(timeout=120)
+
+        secili = args.senaryo or list(SENARYOLAR)
+        print(f"{args.eszamanli} sanal kullanıcı x {args.tekrar} tekrar, senaryolar: {', '.join(secili)}")
+        sonuclar, toplam_sure = yuk_testi_calistir(app, args.eszamanli, args.tekrar, secili, args.ses_bekle)
+        rapor_yazdir(sonuclar, toplam_sure)